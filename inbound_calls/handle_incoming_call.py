@@ -20,10 +20,31 @@ import time
 from audioop import ulaw2lin
 import websocket
 import base64
+import re
+import uuid
 
 # Importar cliente de MikroTik API para function calling
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.mikrotik_api_client import MikroTikAPIClient
+from utils.mikrotik_async_client import AsyncMikroTikAPIClient
+from utils.mikrotik_cache import QueryCache, normalize_question
+from utils.audio_queue import BoundedAudioQueue
+from utils.tool_engine import ToolExecutor
+from utils.tool_registry import Tool, ToolRegistry
+from utils.result_shaping import ResultShape
+from utils.ari_client import ARIClient
+from utils.single_flight import SingleFlight
+from utils.event_dispatcher import ChannelEventDispatcher
+from utils.call_session import CallSession, ARI_RESOURCES
+from utils.ari_recovery import is_stasis_call, plan_reconcile, reconnect_delay
+from utils.admission import AdmissionController, QUEUE, REJECT
+from utils.worker_pool import WorkerPool, SupervisorLink
+from utils.conversation_log import ConversationLog
+from utils.filler_audio import FillerLibrary, FillerPlayer
+from utils.call_metrics import CallTimeline, LATENCY, COUNTERS
+from utils.log_setup import setup_logging, bind_channel, current_channel, SampledLog
+from utils.metrics_server import (
+    MetricsServer, LoopLagMonitor, latency_summary, open_file_descriptors
+)
 
 # IMPORTANTE: Este script debe usar el siguiente Dialplan en Asterisk para funcionar correctamente.
 # Configuración de dialplan  para handle_call.py ......
@@ -89,30 +110,134 @@ ASTERISK_PASSWORD = env_vars['ASTERISK_PASSWORD']
 LOG_FILE_PATH = env_vars['LOG_FILE_PATH']
 LOCAL_IP_ADDRESS = env_vars['LOCAL_IP_ADDRESS']
 
+# Cliente REST de ARI: conexiones keep-alive hacia Asterisk y timeout por petición
+ARI_POOL_SIZE = int(os.getenv('ARI_POOL_SIZE', '20'))
+ARI_REQUEST_TIMEOUT = float(os.getenv('ARI_REQUEST_TIMEOUT', '10'))
+# Barrido periódico de canales External Media/UnicastRTP y bridges sin dueño (segundos, 0 = desactivado)
+ARI_ORPHAN_SWEEP_INTERVAL = float(os.getenv('ARI_ORPHAN_SWEEP_INTERVAL', '300'))
+# Reconexión del WebSocket de eventos ARI: backoff exponencial con jitter
+ARI_RECONNECT_BASE_DELAY = float(os.getenv('ARI_RECONNECT_BASE_DELAY', '0.5'))
+ARI_RECONNECT_MAX_DELAY = float(os.getenv('ARI_RECONNECT_MAX_DELAY', '30'))
+# Timeout de cada paso al liberar una llamada (OpenAI, tarea RTP, socket, Asterisk)
+CALL_TEARDOWN_STEP_TIMEOUT = float(os.getenv('CALL_TEARDOWN_STEP_TIMEOUT', '3'))
+# Bridges creados de antemano para que el setup no espere el POST /bridges (0 = desactivado)
+BRIDGE_POOL_SIZE = int(os.getenv('BRIDGE_POOL_SIZE', '0'))
+# Prefijo de los bridges de esta aplicación: el barrido de huérfanos solo toca
+# estos (eagi_handler.py crea sus propios bridge_<canal> en el mismo Asterisk)
+BRIDGE_ID_PREFIX = 'openai_app_bridge_'
+
+# Control de admisión: límite blando (en cola con aviso de espera) y duro (rechazo)
+ADMISSION_CONTROL_ENABLED = os.getenv('ADMISSION_CONTROL_ENABLED', 'false').lower() == 'true'
+ADMISSION_SOFT_LIMIT = int(os.getenv('ADMISSION_SOFT_LIMIT', '20'))
+ADMISSION_HARD_LIMIT = int(os.getenv('ADMISSION_HARD_LIMIT', '30'))
+ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', '10'))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '60'))
+ADMISSION_MAX_LOOP_LAG = float(os.getenv('ADMISSION_MAX_LOOP_LAG', '0.2'))
+ADMISSION_MAX_OPENAI_ERRORS = float(os.getenv('ADMISSION_MAX_OPENAI_ERRORS', '10'))  # por minuto
+# Sonidos de Asterisk (locales al servidor): aviso de espera y de saturación
+ADMISSION_HOLD_PROMPT = os.getenv('ADMISSION_HOLD_PROMPT', 'sound:pls-hold-while-try')
+ADMISSION_HOLD_PROMPT_SECONDS = float(os.getenv('ADMISSION_HOLD_PROMPT_SECONDS', '3'))
+ADMISSION_BUSY_PROMPT = os.getenv('ADMISSION_BUSY_PROMPT', 'sound:all-circuits-busy-now')
+ADMISSION_BUSY_PROMPT_SECONDS = float(os.getenv('ADMISSION_BUSY_PROMPT_SECONDS', '3'))
+
+# RTP simétrico: el destino del audio se aprende del primer paquete que llega (y
+# sigue los cambios de SSRC), así no se consultan variables RTP del canal por ARI
+RTP_LATCHING = os.getenv('RTP_LATCHING', 'true').lower() == 'true'
+# Puertos UDP locales para RTP (en modo multiproceso cada worker recibe una parte)
+RTP_PORT_START = int(os.getenv('RTP_PORT_START', '10000'))
+RTP_PORT_END = int(os.getenv('RTP_PORT_END', '20000'))
+
+# Multiproceso: un supervisor recibe los eventos ARI y reparte las llamadas entre
+# INBOUND_WORKERS procesos, cada uno con su event loop (0 = un solo proceso)
+INBOUND_WORKERS = int(os.getenv('INBOUND_WORKERS', '0'))
+INBOUND_SUPERVISOR_SOCKET = os.getenv('INBOUND_SUPERVISOR_SOCKET', '/tmp/openai-inbound-supervisor.sock')
+# Lo fija el supervisor al lanzar cada worker
+INBOUND_WORKER_INDEX = os.getenv('INBOUND_WORKER_INDEX')
+
+# Variables de canal que realmente se usan: destino RTP y peer IP para External Media
+# (solo sin RTP_LATCHING)
+CHANNEL_INFO_VARIABLES = {
+    'CHANNEL(rtpdest)': 'rtp_dest',
+    'CHANNEL(peerip)': 'peer_ip'
+}
+# Formato de audio, en orden de preferencia para detectar el codec
+CODEC_VARIABLES = ('CHANNEL(audioreadformat)', 'CHANNEL(audiowriteformat)', 'CHANNEL(format)')
+
 # Configuración de API MikroTik para function calling
 MIKROTIK_API_URL = os.getenv('MIKROTIK_API_URL', 'http://10.0.0.9:5050')
 ENABLE_MIKROTIK_TOOLS = os.getenv('ENABLE_MIKROTIK_TOOLS', 'true').lower() == 'true'
+MIKROTIK_POOL_SIZE = int(os.getenv('MIKROTIK_POOL_SIZE', '20'))
+# Ejecución especulativa: lanzar la consulta en cuanto el streaming de argumentos trae la pregunta completa
+ENABLE_SPECULATIVE_TOOLS = os.getenv('ENABLE_SPECULATIVE_TOOLS', 'false').lower() == 'true'
+# Cancelar las herramientas en vuelo cuando la persona vuelve a hablar (al colgar siempre se cancelan)
+TOOL_CANCEL_ON_BARGE_IN = os.getenv('TOOL_CANCEL_ON_BARGE_IN', 'false').lower() == 'true'
+
+# Motor de herramientas: concurrencia máxima (global y hacia MikroTik), cola de espera
+# y circuit breaker (fallos consecutivos que lo abren, segundos abierto)
+TOOL_MAX_CONCURRENCY = int(os.getenv('TOOL_MAX_CONCURRENCY', '16'))
+MIKROTIK_MAX_CONCURRENCY = int(os.getenv('MIKROTIK_MAX_CONCURRENCY', '8'))
+TOOL_MAX_QUEUE = int(os.getenv('TOOL_MAX_QUEUE', '32'))
+TOOL_BREAKER_FAILURES = int(os.getenv('TOOL_BREAKER_FAILURES', '5'))
+TOOL_BREAKER_RESET = float(os.getenv('TOOL_BREAKER_RESET', '30'))
+# Compactación de resultados antes de enviarlos al modelo (presupuesto en bytes del JSON)
+TOOL_RESULT_SHAPING = os.getenv('TOOL_RESULT_SHAPING', 'true').lower() == 'true'
+TOOL_RESULT_MAX_BYTES = int(os.getenv('TOOL_RESULT_MAX_BYTES', '1500'))
+
+# Audio de relleno mientras corre una herramienta (clips µ-law precargados al arrancar).
+# Por defecto solo se activa si hay un directorio de clips configurado
+FILLER_AUDIO_DIR = os.getenv('FILLER_AUDIO_DIR')
+FILLER_AUDIO_ENABLED = os.getenv('FILLER_AUDIO_ENABLED', 'true' if FILLER_AUDIO_DIR else 'false').lower() == 'true'
+FILLER_START_DELAY = float(os.getenv('FILLER_START_DELAY', '1.0'))
+FILLER_MAX_SECONDS = float(os.getenv('FILLER_MAX_SECONDS', '45'))
+
+# Caché de respuestas MikroTik (TTL en segundos por categoría de pregunta)
+MIKROTIK_CACHE_ENABLED = os.getenv('MIKROTIK_CACHE_ENABLED', 'true').lower() == 'true'
+MIKROTIK_CACHE_MAX_ENTRIES = int(os.getenv('MIKROTIK_CACHE_MAX_ENTRIES', '256'))
+MIKROTIK_CACHE_TTLS = {
+    'status': float(os.getenv('MIKROTIK_CACHE_TTL_STATUS', '30')),
+    'account': float(os.getenv('MIKROTIK_CACHE_TTL_ACCOUNT', '120')),
+    'static': float(os.getenv('MIKROTIK_CACHE_TTL_STATIC', '900')),
+    'default': float(os.getenv('MIKROTIK_CACHE_TTL_DEFAULT', '0'))
+}
+
+# Cola de audio hacia OpenAI: límite (en chunks de 75 ms), política de desborde y detección de atasco
+OPENAI_UPLINK_QUEUE_MAX = int(os.getenv('OPENAI_UPLINK_QUEUE_MAX', '40'))
+OPENAI_UPLINK_QUEUE_POLICY = os.getenv('OPENAI_UPLINK_QUEUE_POLICY', 'drop_oldest').lower()
+OPENAI_UPLINK_STALL_TIMEOUT = float(os.getenv('OPENAI_UPLINK_STALL_TIMEOUT', '5'))
+OPENAI_RECONNECT_ON_STALL = os.getenv('OPENAI_RECONNECT_ON_STALL', 'true').lower() == 'true'
+
+# Reanudación de la sesión Realtime si el WebSocket se cae a mitad de llamada
+OPENAI_SESSION_RESUME = os.getenv('OPENAI_SESSION_RESUME', 'true').lower() == 'true'
+OPENAI_RECONNECT_MAX_ATTEMPTS = int(os.getenv('OPENAI_RECONNECT_MAX_ATTEMPTS', '5'))
+OPENAI_RECONNECT_BASE_DELAY = float(os.getenv('OPENAI_RECONNECT_BASE_DELAY', '0.5'))
+OPENAI_RECONNECT_MAX_DELAY = float(os.getenv('OPENAI_RECONNECT_MAX_DELAY', '8'))
+OPENAI_REPLAY_MAX_ITEMS = int(os.getenv('OPENAI_REPLAY_MAX_ITEMS', '30'))
 
 # Verificar que el directorio existe
 log_dir = os.path.dirname(LOG_FILE_PATH)
 if not os.path.exists(log_dir):
     os.makedirs(log_dir)
 
-# Configuración más detallada del logging
-logging.basicConfig(
-    filename=LOG_FILE_PATH,
+# Directorio donde se vuelca la timeline JSON de cada llamada al colgar
+CALL_METRICS_DIR = os.getenv('CALL_METRICS_DIR', os.path.join(log_dir, 'call_metrics'))
+
+# Endpoint HTTP de métricas Prometheus (deshabilitado si METRICS_PORT no está definido)
+METRICS_PORT = os.getenv('METRICS_PORT')
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+
+# Logging no bloqueante: los hilos de audio solo encolan, un QueueListener escribe a disco
+# LOG_JSONL_PATH (opcional) agrega un sink estructurado; LOG_RATE_LIMIT limita DEBUG/INFO repetidos
+LOG_JSONL_PATH = os.getenv('LOG_JSONL_PATH')
+LOG_RATE_LIMIT = int(os.getenv('LOG_RATE_LIMIT', '20'))
+log_listener = setup_logging(
+    LOG_FILE_PATH,
+    jsonl_file=LOG_JSONL_PATH,
     level=logging.DEBUG,
-    format='%(asctime)s.%(msecs)03d - %(levelname)s - %(funcName)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    force=True  # Forzar la configuración
+    rate_limit=LOG_RATE_LIMIT
 )
 
-# # Añadir también un handler para la consola
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.DEBUG)
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-console_handler.setFormatter(formatter)
-logging.getLogger('').addHandler(console_handler)
+# Muestreo de eventos de alta frecuencia (un log cada N deltas de audio)
+hot_path_log = SampledLog(every=50)
 
 
 print("Intentando escribir en log...")
@@ -123,8 +248,138 @@ print(f"Log file path: {LOG_FILE_PATH}")
 
 
 
+# Valor de "pregunta" ya cerrado (comilla final recibida) dentro de argumentos JSON parciales
+PREGUNTA_ARGUMENT_RE = re.compile(r'"pregunta"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+# Cliente MikroTik compartido por todas las llamadas (un único pool keep-alive)
+_mikrotik_client = None
+
+
+def get_mikrotik_client():
+    """Retorna el cliente MikroTik asíncrono del proceso, o None si las herramientas están deshabilitadas"""
+    global _mikrotik_client
+    if _mikrotik_client is None and ENABLE_MIKROTIK_TOOLS:
+        _mikrotik_client = AsyncMikroTikAPIClient(
+            api_url=MIKROTIK_API_URL,
+            pool_size=MIKROTIK_POOL_SIZE,
+            cache=QueryCache(max_entries=MIKROTIK_CACHE_MAX_ENTRIES, ttls=MIKROTIK_CACHE_TTLS),
+            enable_cache=MIKROTIK_CACHE_ENABLED
+        )
+        logging.info(f"Cliente MikroTik API inicializado (pool de {MIKROTIK_POOL_SIZE} conexiones)")
+    return _mikrotik_client
+
+
+# Clips de relleno cargados una sola vez en main()
+_filler_library = None
+
+
+def load_filler_library():
+    """Carga en memoria los clips de relleno del proceso"""
+    global _filler_library
+    if FILLER_AUDIO_ENABLED and _filler_library is None:
+        _filler_library = FillerLibrary.load(FILLER_AUDIO_DIR)
+    return _filler_library
+
+
+# Motor de ejecución de herramientas compartido (límites, deadlines y circuit breaker)
+_tool_engine = None
+
+
+def get_tool_engine():
+    """Retorna el motor de herramientas del proceso (debe llamarse dentro del event loop)"""
+    global _tool_engine
+    if _tool_engine is None:
+        _tool_engine = ToolExecutor(
+            global_limit=TOOL_MAX_CONCURRENCY,
+            backend_limits={'mikrotik': MIKROTIK_MAX_CONCURRENCY},
+            max_queue=TOOL_MAX_QUEUE,
+            failure_threshold=TOOL_BREAKER_FAILURES,
+            reset_timeout=TOOL_BREAKER_RESET
+        )
+        client = get_mikrotik_client()
+        if client:
+            _tool_engine.register_health_check('mikrotik', client.check_health)
+    return _tool_engine
+
+
+def tool_timeout(arguments: dict, default: float = 60) -> float:
+    """Timeout pedido por el modelo; puede llegar como texto ("30") o no ser válido"""
+    try:
+        timeout = float(arguments.get('timeout', default))
+    except (TypeError, ValueError):
+        return default
+    return timeout if 0 < timeout < float('inf') else default
+
+
+async def consultar_mikrotik(arguments: dict, deadline: float) -> dict:
+    """Ejecutor de la herramienta consultar_mikrotik"""
+    pregunta = arguments.get('pregunta', '')
+    timeout = tool_timeout(arguments)
+    use_cache = not arguments.get('forzar_actualizacion', False)
+
+    if not pregunta:
+        return {
+            "error": "No se proporcionó una pregunta",
+            "response": "No recibí una pregunta para consultar."
+        }
+
+    logging.info(f"   Pregunta: '{pregunta}'")
+    logging.info(f"   Timeout: {timeout}s")
+
+    client = get_mikrotik_client()
+    if not client:
+        return {
+            "error": "MikroTik client not initialized",
+            "response": "Lo siento, el sistema de consultas no está disponible en este momento."
+        }
+    return await client.query(pregunta, timeout, deadline=deadline, use_cache=use_cache)
+
+
+def cached_mikrotik_answer(arguments: dict):
+    """Respuesta de consultar_mikrotik ya cacheada por el cliente, o None"""
+    pregunta = arguments.get('pregunta', '')
+    client = get_mikrotik_client()
+    if not client or not isinstance(pregunta, str) or arguments.get('forzar_actualizacion', False):
+        return None
+    if client.validate_question(pregunta):
+        return None
+    # El fallo lo cuenta la consulta que sigue
+    return client.cache_lookup(pregunta, count_miss=False)
+
+
+# Registro de herramientas del proceso: la lista de tools se arma una sola vez al arrancar
+_tool_registry = None
+
+
+def get_tool_registry():
+    """Retorna el registro de herramientas (debe llamarse dentro del event loop)"""
+    global _tool_registry
+    if _tool_registry is None:
+        _tool_registry = ToolRegistry(engine=get_tool_engine(), shape_results=TOOL_RESULT_SHAPING)
+        client = get_mikrotik_client()
+        if client:
+            # Deadline: timeout de la API + margen, nunca más que request_timeout.
+            # La caché la gestiona el propio cliente (TTL por categoría de pregunta) y
+            # se consulta antes del motor: con el breaker abierto sigue respondiendo.
+            _tool_registry.register(Tool(
+                client.get_tool_definition(),
+                consultar_mikrotik,
+                backend='mikrotik',
+                deadline=lambda arguments: min(client.request_timeout, tool_timeout(arguments) + 10),
+                cache_ttl=None,
+                cache_lookup=cached_mikrotik_answer,
+                # El modelo solo necesita el texto a leer; metadata, error_type y flags de caché sobran
+                result_shape=ResultShape(fields=('success', 'response'), max_bytes=TOOL_RESULT_MAX_BYTES)
+            ))
+    return _tool_registry
+
+
 class RTPAudioHandler:
-    def __init__(self):
+    def __init__(self, channel_id=None, timeline=None, latching=RTP_LATCHING):
+        self.channel_id = channel_id
+        self.timeline = timeline
+        self.latching = latching
+        self.remote_ssrc = None
         self.socket = None
         self.running = False
         self.sequence_number = 0
@@ -138,12 +393,15 @@ class RTPAudioHandler:
         self.codec = None
         self.vad = webrtcvad.Vad(2)
         self.tasks = set()
-        self.rtp_start_port = 10000
-        self.rtp_end_port = 20000
+        self.rtp_start_port = RTP_PORT_START
+        self.rtp_end_port = RTP_PORT_END
         self.remote_address = None
         self.remote_port = None
         self.remote_configured = False  # Nuevo flag para tracking de endpoint remoto
         self.openai_handler = None
+        self.openai_client = None
+        self.packets_in = 0
+        self.packets_out = 0
 
     async def find_available_port(self, local_address):
         """
@@ -215,6 +473,8 @@ class RTPAudioHandler:
                     f"Endpoint remoto configurado - IP: {remote_address}, "
                     f"Puerto: {remote_port}"
                 )
+            elif self.latching:
+                logging.info("Endpoint remoto se aprenderá del primer paquete RTP entrante")
             else:
                 logging.warning("Endpoint remoto no configurado")
             
@@ -279,7 +539,8 @@ class RTPAudioHandler:
         
         logging.info(f"*******************************Iniciando bucle de procesamiento de audio en socket {self.socket.getsockname()}**********")
         
-        openai_client = OpenAIClient()
+        openai_client = OpenAIClient(channel_id=self.channel_id, timeline=self.timeline)
+        self.openai_client = openai_client
         try:
            openai_client.start_in_thread()
         except Exception as e:
@@ -298,11 +559,12 @@ class RTPAudioHandler:
                         last_log_time = current_time
                     
                     try:
-                        data = await asyncio.wait_for(
-                            loop.sock_recv(self.socket, 1024),
+                        data, source = await asyncio.wait_for(
+                            self.receive_packet(loop),
                             timeout=0.2
                         )
                         frames_processed += 1
+                        self.packets_in += 1
                     except asyncio.TimeoutError:
                         continue
                         
@@ -317,6 +579,8 @@ class RTPAudioHandler:
                     if payload is None or sequence_number is None:
                         logging.warning("Frame RTP inválido")
                         continue
+                    if self.latching:
+                        self.latch_remote(source, data)
 
                     # Validar consistencia del tamaño de frame
                     if frame_size is None:
@@ -345,7 +609,55 @@ class RTPAudioHandler:
         
         except asyncio.CancelledError:
             logging.info("Procesamiento de audio cancelado")
-            receive_task.cancel()  # Cancelar recepción            
+            receive_task.cancel()  # Cancelar recepción
+            # El cierre del WebSocket puede bloquear segundos (handshake): fuera del event loop
+            await asyncio.to_thread(openai_client.close)
+
+    async def receive_packet(self, loop):
+        """Lee un datagrama con su origen: (datos, (ip, puerto))"""
+        if hasattr(loop, 'sock_recvfrom'):  # Python 3.11+
+            return await loop.sock_recvfrom(self.socket, 1024)
+        while True:
+            try:
+                return self.socket.recvfrom(1024)
+            except BlockingIOError:
+                readable = loop.create_future()
+                loop.add_reader(self.socket.fileno(), readable.set_result, None)
+                try:
+                    await readable
+                finally:
+                    loop.remove_reader(self.socket.fileno())
+
+    def latch_remote(self, source, packet):
+        """
+        Fija el destino del audio saliente en el origen de los paquetes entrantes
+
+        El primer paquete válido fija la dirección; después solo se cambia si
+        cambia el SSRC (nuevo stream, p. ej. tras un re-INVITE o una transferencia).
+        Un SSRC conocido desde otra dirección se ignora.
+        """
+        ssrc = int.from_bytes(packet[8:12], 'big')
+        address, port = source[0], source[1]
+        if ssrc == self.remote_ssrc or (address, port) == (self.remote_address, self.remote_port):
+            if self.remote_ssrc is None:
+                self.remote_ssrc = ssrc
+            return
+        if self.remote_ssrc is not None and ssrc != self.remote_ssrc:
+            COUNTERS.inc('rtp_latch_total', event='relatched')
+            logging.info(
+                f"RTP re-enganchado por cambio de SSRC ({self.remote_ssrc:#010x} -> {ssrc:#010x}): "
+                f"{self.remote_address}:{self.remote_port} -> {address}:{port}"
+            )
+        else:
+            COUNTERS.inc('rtp_latch_total', event='latched')
+            logging.info(f"RTP enganchado al origen {address}:{port} (SSRC {ssrc:#010x})")
+            if self.timeline:
+                self.timeline.mark_once('rtp_latched')
+                self.timeline.observe_between('rtp_latch', 'stasis_start', 'rtp_latched')
+        self.remote_ssrc = ssrc
+        self.remote_address = address
+        self.remote_port = port
+        self.remote_configured = True
 
     def parse_rtp_header(self, packet):
         """Parsea la cabecera RTP y retorna el payload y número de secuencia"""
@@ -399,6 +711,12 @@ class RTPAudioHandler:
             
             # Limpiar buffer
             self.audio_buffer.clear()
+
+            # Acumular los paquetes de esta llamada en los contadores del proceso
+            COUNTERS.inc('rtp_packets_in_total', self.packets_in)
+            COUNTERS.inc('rtp_packets_out_total', self.packets_out)
+            self.packets_in = 0
+            self.packets_out = 0
             
             # Cerrar socket de manera segura
             if self.socket:
@@ -418,8 +736,13 @@ class RTPAudioHandler:
     async def send_rtp_packet(self, packet):
         """Envía un paquete RTP al socket"""
         try:
+            if not self.remote_configured:
+                # Con latching, el audio anterior al primer paquete entrante no tiene destino
+                hot_path_log.log('rtp_no_remote', "Paquete RTP descartado: destino remoto aún desconocido")
+                return
             if self.socket:
                 self.socket.sendto(packet, (self.remote_address, self.remote_port))
+                self.packets_out += 1
                 # logging.debug(
                 #     f"Paquete RTP enviado a {self.remote_address}:{self.remote_port} "
                 #     f"- {len(packet)} bytes"
@@ -435,7 +758,9 @@ class RTPAudioHandler:
 class OpenAIClient:
     """Cliente OpenAI Realtime API con soporte para Function Calling"""
 
-    def __init__(self):
+    def __init__(self, channel_id=None, timeline=None):
+        self.channel_id = channel_id
+        self.timeline = timeline
         self.api_key = os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             logging.error("API Key de OpenAI no configurada")
@@ -460,65 +785,141 @@ class OpenAIClient:
             'total_bytes_sent': 0,
             'total_bytes_received': 0,
             'processing_time': 0,
-            'function_calls': 0  # Nuevo: contador de llamadas a funciones
+            'function_calls': 0,  # Nuevo: contador de llamadas a funciones
+            'uplink_stalls': 0,
+            'reconnect_attempts': 0,
+            'reconnects_succeeded': 0,
+            'reconnects_failed': 0,
+            'recovery_times': [],
+            'speculations_started': 0,
+            'speculation_hits': 0,
+            'speculation_misses': 0,
+            'speculation_time_saved': 0.0,
+            'tool_calls_cancelled': 0,
+            'tool_wasted_seconds': 0.0
         }
 
         self.incoming_audio_queue = asyncio.Queue()
-        self.outgoing_audio_queue = asyncio.Queue()
+        # Cola acotada: si el WebSocket se atasca no acumulamos audio viejo sin límite
+        self.outgoing_audio_queue = BoundedAudioQueue(
+            maxsize=OPENAI_UPLINK_QUEUE_MAX,
+            policy=OPENAI_UPLINK_QUEUE_POLICY
+        )
         self.loop = asyncio.get_event_loop()
         self.current_ws = None
         self.assistant_speaking = False
-
-        # NUEVO: Soporte para function calling
-        self.current_function_call = None
-        self.function_call_id = None
-        self.function_arguments_buffer = ""
-
-        # Cliente de MikroTik API
-        if ENABLE_MIKROTIK_TOOLS:
-            self.mikrotik_client = MikroTikAPIClient(api_url=MIKROTIK_API_URL)
-            logging.info("Cliente MikroTik API inicializado")
-        else:
-            self.mikrotik_client = None
-            logging.info("Herramientas MikroTik deshabilitadas")
+        self.uplink_task = None
+        self.stall_monitor_task = None
+        self.reconnect_requested = False
+
+        # Reanudación de sesión: log compacto de items para reproducir tras reconectar
+        self.closing = False
+        self.closed_event = threading.Event()  # Despierta el backoff de reconexión al cerrar
+        self.thread = None
+        self.session_ready = False
+        self.recovery_started_at = None
+        self.replay_pending = False
+        self.conversation_log = ConversationLog(OPENAI_REPLAY_MAX_ITEMS)
+        self.acknowledged_outputs = set()  # call_ids cuyo resultado confirmó la sesión actual
+
+        # Function calling: varias llamadas concurrentes indexadas por call_id
+        self.tool_registry = get_tool_registry()
+        if not self.tool_registry.definitions:
+            logging.info("Herramientas deshabilitadas")
+        self.function_arguments = {}  # call_id -> argumentos parciales (streaming)
+        self.function_tasks = {}
+        self.function_started = {}  # call_id -> time.time() al recibir los argumentos finales
+        self.function_names = {}   # call_id -> nombre (de response.output_item.added)
+        self.speculations = {}     # call_id -> consulta especulativa en vuelo
+        # response.create solo cuando no quedan llamadas pendientes y la respuesta que las pidió terminó
+        self.pending_function_calls = set()
+        self.response_active = False
+        self.response_create_deferred = False
+        self.tool_lock = threading.Lock()
+
+        # Relleno de audio mientras una herramienta está en curso (se corta con el primer audio del resultado)
+        self.filler = None
+        if _filler_library:
+            self.filler = FillerPlayer(
+                _filler_library,
+                start_delay=FILLER_START_DELAY,
+                max_seconds=FILLER_MAX_SECONDS
+            )
+        # Respuesta que pidió la herramienta: sus deltas tardíos no cortan el relleno
+        self.filler_response_id = None
 
     def pyload_to_openai(self, audio_data):
-        """Envía audio a la cola de salida para OpenAI"""
+        """Envía audio a la cola de salida para OpenAI (aplica la política de desborde)"""
         self.outgoing_audio_queue.put_nowait(audio_data)
 
     def start_in_thread(self):
         """Inicia el cliente en un thread separado"""
-        thread = threading.Thread(target=self.run, daemon=True)
-        thread.start()
+        self.thread = threading.Thread(target=self.run, name=f"openai-{self.channel_id}", daemon=True)
+        self.thread.start()
 
     def run(self):
         """Inicia el procesamiento con OpenAI"""
+        bind_channel(self.channel_id)  # Los threads no heredan el contexto de la tarea
         try:
             self.metrics['start_time'] = time.time()
+            attempt = 0
 
-            ws = websocket.WebSocketApp(
-                self.url,
-                header=self.headers,
-                on_open=self.on_open,
-                on_message=self.on_message,
-                on_error=self.on_error,
-                on_close=self.on_close,
-                on_ping=self.on_ping,
-                on_pong=self.on_pong
-            )
+            while True:
+                self.session_ready = False
+                ws = websocket.WebSocketApp(
+                    self.url,
+                    header=self.headers,
+                    on_open=self.on_open,
+                    on_message=self.on_message,
+                    on_error=self.on_error,
+                    on_close=self.on_close,
+                    on_ping=self.on_ping,
+                    on_pong=self.on_pong
+                )
 
-            self.current_ws = ws
+                self.current_ws = ws
 
-            logging.info("Iniciando conexión WebSocket con OpenAI")
-            # Ejecutar WebSocket con ping/pong automático
-            # ping_interval debe ser mayor que ping_timeout
-            # Configurado para mantener la conexión viva durante consultas largas (60s+)
-            ws.run_forever(
-                ping_interval=90,  # Enviar ping cada 90 segundos
-                ping_timeout=30    # Esperar 30s por pong antes de timeout
-            )
-            logging.info("Conexión WebSocket cerrada")
-            return True
+                logging.info("Iniciando conexión WebSocket con OpenAI")
+                # Ejecutar WebSocket con ping/pong automático
+                # ping_interval debe ser mayor que ping_timeout
+                # Configurado para mantener la conexión viva durante consultas largas (60s+)
+                ws.run_forever(
+                    ping_interval=90,  # Enviar ping cada 90 segundos
+                    ping_timeout=30    # Esperar 30s por pong antes de timeout
+                )
+                logging.info("Conexión WebSocket cerrada")
+
+                if self.closing:
+                    return True
+                # Sin reanudación solo reconectamos si lo pidió el detector de atasco
+                if not (self.reconnect_requested or OPENAI_SESSION_RESUME):
+                    return True
+                self.reconnect_requested = False
+
+                if self.session_ready:
+                    # La sesión estaba operativa: empieza una nueva ventana de recuperación
+                    attempt = 0
+                    self.recovery_started_at = time.time()
+
+                attempt += 1
+                if attempt > OPENAI_RECONNECT_MAX_ATTEMPTS:
+                    self.metrics['reconnects_failed'] += 1
+                    logging.error(
+                        f"No se pudo reanudar la sesión con OpenAI tras "
+                        f"{OPENAI_RECONNECT_MAX_ATTEMPTS} intentos"
+                    )
+                    self.recovery_started_at = None
+                    return None
+
+                delay = min(OPENAI_RECONNECT_MAX_DELAY, OPENAI_RECONNECT_BASE_DELAY * 2 ** (attempt - 1))
+                delay *= random.uniform(0.5, 1.0)
+                self.metrics['reconnect_attempts'] += 1
+                logging.warning(
+                    f"Reconectando con OpenAI en {delay:.2f}s "
+                    f"(intento {attempt}/{OPENAI_RECONNECT_MAX_ATTEMPTS})"
+                )
+                if self.closed_event.wait(delay):
+                    return True
 
         except Exception as e:
             logging.error(f"Error en inicio: {e}")
@@ -641,15 +1042,21 @@ class OpenAIClient:
             }
 
             # NUEVO: Agregar tools si están habilitados
-            if ENABLE_MIKROTIK_TOOLS and self.mikrotik_client:
-                session_config["session"]["tools"] = [
-                    self.mikrotik_client.get_tool_definition()
-                ]
+            # Transcribir la entrada del usuario para poder reproducir la conversación al reconectar
+            if OPENAI_SESSION_RESUME:
+                session_config["session"]["input_audio_transcription"] = {"model": "whisper-1"}
+
+            if self.tool_registry.definitions:
+                session_config["session"]["tools"] = self.tool_registry.definitions
                 session_config["session"]["tool_choice"] = "auto"
-                logging.info("✓ Herramientas MikroTik agregadas a la sesión")
+                logging.info(f"✓ Herramientas agregadas a la sesión: {', '.join(self.tool_registry.tools)}")
 
             ws.send(json.dumps(session_config))
-            logging.info("Configuración de sesión enviada (con tools)" if ENABLE_MIKROTIK_TOOLS else "Configuración de sesión enviada (sin tools)")
+            logging.info("Configuración de sesión enviada (con tools)" if self.tool_registry.definitions else "Configuración de sesión enviada (sin tools)")
+
+            # Si venimos de una caída, reproducir la conversación cuando la sesión esté lista
+            self.acknowledged_outputs = set()
+            self.replay_pending = self.recovery_started_at is not None
 
         except Exception as e:
             logging.error(f"Error enviando configuración: {e}")
@@ -663,17 +1070,28 @@ class OpenAIClient:
             # Eventos existentes
             if msg_type == 'response.created':
                 logging.info("Sesión create creada!")
+                with self.tool_lock:
+                    self.response_active = True
 
             elif msg_type == 'session.updated':
                 logging.info("msg_type updated recibido, ahora enviaré audio chunks")
+                self.session_ready = True
+                if self.timeline and self.timeline.mark_once('session_ready'):
+                    self.timeline.observe_between('session_setup', 'stasis_start', 'session_ready')
+                if self.replay_pending:
+                    self.replay_conversation(ws)
                 asyncio.run_coroutine_threadsafe(self.handle_session_updated(ws), self.loop)
 
             elif msg_type == 'response.audio.delta':
-                logging.info("++++++++++++response.audio.delta recibido++++++++++++")
+                hot_path_log.log('audio_delta', "++++++++++++response.audio.delta recibido++++++++++++")
                 self.handle_audio_delta(data)
 
             elif msg_type == 'input_audio_buffer.speech_started':
                 logging.info("*****************************speech_<START> Recibido***********************************************")
+                if self.filler:
+                    self.filler.stop()
+                if TOOL_CANCEL_ON_BARGE_IN and self.pending_function_calls:
+                    self.send_function_cancelled(ws, self.cancel_function_calls('barge_in'))
 
                 # Limpiar la cola de audio pendiente
                 while not self.incoming_audio_queue.empty():
@@ -685,21 +1103,46 @@ class OpenAIClient:
 
             elif msg_type == 'input_audio_buffer.speech_stopped':
                 logging.info("*****************************speech_<END> recibido***********************************************")
+                if self.timeline:
+                    self.timeline.speech_stopped()
+
+            elif msg_type == 'response.audio.done':
+                self.release_filler(data.get('response_id'))
 
             elif msg_type == 'response.done':
                 logging.info("Respuesta final recibida response.done")
+                self.release_filler((data.get('response') or {}).get('id'))
+                with self.tool_lock:
+                    self.response_active = False
+                self.maybe_request_response(ws)
 
             elif msg_type == 'response.audio_transcript.done':
                 transcript = data.get('transcript', '')
                 logging.info(f"Transcripción: {transcript}")
+                self.log_conversation_message('assistant', transcript)
+
+            elif msg_type == 'conversation.item.input_audio_transcription.completed':
+                transcript = data.get('transcript', '')
+                logging.info(f"Transcripción usuario: {transcript}")
+                self.log_conversation_message('user', transcript)
 
             # NUEVO: Eventos de function calling
+            elif msg_type == 'conversation.item.created':
+                item = data.get('item') or {}
+                if item.get('type') == 'function_call_output':
+                    self.acknowledged_outputs.add(item.get('call_id'))
+
             elif msg_type == 'response.function_call_arguments.delta':
                 self.handle_function_call_delta(data)
 
             elif msg_type == 'response.function_call_arguments.done':
                 self.handle_function_call_done(ws, data)
 
+            elif msg_type == 'response.output_item.added':
+                item = data.get('item', {})
+                if item.get('type') == 'function_call':
+                    self.function_names[item.get('call_id', '')] = item.get('name', '')
+
             elif msg_type == 'response.output_item.done':
                 self.handle_output_item_done(ws, data)
 
@@ -717,31 +1160,32 @@ class OpenAIClient:
         try:
             delta = data.get('delta', '')
             call_id = data.get('call_id', '')
-            name = data.get('name', '')
+            name = data.get('name') or self.function_names.get(call_id, '')
 
-            if not self.current_function_call:
-                self.current_function_call = {
-                    'call_id': call_id,
-                    'name': name,
-                    'arguments': ''
-                }
-                self.function_call_id = call_id
+            if call_id not in self.function_arguments:
+                self.function_arguments[call_id] = ''
                 logging.info(f"🔧 Function call iniciada: {name} (call_id: {call_id})")
 
-            self.current_function_call['arguments'] += delta
-            self.function_arguments_buffer += delta
+            self.function_arguments[call_id] += delta
 
             logging.debug(f"Function call delta recibido: {delta}")
 
+            if ENABLE_SPECULATIVE_TOOLS and call_id not in self.speculations:
+                self.maybe_start_speculation(call_id, name, self.function_arguments[call_id])
+
         except Exception as e:
             logging.error(f"Error manejando function call delta: {e}")
 
     def handle_function_call_done(self, ws, data):
-        """Maneja finalización de function call - EJECUTA LA FUNCIÓN EN THREAD SEPARADO"""
+        """Maneja finalización de function call - EJECUTA LA FUNCIÓN EN EL EVENT LOOP PRINCIPAL"""
         try:
             call_id = data.get('call_id', '')
-            name = data.get('name', '')
+            name = data.get('name') or self.function_names.pop(call_id, '')
             arguments_str = data.get('arguments', '{}')
+            self.function_arguments.pop(call_id, None)
+            with self.tool_lock:
+                self.pending_function_calls.add(call_id)
+            self.function_started[call_id] = time.time()
 
             logging.info(f"🔧 Function call completada: {name}")
             logging.info(f"   Arguments: {arguments_str}")
@@ -753,43 +1197,32 @@ class OpenAIClient:
                 logging.error(f"Error parseando argumentos: {arguments_str}")
                 arguments = {}
 
-            # EJECUTAR LA FUNCIÓN EN UN THREAD SEPARADO
-            # Esto evita bloquear el thread del WebSocket que maneja ping/pong
-            import threading
-
-            def execute_and_send():
-                """Ejecuta la función y envía el resultado - en thread separado"""
-                try:
-                    # Ejecutar la función (esto puede tomar 20-30 segundos)
-                    result = self.execute_function(name, arguments)
-
-                    logging.info(f"   Resultado: {result}")
-
-                    # Enviar resultado de vuelta a OpenAI
-                    self.send_function_result(ws, call_id, result)
-
-                    # Incrementar métrica
-                    self.metrics['function_calls'] += 1
-
-                    # Resetear estado
-                    self.current_function_call = None
-
-                except Exception as e:
-                    logging.error(f"Error ejecutando función en thread: {e}")
-                    # Enviar error a OpenAI
-                    error_result = {
-                        "error": str(e),
-                        "response": "Lo siento, ocurrió un error al procesar tu solicitud."
-                    }
-                    self.send_function_result(ws, call_id, error_result)
-
-            # Iniciar thread y retornar inmediatamente
-            # Esto permite que el WebSocket continúe procesando pings
-            thread = threading.Thread(target=execute_and_send, daemon=True)
-            thread.start()
-            logging.info(f"   ⚡ Función iniciada en thread separado (thread no bloqueará ping/pong)")
-            self.function_call_id = None
-            self.function_arguments_buffer = ""
+            self.conversation_log.append({
+                "type": "function_call",
+                "call_id": call_id,
+                "name": name,
+                "arguments": arguments_str
+            })
+            if self.timeline:
+                self.timeline.function_call_started(call_id, name)
+            if self.filler:
+                # El relleno espera a que termine el audio que el modelo dijo antes de la herramienta
+                self.filler_response_id = data.get('response_id')
+                self.filler.start(wait_for_audio=self.filler_response_id is not None)
+
+            # EJECUTAR LA FUNCIÓN COMO TAREA EN EL EVENT LOOP PRINCIPAL
+            # El thread del WebSocket retorna de inmediato y sigue atendiendo ping/pong;
+            # la consulta HTTP usa el pool compartido en vez de un thread por llamada
+            future = asyncio.run_coroutine_threadsafe(
+                self.run_function_call(call_id, name, arguments), self.loop
+            )
+            self.function_tasks[call_id] = future
+            future.add_done_callback(lambda _: (self.function_tasks.pop(call_id, None),
+                                                self.function_started.pop(call_id, None)))
+            logging.info(
+                f"   ⚡ Función programada en el event loop (no bloqueará ping/pong); "
+                f"{len(self.pending_function_calls)} en curso"
+            )
 
         except Exception as e:
             logging.error(f"Error manejando function call done: {e}")
@@ -809,59 +1242,189 @@ class OpenAIClient:
         except Exception as e:
             logging.error(f"Error manejando output item done: {e}")
 
-    def execute_function(self, name: str, arguments: dict) -> dict:
-        """Ejecuta la función solicitada por OpenAI - SINCRÓNICO SIMPLE"""
+    def maybe_start_speculation(self, call_id, name, partial_arguments):
+        """Lanza la consulta en cuanto los argumentos parciales contienen la pregunta completa"""
+        if name and name != 'consultar_mikrotik':
+            return
+        if 'consultar_mikrotik' not in self.tool_registry:
+            return
+        match = PREGUNTA_ARGUMENT_RE.search(partial_arguments)
+        if not match:
+            return
         try:
-            logging.info(f"⚙️ Ejecutando función: {name}")
+            pregunta = json.loads(f'"{match.group(1)}"')
+        except json.JSONDecodeError:
+            return
+        if not pregunta:
+            return
+
+        future = asyncio.run_coroutine_threadsafe(
+            self.execute_function('consultar_mikrotik', {'pregunta': pregunta}), self.loop
+        )
+        speculation = {
+            'pregunta': pregunta,
+            'future': future,
+            'started_at': time.time(),
+            'finished_at': None
+        }
+        future.add_done_callback(lambda _: speculation.update(finished_at=time.time()))
+        self.speculations[call_id] = speculation
+        self.metrics['speculations_started'] += 1
+        logging.info(f"🔮 Consulta especulativa iniciada (call_id: {call_id}): '{pregunta}'")
 
-            if name == "consultar_mikrotik":
-                # Extraer parámetros
-                pregunta = arguments.get('pregunta', '')
-                timeout = arguments.get('timeout', 60)
+    async def resolve_speculation(self, call_id, arguments):
+        """
+        Reconcilia la consulta especulativa con los argumentos finales
 
-                if not pregunta:
-                    return {
-                        "error": "No se proporcionó una pregunta",
-                        "response": "No recibí una pregunta para consultar."
-                    }
+        Returns:
+            dict con el resultado si la especulación coincide, o None si se descartó
+        """
+        speculation = self.speculations.pop(call_id, None)
+        if not speculation:
+            return None
 
-                # Ejecutar consulta a MikroTik API
-                logging.info(f"   Pregunta: '{pregunta}'")
-                logging.info(f"   Timeout: {timeout}s")
+        final_pregunta = arguments.get('pregunta', '')
+        same_question = normalize_question(final_pregunta) == normalize_question(speculation['pregunta'])
+        if not same_question or arguments.get('forzar_actualizacion', False):
+            if speculation['future'].cancel():
+                self.record_wasted_tool_time(time.time() - speculation['started_at'], 'speculation_miss')
+            self.metrics['speculation_misses'] += 1
+            COUNTERS.inc('speculative_tools_total', outcome='miss')
+            logging.info(f"🔮 Especulación descartada (call_id: {call_id}): argumentos finales distintos")
+            return None
 
-                if not self.mikrotik_client:
-                    return {
-                        "error": "MikroTik client not initialized",
-                        "response": "Lo siento, el sistema de consultas no está disponible en este momento."
-                    }
+        # Ahorro = lo que la consulta ya había avanzado cuando llegaron los argumentos finales
+        head_start = time.time() - speculation['started_at']
+        result = await asyncio.wrap_future(speculation['future'])
+        saved = min(head_start, speculation['finished_at'] - speculation['started_at'])
+        self.metrics['speculation_hits'] += 1
+        self.metrics['speculation_time_saved'] += saved
+        COUNTERS.inc('speculative_tools_total', outcome='hit')
+        LATENCY.observe('speculation_time_saved', saved)
+        logging.info(f"🔮 Especulación acertada (call_id: {call_id}), ahorro: {saved:.2f}s")
+        return result
+
+    async def run_function_call(self, call_id: str, name: str, arguments: dict):
+        """Ejecuta la función y envía el resultado - tarea en el event loop"""
+        try:
+            # Reutilizar la consulta especulativa si coincide; si no, ejecutar normalmente
+            result = await self.resolve_speculation(call_id, arguments)
+            if result is None:
+                # Ejecutar la función (esto puede tomar 20-30 segundos)
+                result = await self.execute_function(name, arguments)
 
-                # EJECUTAR DIRECTAMENTE - FORMA SIMPLE
-                # IMPORTANTE: Confiar en que el ping_interval/ping_timeout del WebSocket
-                # mantendrá la conexión viva. La API de requests tiene su propio timeout.
-                try:
-                    start_time = time.time()
-                    result = self.mikrotik_client.query(pregunta, timeout)
-                    duration = time.time() - start_time
-                    logging.info(f"   ✓ Resultado obtenido en {duration:.1f}s (success: {result.get('success', False)})")
+            logging.info(f"   Resultado: {result}")
 
-                    if result:
-                        logging.info(f"   Resultado: {result}")
+            if self.closing:
+                # La llamada terminó mientras la herramienta corría: no escribir a un socket muerto
+                self.record_wasted_tool_time(time.time() - self.function_started.get(call_id, time.time()), 'hangup')
+                return
 
-                    return result
+            # Enviar resultado de vuelta a OpenAI (por el socket vigente, pudo haber reconexión)
+            await asyncio.to_thread(self.send_function_result, self.current_ws, call_id, result)
 
-                except Exception as e:
-                    logging.error(f"   ✗ Error en consulta: {e}")
-                    return {
-                        "error": str(e),
-                        "response": "Error al consultar la información. Por favor, intenta nuevamente."
-                    }
+            # Incrementar métrica
+            self.metrics['function_calls'] += 1
+            if self.timeline:
+                self.timeline.function_call_finished(call_id, bool(result.get('success', True)))
 
-            else:
-                logging.error(f"Función desconocida: {name}")
-                return {
-                    "error": f"Función desconocida: {name}",
-                    "response": "Lo siento, no puedo procesar esa solicitud."
-                }
+        except asyncio.CancelledError:
+            logging.info(f"Function call {call_id} cancelada")
+            with self.tool_lock:
+                self.pending_function_calls.discard(call_id)
+            raise
+
+        except Exception as e:
+            logging.error(f"Error ejecutando función: {e}")
+            # Enviar error a OpenAI
+            error_result = {
+                "error": str(e),
+                "response": "Lo siento, ocurrió un error al procesar tu solicitud."
+            }
+            await asyncio.to_thread(self.send_function_result, self.current_ws, call_id, error_result)
+            if self.timeline:
+                self.timeline.function_call_finished(call_id, False)
+
+    def cancel_function_calls(self, reason: str):
+        """
+        Cancela las herramientas y especulaciones en vuelo de esta llamada
+
+        La cancelación llega hasta el motor de herramientas y aborta la petición
+        HTTP (salvo que otra llamada comparta la misma consulta en vuelo).
+
+        Returns:
+            call_ids que quedaron sin resultado
+        """
+        now = time.time()
+        for call_id, future in list(self.function_tasks.items()):
+            started = self.function_started.get(call_id, now)  # el done-callback lo borra al cancelar
+            if future.cancel():
+                self.metrics['tool_calls_cancelled'] += 1
+                COUNTERS.inc('tool_calls_cancelled_total', reason=reason)
+                self.record_wasted_tool_time(now - started, reason)
+                if self.timeline:
+                    self.timeline.mark('function_call_cancelled', call_id=call_id, reason=reason)
+        for speculation in list(self.speculations.values()):
+            if speculation['future'].cancel():
+                self.record_wasted_tool_time(now - speculation['started_at'], reason)
+        self.speculations.clear()
+
+        with self.tool_lock:
+            cancelled = set(self.pending_function_calls)
+            self.pending_function_calls.clear()
+        if cancelled:
+            logging.info(f"🛑 {len(cancelled)} herramienta(s) cancelada(s) por {reason}")
+        return cancelled
+
+    def record_wasted_tool_time(self, seconds: float, reason: str):
+        """Acumula el tiempo de herramienta cuyo resultado nadie va a usar"""
+        seconds = max(0.0, seconds)
+        self.metrics['tool_wasted_seconds'] += seconds
+        COUNTERS.inc('tool_wasted_seconds_total', seconds, reason=reason)
+
+    def send_function_cancelled(self, ws, call_ids):
+        """Cierra las llamadas canceladas por barge-in (el nuevo turno del usuario genera la respuesta)"""
+        for call_id in call_ids:
+            item = {
+                "type": "function_call_output",
+                "call_id": call_id,
+                "output": json.dumps({
+                    "cancelled": True,
+                    "response": "La consulta se canceló porque la persona volvió a hablar."
+                }, ensure_ascii=False)
+            }
+            self.conversation_log.append(item)
+            try:
+                ws.send(json.dumps({"type": "conversation.item.create", "item": item}))
+            except Exception as e:
+                logging.error(f"Error enviando cancelación de función: {e}")
+
+    async def execute_function(self, name: str, arguments: dict) -> dict:
+        """Ejecuta la función solicitada por OpenAI - ASÍNCRONO EN EL EVENT LOOP"""
+        try:
+            logging.info(f"⚙️ Ejecutando función: {name}")
+
+            # El registro despacha por nombre; las herramientas con backend pasan por el motor
+            # (límite de concurrencia, deadline y circuit breaker)
+            start_time = time.time()
+            result = await self.tool_registry.execute(name, arguments)
+            duration = time.time() - start_time
+            logging.info(f"   ✓ Resultado obtenido en {duration:.1f}s (success: {result.get('success', False)})")
+
+            if result:
+                logging.info(f"   Resultado: {result}")
+
+            return result
+
+        except asyncio.CancelledError:
+            raise
+
+        except asyncio.TimeoutError:
+            logging.error(f"   ✗ Deadline agotado ejecutando {name}")
+            return {
+                "error": "timeout",
+                "response": "La consulta tardó demasiado tiempo en responder. Por favor, intenta nuevamente."
+            }
 
         except Exception as e:
             logging.error(f"Error ejecutando función {name}: {e}")
@@ -882,57 +1445,114 @@ class OpenAIClient:
                     "output": json.dumps(result, ensure_ascii=False)
                 }
             }
-
+            # Registrar antes de enviar: si el socket está caído se entregará en el replay
+            self.conversation_log.append(function_output_event["item"])
+
+            with self.tool_lock:
+                self.pending_function_calls.discard(call_id)
+                self.response_create_deferred = True
+            if self.recovery_started_at is not None:
+                # Reconectando: el replay lo entrega junto con su llamada; enviarlo
+                # ahora a la sesión nueva lo duplicaría
+                logging.info(f"📥 Function result de {call_id} se entregará en el replay")
+                return
             ws.send(json.dumps(function_output_event))
             logging.info(f"📤 Function result enviado para call_id: {call_id}")
 
-            # Solicitar que el modelo continúe con la respuesta
-            response_create = {
-                "type": "response.create"
-            }
-            ws.send(json.dumps(response_create))
-            logging.info("📤 Trigger response.create enviado")
-
         except Exception as e:
             logging.error(f"Error enviando function result: {e}")
 
-    def send_function_error(self, ws, call_id: str, error_message: str):
-        """Envía un error de función a OpenAI"""
-        try:
-            function_output_event = {
-                "type": "conversation.item.create",
-                "item": {
-                    "type": "function_call_output",
-                    "call_id": call_id,
-                    "output": json.dumps({
-                        "error": error_message,
-                        "response": "Lo siento, ocurrió un error al procesar tu consulta."
-                    }, ensure_ascii=False)
-                }
-            }
-            ws.send(json.dumps(function_output_event))
+        # Solicitar que el modelo continúe cuando ya no falten resultados
+        self.maybe_request_response(ws)
 
-            # Trigger response para que el modelo explique el error
-            ws.send(json.dumps({"type": "response.create"}))
+    def maybe_request_response(self, ws):
+        """
+        Envía response.create si hay resultados entregados y ninguna llamada pendiente
 
+        Con llamadas paralelas cada resultado se envía apenas termina, pero el
+        modelo solo debe continuar cuando estén todos y cuando la respuesta que
+        las pidió ya haya terminado (response.done).
+        """
+        with self.tool_lock:
+            if not self.response_create_deferred or self.pending_function_calls or self.response_active:
+                return
+            self.response_create_deferred = False
+        try:
+            ws.send(json.dumps({"type": "response.create"}))
+            logging.info("📤 Trigger response.create enviado")
+            if self.timeline:
+                self.timeline.tool_response_requested()
         except Exception as e:
-            logging.error(f"Error enviando function error: {e}")
+            logging.error(f"Error enviando response.create: {e}")
+
+    def send_function_error(self, ws, call_id: str, error_message: str):
+        """Envía un error de función a OpenAI (el modelo lo explica al continuar)"""
+        self.send_function_result(ws, call_id, {
+            "error": error_message,
+            "response": "Lo siento, ocurrió un error al procesar tu consulta."
+        })
 
     async def handle_session_updated(self, ws):
-        """Maneja confirmación de configuración"""
+        """Maneja confirmación de configuración: arranca el envío de audio una sola vez"""
+        if self.uplink_task and not self.uplink_task.done():
+            logging.debug("Envío de audio a OpenAI ya activo")
+            return
+        self.outgoing_audio_queue.last_get_time = time.time()
+        self.uplink_task = asyncio.create_task(self.send_uplink_audio())
+        self.stall_monitor_task = asyncio.create_task(self.monitor_uplink_stall())
+
+    async def send_uplink_audio(self):
+        """Consume la cola de subida y envía el audio al WebSocket vigente"""
         try:
             while True:
                 audio_data = await self.outgoing_audio_queue.get()
-                self.send_audio_chunk_to_openai(ws, audio_data)
+                # ws.send es bloqueante: si el socket se atasca no debe congelar el event loop
+                await asyncio.to_thread(self.send_audio_chunk_to_openai, self.current_ws, audio_data)
 
         except asyncio.CancelledError:
             logging.info("Tarea de envío de audio a OpenAI cancelada.")
         except Exception as e:
             logging.error(f"Error después de configuración: {e}")
 
+    async def monitor_uplink_stall(self):
+        """Detecta cuando la cola de subida deja de drenarse y fuerza una reconexión"""
+        try:
+            while True:
+                await asyncio.sleep(1)
+                if not self.outgoing_audio_queue.is_stalled(OPENAI_UPLINK_STALL_TIMEOUT):
+                    continue
+
+                self.metrics['uplink_stalls'] += 1
+                logging.warning(
+                    f"Atasco en la subida de audio a OpenAI: "
+                    f"{json.dumps(self.outgoing_audio_queue.snapshot())}"
+                )
+                # Descartar el audio acumulado: reenviarlo tras recuperar sería habla obsoleta
+                self.outgoing_audio_queue.clear()
+                self.outgoing_audio_queue.last_get_time = time.time()
+
+                if OPENAI_RECONNECT_ON_STALL:
+                    await asyncio.to_thread(self.request_reconnect, "atasco en la subida de audio")
+
+        except asyncio.CancelledError:
+            pass
+
+    def request_reconnect(self, reason):
+        """Cierra el WebSocket actual para que run() abra uno nuevo"""
+        logging.warning(f"Solicitando reconexión con OpenAI: {reason}")
+        self.reconnect_requested = True
+        try:
+            if self.current_ws:
+                self.current_ws.close()
+        except Exception as e:
+            logging.error(f"Error cerrando WebSocket para reconexión: {e}")
+
     def send_audio_chunk_to_openai(self, ws, chunk):
         """Envía chunk de audio a OpenAI"""
         try:
+            if self.recovery_started_at is not None:
+                # Reconectando: el audio de este intervalo se descarta
+                return
             if ws.sock and ws.sock.connected:
                 audio_event = {
                     "event_id": f"audio_{int(time.time())}",
@@ -949,10 +1569,96 @@ class OpenAIClient:
         except Exception as e:
             logging.error(f"Error enviando chunk: {e}")
 
+    def log_conversation_message(self, role, text):
+        """Guarda un turno de la conversación en el log compacto para replay"""
+        if not text:
+            return
+        content_type = "input_text" if role == 'user' else "text"
+        self.conversation_log.append({
+            "type": "message",
+            "role": role,
+            "content": [{"type": content_type, "text": text}]
+        })
+
+    def replay_conversation(self, ws):
+        """Reproduce el log de conversación en la sesión nueva y cierra la recuperación"""
+        self.replay_pending = False
+        # Cada resultado va con su llamada y ninguno que la sesión ya confirmó se repite
+        items = self.conversation_log.replay_items(self.acknowledged_outputs)
+        try:
+            for item in items:
+                ws.send(json.dumps({"type": "conversation.item.create", "item": item}))
+
+            recovery_time = time.time() - self.recovery_started_at
+            self.metrics['reconnects_succeeded'] += 1
+            self.metrics['recovery_times'].append(round(recovery_time, 3))
+            logging.info(
+                f"🔄 Sesión OpenAI reanudada en {recovery_time:.2f}s "
+                f"({len(items)} de {len(self.conversation_log)} items reproducidos)"
+            )
+        except Exception as e:
+            logging.error(f"Error reproduciendo conversación tras reconexión: {e}")
+        finally:
+            self.recovery_started_at = None
+
+        # Si quedó un resultado de función sin respuesta, pedir al modelo que continúe
+        # (cuando no falten otros resultados); la sesión nueva no tiene respuestas en curso
+        with self.tool_lock:
+            self.response_active = False
+            if items and items[-1].get("type") == "function_call_output":
+                self.response_create_deferred = True
+        self.maybe_request_response(ws)
+
+    def close(self):
+        """
+        Cierra la sesión definitivamente (sin reconexión)
+
+        Puede bloquear hasta que termine el handshake de cierre del WebSocket:
+        desde el event loop debe llamarse con asyncio.to_thread.
+        """
+        self.closing = True
+        self.closed_event.set()
+        if self.filler:
+            self.filler.stop()
+        self.cancel_function_calls('hangup')
+        for task in (self.uplink_task, self.stall_monitor_task):
+            if task and not task.done():
+                try:
+                    # Las tareas viven en el event loop principal; este método puede correr en otro thread
+                    self.loop.call_soon_threadsafe(task.cancel)
+                except RuntimeError:
+                    pass  # Loop ya cerrado
+        try:
+            if self.current_ws:
+                self.current_ws.close()
+        except Exception as e:
+            logging.error(f"Error cerrando WebSocket de OpenAI: {e}")
+
+    def release_filler(self, response_id):
+        """Terminó el audio de la respuesta que pidió la herramienta: el relleno ya puede sonar"""
+        if self.filler and response_id is not None and response_id == self.filler_response_id:
+            self.filler.audio_finished()
+
     def handle_audio_delta(self, data):
         """Procesa chunks de audio recibidos"""
         try:
             audio_buffer = base64.b64decode(data['delta'])
+            self.metrics['chunks_received'] += 1
+            self.metrics['total_bytes_received'] += len(audio_buffer)
+            if self.timeline:
+                self.timeline.audio_delta()
+                tool_latency = self.timeline.tool_audio_delta(
+                    'tool_result_first_audio_shaped' if TOOL_RESULT_SHAPING else 'tool_result_first_audio_raw'
+                )
+                if tool_latency is not None:
+                    logging.info(f"⏱️ Primer audio tras resultado de herramienta: {tool_latency:.3f}s")
+            # Solo el audio de una respuesta posterior a la llamada a la herramienta corta el
+            # relleno; los deltas atrasados de la respuesta que la pidió no traen el resultado
+            response_id = data.get('response_id')
+            if (self.filler and self.filler.active
+                    and (response_id is None or response_id != self.filler_response_id)):
+                self.filler.stop()
+                logging.info("Audio de relleno detenido: llegó el audio de la respuesta")
             self.incoming_audio_queue.put_nowait(audio_buffer)
         except Exception as e:
             logging.error(f"Error procesando audio delta: {e}")
@@ -962,10 +1668,12 @@ class OpenAIClient:
         error_msg = data.get('error', {}).get('message', 'Error desconocido')
         error_code = data.get('error', {}).get('code', 'unknown')
         logging.error(f"Error de OpenAI [{error_code}]: {error_msg}")
+        COUNTERS.inc('openai_errors_total', code=error_code or 'unknown')
 
     def on_error(self, ws, error):
         """Maneja errores de WebSocket"""
         logging.error(f"Error de WebSocket: {error}")
+        COUNTERS.inc('openai_errors_total', code='websocket')
     
     def on_ping(self, ws, message):
         """Maneja mensajes ping del servidor"""
@@ -982,6 +1690,33 @@ class OpenAIClient:
         # Log de métricas finales
         if self.metrics['function_calls'] > 0:
             logging.info(f"📊 Total de function calls: {self.metrics['function_calls']}")
+        logging.info(
+            f"📊 Cola de subida: {json.dumps(self.outgoing_audio_queue.snapshot())} "
+            f"(atascos: {self.metrics['uplink_stalls']})"
+        )
+        if self.metrics['speculations_started'] > 0:
+            logging.info(
+                f"📊 Especulación: {self.metrics['speculation_hits']} aciertos, "
+                f"{self.metrics['speculation_misses']} descartes, "
+                f"ahorro total {self.metrics['speculation_time_saved']:.2f}s"
+            )
+        if self.metrics['tool_calls_cancelled'] > 0 or self.metrics['tool_wasted_seconds'] > 0:
+            logging.info(
+                f"📊 Herramientas canceladas: {self.metrics['tool_calls_cancelled']}, "
+                f"tiempo desperdiciado: {self.metrics['tool_wasted_seconds']:.2f}s"
+            )
+        if self.filler and self.filler.metrics['activations'] > 0:
+            logging.info(
+                f"📊 Relleno: {self.filler.metrics['activations']} activaciones, "
+                f"{self.filler.metrics['frames_played'] * 0.02:.1f}s reproducidos"
+            )
+        if self.metrics['reconnect_attempts'] > 0:
+            logging.info(
+                f"📊 Reconexiones: {self.metrics['reconnects_succeeded']} exitosas, "
+                f"{self.metrics['reconnects_failed']} fallidas, "
+                f"{self.metrics['reconnect_attempts']} intentos, "
+                f"tiempos de recuperación: {self.metrics['recovery_times']}"
+            )
 
 
 
@@ -1036,10 +1771,18 @@ class OpenAIHandler:
 
                 # Si el buffer está bajo, esperar más datos
                 if len(self.audio_buffer) < self.rtp_packet_size:
+                    # Mientras corre una herramienta y no hay audio del modelo, reproducir relleno
+                    filler = openai_client.filler
+                    filler_active = filler is not None and filler.active
+                    if filler_active and openai_client.incoming_audio_queue.empty():
+                        frame = filler.next_frame()
+                        if frame:
+                            self.audio_buffer.extend(frame)
+                            continue
                     try:
                         new_data = await asyncio.wait_for(
                             openai_client.incoming_audio_queue.get(),
-                            timeout=0.5
+                            timeout=self.packet_interval if filler_active else 0.5
                         )
                         self.audio_buffer.extend(new_data)
                     except asyncio.TimeoutError:
@@ -1090,6 +1833,8 @@ class OpenAIHandler:
             rtp_packet = bytes(rtp_header) + payload
             
             await self.rtp_handler.send_rtp_packet(rtp_packet)
+            if self.rtp_handler.timeline:
+                self.rtp_handler.timeline.rtp_sent()
             
             # Incrementar secuencia y timestamp
             self.sequence_number = (self.sequence_number + 1) & 0xFFFF
@@ -1121,21 +1866,93 @@ class AudioConfig:
 
 
 
+def worker_env(index):
+    """
+    Variables propias de cada worker: archivo de log y puerto de métricas
+    separados, y su parte de los límites de admisión (los límites configurados
+    son del host; el reparto al worker con menos llamadas los mantiene parejos)
+    """
+    base, ext = os.path.splitext(LOG_FILE_PATH)
+    env = {
+        'LOG_FILE_PATH': f"{base}.worker{index}{ext}",
+        'ADMISSION_SOFT_LIMIT': str(max(1, ADMISSION_SOFT_LIMIT // INBOUND_WORKERS)),
+        'ADMISSION_HARD_LIMIT': str(max(1, ADMISSION_HARD_LIMIT // INBOUND_WORKERS)),
+        'ADMISSION_MAX_QUEUE': str(max(1, ADMISSION_MAX_QUEUE // INBOUND_WORKERS))
+    }
+    if LOG_JSONL_PATH:
+        base, ext = os.path.splitext(LOG_JSONL_PATH)
+        env['LOG_JSONL_PATH'] = f"{base}.worker{index}{ext}"
+    if METRICS_PORT:
+        env['METRICS_PORT'] = str(int(METRICS_PORT) + 1 + index)
+    return env
+
+
 class AsteriskApp:
+    # Este proceso ve todas las llamadas de openai-app: puede adoptarlas y barrer huérfanos
+    owns_all_calls = True
+    # Este proceso atiende llamadas (sesiones, RTP, OpenAI); el supervisor solo las reparte
+    handles_calls = True
+    # Este proceso corre el barrido periódico de huérfanos (en modo multiproceso, el supervisor)
+    sweeps_orphans = True
+
     def __init__(self):
         """Inicializa la aplicación ARI con todos los componentes necesarios"""
         # Configuración de conexión ARI
         self.base_url = f'http://{ASTERISK_HOST}:{ASTERISK_PORT}/ari'
         self.username = ASTERISK_USERNAME
         self.password = ASTERISK_PASSWORD
+
+        # Cliente REST de ARI compartido: pool keep-alive, auth y timeouts preconfigurados
+        self.ari = ARIClient(
+            self.base_url,
+            self.username,
+            self.password,
+            pool_size=ARI_POOL_SIZE,
+            timeout=ARI_REQUEST_TIMEOUT
+        )
         
        
         
         # Gestión de estado
-        self.active_channels = set()
-        self.rtp_handlers = {}
-        self.active_tasks = {}
-        self.bridges = {}
+        # Canal original -> CallSession (dueña de todos los recursos de la llamada)
+        self.sessions = {}
+        # Índice inverso: canal External Media / bridge -> canal original
+        self.resource_owner = {}
+        self.sweeper_task = None
+
+        # Bridges en reserva (hot standby): listos para recibir los canales de una llamada
+        self.bridge_pool = deque()
+        self.pool_bridge_ids = set()  # en reserva o creándose: el barrido no los toca
+        self.bridge_pool_filling = False
+
+        # Introspección de canales: una sola ronda concurrente por canal, cacheada hasta StasisEnd
+        self.channel_details = {}
+        self.introspection = SingleFlight(name='ari_introspection')
+
+        # Control de admisión (None = se aceptan todas las llamadas)
+        self.admission = None
+        self.queued_calls = {}  # channel_id -> tarea que espera turno
+        if ADMISSION_CONTROL_ENABLED:
+            self.admission = AdmissionController(
+                active_calls=lambda: len(self.sessions),
+                loop_lag=lambda: self.loop_monitor.last_lag,
+                error_count=lambda: sum(
+                    value for (name, _), value in COUNTERS.snapshot().items() if name == 'openai_errors_total'
+                ),
+                soft_limit=ADMISSION_SOFT_LIMIT,
+                hard_limit=ADMISSION_HARD_LIMIT,
+                max_queue=ADMISSION_MAX_QUEUE,
+                queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+                max_loop_lag=ADMISSION_MAX_LOOP_LAG,
+                max_error_rate=ADMISSION_MAX_OPENAI_ERRORS
+            )
+
+        # Eventos ARI: una cola y un worker por canal (orden por canal, canales en paralelo)
+        self.dispatcher = ChannelEventDispatcher(self.process_event)
+
+        # Observabilidad
+        self.loop_monitor = LoopLagMonitor()
+        self.metrics_server = None
         
         # Configuración
         self.config = {
@@ -1143,239 +1960,480 @@ class AsteriskApp:
             'default_codec': 'ulaw'
         }
 
+    def index_resource(self, channel_id, kind, value):
+        """Registra un recurso creado para la llamada (antes de crearlo en Asterisk, así el barrido nunca lo ve sin dueño)"""
+        session = self.sessions.get(channel_id)
+        if session is None:
+            return
+        setattr(session, kind, value)
+        if kind in ARI_RESOURCES:
+            self.resource_owner[value] = channel_id
+
+    async def close_session(self, channel_id, reason='hangup'):
+        """
+        Saca la llamada del índice y libera todos sus recursos en orden
+
+        Returns:
+            CallSession cerrada, o None si la llamada ya no existía
+        """
+        session = self.sessions.pop(channel_id, None)
+        if session is None:
+            return None
+        for resource in session.ari_resources():
+            self.resource_owner.pop(resource, None)
+        await session.close(reason)
+        self.channel_details.pop(channel_id, None)
+        if self.admission:
+            await self.admission.release()
+        return session
+
+    def open_session(self, channel_id):
+        """Crea la sesión y la timeline de una llamada admitida"""
+        timeline = CallTimeline(channel_id)
+        timeline.mark('stasis_start')
+        session = CallSession(channel_id, self.ari, timeline=timeline, step_timeout=CALL_TEARDOWN_STEP_TIMEOUT)
+        self.sessions[channel_id] = session
+        return session
+
+    async def queue_call(self, channel):
+        """Aviso de espera y música mientras la llamada aguarda turno; al entrar sigue el setup normal"""
+        channel_id = channel['id']
+        bind_channel(channel_id)
+        playback = {}
+        hold = asyncio.create_task(self.play_hold(channel_id, playback))
+        try:
+            admitted = await self.admission.wait_turn(channel_id)
+        finally:
+            hold.cancel()
+        if self.queued_calls.pop(channel_id, None) is None:
+            return  # Colgó mientras esperaba (StasisEnd ya lo contó)
+        if not admitted:
+            await self.stop_hold(channel_id, playback)
+            await self.shed_call(channel_id, 'queue_timeout')
+            return
+
+        logging.info(f"Llamada {channel_id} admitida desde la cola")
+        # La sesión cuenta como activa desde ya, antes de que el worker haga el setup
+        self.open_session(channel_id)
+        await self.stop_hold(channel_id, playback)
+        self.dispatcher.dispatch({'type': 'CallAdmitted', 'channel': channel})
+
+    async def play_hold(self, channel_id, playback):
+        """Aviso de espera y, cuando termina, música en espera (el aviso no queda tapado)"""
+        try:
+            response = await self.ari.post(f"/channels/{channel_id}/play", json={"media": ADMISSION_HOLD_PROMPT})
+            playback['id'] = (response.data or {}).get('id') if response.ok else None
+            await asyncio.sleep(ADMISSION_HOLD_PROMPT_SECONDS)
+            playback['id'] = None
+            await self.ari.post(f"/channels/{channel_id}/moh")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.warning(f"No se pudo reproducir el aviso de espera: {e}")
+
+    async def stop_hold(self, channel_id, playback):
+        """Corta el aviso si sigue sonando y la música en espera si ya empezó"""
+        try:
+            if playback.get('id'):
+                await self.ari.delete(f"/playbacks/{playback['id']}")
+            await self.ari.delete(f"/channels/{channel_id}/moh")
+        except Exception as e:
+            logging.debug(f"Error deteniendo la espera: {e}")
+
+    async def shed_call(self, channel_id, reason):
+        """Rechaza la llamada: aviso de saturación y colgado con causa 'congestion'"""
+        logging.warning(f"Llamada {channel_id} rechazada por sobrecarga ({reason})")
+        try:
+            await self.ari.post(f"/channels/{channel_id}/play", json={"media": ADMISSION_BUSY_PROMPT})
+            await asyncio.sleep(ADMISSION_BUSY_PROMPT_SECONDS)
+            await self.ari.delete(f"/channels/{channel_id}", params={'reason': 'congestion'})
+        except Exception as e:
+            logging.error(f"Error rechazando llamada {channel_id}: {e}")
+
+    async def list_channels_and_bridges(self):
+        """
+        Estado actual de Asterisk en una sola ronda
+
+        Returns:
+            tuple: (canales, bridges) como listas, o (None, None) si ARI falla
+        """
+        channels, bridges = await asyncio.gather(self.ari.get("/channels"), self.ari.get("/bridges"))
+        if channels.status != 200 or bridges.status != 200:
+            logging.error(f"No se pudo leer el estado de Asterisk: /channels {channels.status}, /bridges {bridges.status}")
+            return None, None
+        return channels.data or [], bridges.data or []
+
+    async def sweep_orphans(self, channels=None, bridges=None):
+        """
+        Cierra canales External Media/UnicastRTP y bridges de openai-app que no
+        pertenecen a ninguna llamada viva (p. ej. tras un reinicio o un teardown fallido)
+
+        Args:
+            channels, bridges: Listados ya obtenidos (None = consultarlos)
+
+        Returns:
+            int: Recursos cerrados
+        """
+        swept = 0
+        if channels is None or bridges is None:
+            channels, bridges = await self.list_channels_and_bridges()
+            if channels is None:
+                return swept
+        owned = await self.owned_resources(time.monotonic())
+        if owned is None:
+            return swept
+        for channel in channels:
+            channel_id = channel.get('id', '')
+            name = channel.get('name', '')
+            dialplan = channel.get('dialplan', {})
+            # Solo canales nuestros: External Media con nuestro prefijo o UnicastRTP de openai-app
+            ours = channel_id.startswith('external_') or (
+                name.startswith('UnicastRTP/')
+                and 'openai-app' in (dialplan.get('app_name'), dialplan.get('app_data'))
+            )
+            if not ours:
+                continue
+            if channel_id in owned or name in owned:
+                continue
+            await self.cleanup_channel(channel_id)
+            COUNTERS.inc('ari_orphans_swept_total', kind='channel')
+            logging.info(f"Canal huérfano cerrado: {channel_id} ({name})")
+            swept += 1
+        for bridge in bridges:
+            bridge_id = bridge.get('id', '')
+            if bridge_id.startswith(BRIDGE_ID_PREFIX) and bridge_id not in owned:
+                await self.cleanup_bridge(bridge_id)
+                COUNTERS.inc('ari_orphans_swept_total', kind='bridge')
+                logging.info(f"Bridge huérfano eliminado: {bridge_id}")
+                swept += 1
+        return swept
+
+    async def owned_resources(self, listed_at):
+        """
+        Canales y bridges con dueño: de una llamada viva o en la reserva de bridges
+
+        Args:
+            listed_at: time.monotonic() en que terminó el listado de Asterisk
+
+        Returns:
+            set de IDs/nombres, o None si no se puede saber (no se barre)
+        """
+        return set(self.resource_owner) | self.pool_bridge_ids
+
+    async def run_orphan_sweeper(self):
+        """Barrido de baja frecuencia que reemplaza el listado de canales en cada colgado"""
+        while True:
+            await asyncio.sleep(ARI_ORPHAN_SWEEP_INTERVAL)
+            try:
+                swept = await self.sweep_orphans()
+                if swept:
+                    logging.warning(f"Barrido de huérfanos: {swept} recursos cerrados")
+            except Exception as e:
+                logging.error(f"Error en barrido de huérfanos: {e}")
+
+    async def reconcile(self):
+        """
+        Compara las llamadas que creemos vivas con /channels y /bridges y
+        ejecuta el plan de utils/ari_recovery.py: los eventos perdidos se
+        reinyectan en el despachador, los bridges incompletos se re-enganchan
+        y, si este proceso ve todas las llamadas, se barren los huérfanos
+
+        Returns:
+            dict: Acciones realizadas por tipo
+        """
+        actions = {'ended': 0, 'media_lost': 0, 'reattached': 0, 'adopted': 0, 'swept': 0}
+        channel_list, bridge_list = await self.list_channels_and_bridges()
+        if channel_list is None:
+            return actions
+        # Un worker solo ve sus llamadas: adoptar o barrer tocaría las de otros
+        plan = plan_reconcile(dict(self.sessions), channel_list, bridge_list,
+                              queued=self.queued_calls, adopt=self.owns_all_calls)
+
+        for channel_id in plan.ended:
+            self.dispatcher.dispatch({'type': 'StasisEnd', 'channel': {'id': channel_id}})
+        for external_channel in plan.media_lost:
+            self.dispatcher.dispatch({'type': 'StasisEnd', 'channel': {'id': external_channel}})
+        for item in plan.reattach:
+            if await self.reattach_bridge(item.session, item.exists, item.missing):
+                actions['reattached'] += 1
+        for channel in plan.adopt:
+            logging.warning(f"Adoptando llamada sin StasisStart recibido: {channel.get('id')}")
+            self.dispatcher.dispatch({'type': 'StasisStart', 'channel': channel})
+        actions.update(ended=len(plan.ended), media_lost=len(plan.media_lost), adopted=len(plan.adopt))
+
+        if self.owns_all_calls:
+            actions['swept'] = await self.sweep_orphans(channel_list, bridge_list)
+        for action, count in actions.items():
+            if count:
+                COUNTERS.inc('ari_reconcile_total', count, action=action)
+        return actions
+
+    async def reattach_bridge(self, session, exists, missing):
+        """Recrea el bridge de una llamada viva (si no existe) y añade los canales que le faltan"""
+        try:
+            if not exists:
+                await self.post_bridge(session.bridge, f"OpenAI Bridge {session.channel_id}")
+            response = await self.ari.post(
+                f"/bridges/{session.bridge}/addChannel", json={"channel": ",".join(missing)}
+            )
+            if response.status not in [200, 204]:
+                raise Exception(f"{response.status} - {response.text}")
+            logging.warning(f"Bridge {session.bridge} re-enganchado con {', '.join(missing)}")
+            return True
+        except Exception as e:
+            logging.error(f"No se pudo re-enganchar el bridge {session.bridge}: {e}")
+            return False
+
+    async def recover(self, disconnected_at):
+        """Reconciliación tras (re)conectar; mide cuánto tardó el servicio en volver a estar consistente"""
+        try:
+            actions = await self.reconcile()
+            logging.info(f"Reconciliación con Asterisk: {actions}")
+        except Exception as e:
+            logging.error(f"Error en reconciliación con Asterisk: {e}")
+            logging.exception("Detalles del error:")
+            return
+        if disconnected_at is not None:
+            recovery = time.monotonic() - disconnected_at
+            LATENCY.observe('ari_recovery', recovery)
+            logging.info(f"⏱️ Recuperación ARI completa {recovery:.3f}s después de la desconexión")
+
     async def get_channel_info(self, channel_id):
         """
         Obtiene información detallada sobre un canal de Asterisk, incluyendo datos RTP.
-        
+
         Args:
             channel_id (str): El identificador único del canal
-            
+
         Returns:
             dict: Información completa del canal con datos RTP, o None si hay error
         """
-        try:
-            # 1. Obtener información básica del canal
-            url = f"{self.base_url}/channels/{channel_id}"
-            channel_data = None
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    url,
-                    auth=aiohttp.BasicAuth(self.username, self.password)
-                ) as response:
-                    if response.status == 200:
-                        channel_data = await response.json()
-                        # logging.debug(
-                        #     f"Información básica del canal {channel_id}: "
-                        #     f"{json.dumps(channel_data, indent=2)}"
-                        # )
-                    else:
-                        error_text = await response.text()
-                        logging.error(
-                            f"Error obteniendo información del canal {channel_id}: "
-                            f"Status {response.status} - {error_text}"
-                        )
-                        return None
-
-                # 2. Si tenemos datos básicos, obtener información RTP
-                # Variables RTP a consultar
-                rtp_variables = {
-                    'CHANNEL(rtp,remote_address)': 'rtp_remote_address',
-                    'CHANNEL(rtp,remote_port)': 'rtp_remote_port',
-                    'CHANNEL(peerip)': 'peer_ip',
-                    'CHANNEL(rtpaddress)': 'rtp_address',
-                    'CHANNEL(rtpdest)': 'rtp_dest',
-                    'CHANNEL(rtpsource)': 'rtp_source',
-                    'CHANNEL(rtp,destport)': 'rtp_dest_port',
-                    'CHANNEL(rtp,port)': 'rtp_local_port',
-                    'CHANNEL(rtp,srcport)': 'rtp_src_port'
-                }
-                # if channel_data and 'channelInfo' in channel_data:
-                #     logging.info(f"Información RTP completa para canal {channel_id}:")
-                #     logging.info(f"Remote Address: {channel_data['channelInfo'].get('rtp_remote_address')}")
-                #     logging.info(f"Remote Port: {channel_data['channelInfo'].get('rtp_remote_port')}")
-                #     logging.info(f"Peer IP: {channel_data['channelInfo'].get('peer_ip')}")
-                #     logging.info(f"RTP Destination: {channel_data['channelInfo'].get('rtp_dest')}")
-                #     logging.info(f"RTP Source: {channel_data['channelInfo'].get('rtp_source')}")
-                #     logging.info(f"RTP Dest Port: {channel_data['channelInfo'].get('rtp_dest_port')}")
-                #     logging.info(f"RTP Local Port: {channel_data['channelInfo'].get('rtp_local_port')}")
-                #     logging.info(f"RTP Source Port: {channel_data['channelInfo'].get('rtp_src_port')}")
-                if channel_data:
-                    # Obtener cada variable RTP
-                    for variable, key in rtp_variables.items():
-                        try:
-                            var_url = f"{self.base_url}/channels/{channel_id}/variable"
-                            async with session.get(
-                                var_url,
-                                params={'variable': variable},
-                                auth=aiohttp.BasicAuth(self.username, self.password)
-                            ) as var_response:
-                                if var_response.status == 200:
-                                    var_data = await var_response.json()
-                                    if 'value' in var_data and var_data['value']:
-                                        if 'channelInfo' not in channel_data:
-                                            channel_data['channelInfo'] = {}
-                                        channel_data['channelInfo'][key] = var_data['value']
-                                        # logging.debug(
-                                        #     f"Variable RTP obtenida - {key}: {var_data['value']}"
-                                        # )
-                        except Exception as var_error:
-                            logging.warning(
-                                f"Error obteniendo variable RTP {variable}: {var_error}"
-                            )
-                            continue
-
-                    # 3. Detectar tipo de canal y obtener información específica
-                    if 'name' in channel_data:
-                        channel_name = channel_data['name']
-                        if channel_name.startswith('UnicastRTP/'):
-                            # Es un canal RTP, extraer información adicional
-                            try:
-                                rtp_info = channel_name.split('/')[1].split('-')[0]
-                                address, port = rtp_info.split(':')
-                                channel_data['channelInfo']['local_address'] = address
-                                channel_data['channelInfo']['local_port'] = int(port)
-                            except Exception as e:
-                                logging.warning(f"Error parseando información RTP: {e}")
-
-                    # logging.debug(
-                    #     f"Información completa del canal {channel_id}: "
-                    #     f"{json.dumps(channel_data, indent=2)}"
-                    # )
-                    return channel_data
+        details = await self.introspect_channel(channel_id)
+        return details['channel'] if details else None
 
-        except aiohttp.ClientError as e:
-            logging.error(f"Error de conexión al obtener información del canal: {e}")
-            return None
-        except Exception as e:
-            logging.error(f"Error inesperado en get_channel_info: {e}")
-            logging.exception("Detalles del error:")
-            return None
-        
     async def get_channel_codec(self, channel_id):
         """
         Detecta el codec de audio utilizado por un canal.
-        
-        Esta función obtiene el formato de audio configurado en el canal, verificando
-        primero las variables específicas de codec y luego las variables de formato
-        de audio generales.
-        
+
         Args:
             channel_id (str): El identificador único del canal
-            
+
         Returns:
-            str: El codec detectado ('ulaw' o 'alaw' por defecto), o 'ulaw' si no se puede determinar
+            str: El codec detectado ('ulaw' o 'alaw'), o 'ulaw' si no se puede determinar
         """
+        details = await self.introspect_channel(channel_id)
+        return details['codec'] if details else 'ulaw'
+
+    async def introspect_channel(self, channel_id):
+        """
+        Consulta el canal y sus variables una sola vez por llamada
+
+        Las peticiones (canal + variables usadas) salen en paralelo con
+        asyncio.gather; llamadas concurrentes para el mismo canal comparten la
+        misma ronda y el resultado queda cacheado hasta StasisEnd.
+
+        Returns:
+            dict {'channel': datos del canal con channelInfo, 'codec': str}, o None si hay error
+        """
+        cached = self.channel_details.get(channel_id)
+        if cached:
+            COUNTERS.inc('ari_introspection_total', result='cached')
+            return cached
+
+        details, shared = await self.introspection.do(
+            channel_id, lambda: self.fetch_channel_details(channel_id)
+        )
+        COUNTERS.inc('ari_introspection_total', result='coalesced' if shared else 'fetched')
+        if details and channel_id in self.sessions:
+            self.channel_details[channel_id] = details
+        return details
+
+    async def fetch_channel_details(self, channel_id):
+        """Una ronda concurrente de peticiones ARI para describir el canal"""
+        durations = []
+
+        async def timed_get(path, params=None):
+            started = time.perf_counter()
+            try:
+                return await self.ari.get(path, params=params)
+            finally:
+                durations.append(time.perf_counter() - started)
+
+        async def read_variable(variable):
+            try:
+                response = await timed_get(f"/channels/{channel_id}/variable", {'variable': variable})
+                if response.status == 200:
+                    return (response.data or {}).get('value') or None
+            except Exception as var_error:
+                logging.warning(f"Error obteniendo variable {variable}: {var_error}")
+            return None
+
         try:
-            # Primero intentamos obtener el codec de las variables del canal
-            variables_to_check = [
-                'CHANNEL(audioreadformat)',
-                'CHANNEL(audiowriteformat)',
-                'CHANNEL(format)'
-            ]
-            
-            for variable in variables_to_check:
-                # Construimos la URL para obtener la variable
-                url = f"{self.base_url}/channels/{channel_id}/variable"
-                params = {'variable': variable}
-                
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(
-                        url,
-                        params=params,
-                        auth=aiohttp.BasicAuth(self.username, self.password)
-                    ) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            codec = data.get('value', '').lower()
-                            
-                            # Verificamos si es un codec válido
-                            if codec in ['ulaw', 'alaw']:
-                                logging.info(
-                                    f"Codec detectado para canal {channel_id}: {codec} "
-                                    f"(de variable {variable})"
-                                )
-                                return codec
-                                
-            # Si no pudimos detectar el codec, usamos ulaw por defecto
-            logging.warning(
-                f"No se pudo detectar el codec para canal {channel_id}, "
-                "usando ulaw por defecto"
+            started = time.perf_counter()
+            # Con latching el destino RTP sale de los paquetes: solo se consulta el codec
+            info_variables = [] if RTP_LATCHING else list(CHANNEL_INFO_VARIABLES)
+            variables = info_variables + list(CODEC_VARIABLES)
+            channel_response, *values = await asyncio.gather(
+                timed_get(f"/channels/{channel_id}"),
+                *(read_variable(variable) for variable in variables)
             )
-            return 'ulaw'
-            
+            elapsed = time.perf_counter() - started
+
+            if channel_response.status != 200:
+                logging.error(
+                    f"Error obteniendo información del canal {channel_id}: "
+                    f"Status {channel_response.status} - {channel_response.text}"
+                )
+                return None
+
+            channel_data = channel_response.data
+            values = dict(zip(variables, values))
+            channel_info = channel_data.setdefault('channelInfo', {})
+            for variable, key in CHANNEL_INFO_VARIABLES.items():
+                if values.get(variable):
+                    channel_info[key] = values[variable]
+
+            # Canal RTP: la dirección local viene en el nombre
+            channel_name = channel_data.get('name', '')
+            if channel_name.startswith('UnicastRTP/'):
+                try:
+                    rtp_info = channel_name.split('/')[1].split('-')[0]
+                    address, port = rtp_info.split(':')
+                    channel_info['local_address'] = address
+                    channel_info['local_port'] = int(port)
+                except Exception as e:
+                    logging.warning(f"Error parseando información RTP: {e}")
+
+            # Codec: el primer formato válido en orden de preferencia
+            codec = None
+            for variable in CODEC_VARIABLES:
+                value = (values[variable] or '').lower()
+                if value in ['ulaw', 'alaw']:
+                    codec = value
+                    logging.info(f"Codec detectado para canal {channel_id}: {codec} (de variable {variable})")
+                    break
+            if codec is None:
+                logging.warning(f"No se pudo detectar el codec para canal {channel_id}, usando ulaw por defecto")
+                codec = 'ulaw'
+
+            # Ahorro frente a hacer las mismas peticiones una tras otra
+            sequential = sum(durations)
+            saved = max(0.0, sequential - elapsed)
+            LATENCY.observe('channel_introspection', elapsed)
+            COUNTERS.inc('ari_introspection_saved_seconds_total', saved)
+            logging.info(
+                f"Introspección del canal {channel_id}: {len(durations)} peticiones en {elapsed:.3f}s "
+                f"(en serie: {sequential:.3f}s, ahorro: {saved:.3f}s)"
+            )
+            return {'channel': channel_data, 'codec': codec}
+
         except aiohttp.ClientError as e:
-            # Error de conexión HTTP
-            logging.error(f"Error de conexión al detectar codec: {e}")
-            return 'ulaw'
+            logging.error(f"Error de conexión al obtener información del canal: {e}")
+            return None
         except Exception as e:
-            # Otros errores inesperados
-            logging.error(f"Error inesperado en get_channel_codec: {e}")
+            logging.error(f"Error inesperado en introspección del canal {channel_id}: {e}")
             logging.exception("Detalles del error:")
-            return 'ulaw'
+            return None
+
+    async def post_bridge(self, bridge_id, name):
+        """Crea un bridge mixing en Asterisk"""
+        create_data = {
+            "type": "mixing",
+            "bridgeId": bridge_id,
+            "name": name
+        }
+        logging.debug(f"Creando bridge con datos: {json.dumps(create_data)}")
+        response = await self.ari.post("/bridges", json=create_data)
+        if response.status not in [200, 204]:  # Aceptar 204 como éxito
+            raise Exception(f"Error creando bridge: {response.status} - {response.text}")
+        logging.info(f"Bridge {bridge_id} creado exitosamente")
 
-    async def setup_bridge(self, channel_id, external_channel_id):
+    async def create_bridge(self, channel_id):
         """
-        Configura un bridge para conectar el canal original con el canal External Media
+        Obtiene un bridge para la llamada: de la reserva si hay, si no lo crea
+
+        Se lanza al inicio del setup, en paralelo con la introspección y la
+        creación del canal External Media.
+
+        Returns:
+            tuple: (bridge_id, True si salió de la reserva)
         """
+        if self.bridge_pool:
+            bridge_id = self.bridge_pool.popleft()
+            self.pool_bridge_ids.discard(bridge_id)
+            self.index_resource(channel_id, 'bridge', bridge_id)
+            COUNTERS.inc('bridge_pool_total', result='hit')
+            asyncio.create_task(self.refill_bridge_pool())
+            logging.info(f"Bridge {bridge_id} tomado de la reserva")
+            return bridge_id, True
+        if BRIDGE_POOL_SIZE > 0:
+            COUNTERS.inc('bridge_pool_total', result='miss')
+
+        bridge_id = f"{BRIDGE_ID_PREFIX}{channel_id}"
+        logging.info(f"Iniciando creación de bridge {bridge_id}")
+        self.index_resource(channel_id, 'bridge', bridge_id)
+        await self.post_bridge(bridge_id, f"OpenAI Bridge {channel_id}")
+        return bridge_id, False
+
+    async def refill_bridge_pool(self):
+        """Completa la reserva de bridges hasta BRIDGE_POOL_SIZE (una sola tarea a la vez)"""
+        if BRIDGE_POOL_SIZE <= 0 or self.bridge_pool_filling:
+            return
+        self.bridge_pool_filling = True
         try:
-            bridge_id = f"bridge_{channel_id}"
-            logging.info(f"Iniciando creación de bridge {bridge_id}")
-            
-            # 1. Crear el bridge
-            async with aiohttp.ClientSession() as session:
-                create_url = f"{self.base_url}/bridges"
-                create_data = {
-                    "type": "mixing",
-                    "bridgeId": bridge_id,
-                    "name": f"OpenAI Bridge {channel_id}"
-                }
-                
-                logging.debug(f"Creando bridge con datos: {json.dumps(create_data)}")
-                async with session.post(
-                    create_url,
-                    json=create_data,
-                    auth=aiohttp.BasicAuth(self.username, self.password)
-                ) as response:
-                    if response.status not in [200, 204]:  # Aceptar 204 como éxito
-                        response_text = await response.text()
-                        raise Exception(f"Error creando bridge: {response.status} - {response_text}")
-                        
-                    logging.info(f"Bridge {bridge_id} creado exitosamente")
-                    
-                # 2. Añadir el canal original
-                logging.info(f"Añadiendo canal original {channel_id} al bridge")
-                add_url = f"{self.base_url}/bridges/{bridge_id}/addChannel"
-                async with session.post(
-                    add_url,
-                    json={"channel": channel_id},
-                    auth=aiohttp.BasicAuth(self.username, self.password)
-                ) as response:
-                    if response.status not in [200, 204]:  # Aceptar 204 como éxito
-                        response_text = await response.text()
-                        raise Exception(
-                            f"Error añadiendo canal {channel_id} al bridge: "
-                            f"{response.status} - {response_text}"
-                        )
-                    logging.info(f"Canal {channel_id} añadido al bridge exitosamente")
-                    
-                # 3. Añadir el canal External Media
-                logging.info(f"Añadiendo canal External Media {external_channel_id} al bridge")
-                async with session.post(
-                    add_url,
-                    json={"channel": external_channel_id},
-                    auth=aiohttp.BasicAuth(self.username, self.password)
-                ) as response:
-                    if response.status not in [200, 204]:  # Aceptar 204 como éxito
-                        response_text = await response.text()
-                        raise Exception(
-                            f"Error añadiendo canal External Media al bridge: "
-                            f"{response.status} - {response_text}"
-                        )
-                    logging.info(f"Canal External Media añadido al bridge exitosamente")
-                    
-            # 4. Guardar referencia al bridge y retornar éxito
-            self.bridges[channel_id] = bridge_id
+            while len(self.bridge_pool) < BRIDGE_POOL_SIZE:
+                bridge_id = f"{BRIDGE_ID_PREFIX}pool_{uuid.uuid4().hex[:12]}"
+                self.pool_bridge_ids.add(bridge_id)
+                try:
+                    await self.post_bridge(bridge_id, "OpenAI Bridge (reserva)")
+                except Exception as e:
+                    self.pool_bridge_ids.discard(bridge_id)
+                    logging.warning(f"No se pudo completar la reserva de bridges: {e}")
+                    return
+                self.bridge_pool.append(bridge_id)
+        finally:
+            self.bridge_pool_filling = False
+
+    async def drain_bridge_pool(self):
+        """Elimina los bridges en reserva (al cerrar o si Asterisk se reinició)"""
+        bridges = list(self.bridge_pool)
+        self.bridge_pool.clear()
+        self.pool_bridge_ids.difference_update(bridges)
+        await asyncio.gather(*(self.cleanup_bridge(bridge_id) for bridge_id in bridges))
+
+    async def setup_bridge(self, channel_id, external_channel_id, bridge=None):
+        """
+        Conecta el canal original y el canal External Media en un bridge
+
+        Args:
+            bridge: (bridge_id, de_reserva) ya obtenido con create_bridge; None = crearlo ahora
+
+        Ambos canales entran con un único addChannel ("channel": "a,b").
+        """
+        bridge_id = None
+        try:
+            if bridge is None:
+                bridge = await self.create_bridge(channel_id)
+            bridge_id, pooled = bridge
+
+            add_data = {"channel": f"{channel_id},{external_channel_id}"}
+            logging.info(f"Añadiendo canales {channel_id} y {external_channel_id} al bridge {bridge_id}")
+            response = await self.ari.post(f"/bridges/{bridge_id}/addChannel", json=add_data)
+            if response.status == 404 and pooled:
+                # Bridge de reserva que ya no existe (p. ej. Asterisk reinició): crear uno nuevo
+                logging.warning(f"Bridge de reserva {bridge_id} no existe, creando uno nuevo")
+                await self.drain_bridge_pool()
+                bridge_id = f"{BRIDGE_ID_PREFIX}{channel_id}"
+                self.index_resource(channel_id, 'bridge', bridge_id)
+                await self.post_bridge(bridge_id, f"OpenAI Bridge {channel_id}")
+                response = await self.ari.post(f"/bridges/{bridge_id}/addChannel", json=add_data)
+            if response.status not in [200, 204]:  # Aceptar 204 como éxito
+                raise Exception(
+                    f"Error añadiendo canales al bridge {bridge_id}: "
+                    f"{response.status} - {response.text}"
+                )
+
+            # El bridge ya quedó en el índice de la llamada
             logging.info(f"Bridge {bridge_id} configurado completamente")
             return True
             
@@ -1399,59 +2457,32 @@ class AsteriskApp:
         try:
             logging.info(f"Iniciando limpieza del bridge {bridge_id}")
             
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.base_url}/bridges/{bridge_id}"
-                async with session.delete(
-                    url,
-                    auth=aiohttp.BasicAuth(self.username, self.password)
-                ) as response:
-                    if response.status == 200:
-                        logging.info(f"Bridge {bridge_id} eliminado correctamente")
-                    else:
-                        response_text = await response.text()
-                        logging.warning(
-                            f"Error eliminando bridge {bridge_id}: "
-                            f"{response.status} - {response_text}"
-                        )
+            response = await self.ari.delete(f"/bridges/{bridge_id}")
+            if response.status in [200, 204]:
+                logging.info(f"Bridge {bridge_id} eliminado correctamente")
+            else:
+                logging.warning(
+                    f"Error eliminando bridge {bridge_id}: "
+                    f"{response.status} - {response.text}"
+                )
         except Exception as e:
             logging.error(f"Error limpiando bridge {bridge_id}: {e}")
             logging.exception("Detalles del error de limpieza:")
 
     async def handle_events(self, websocket):
-        """Maneja eventos entrantes de Asterisk"""
+        """
+        Lee eventos de Asterisk y los entrega al despachador sin esperar a que se procesen
+
+        Ninguna petición ARI se hace desde este bucle: un Asterisk lento con una
+        llamada no retrasa el StasisStart de las demás.
+        """
         while True:
             try:
                 message = await websocket.recv()
                 #logging.debug(f"Evento recibido: {message}")
                 
                 event = json.loads(message)
-                event_type = event.get('type', 'unknown')
-                # logging.info(f"Procesando evento tipo: {event_type}")
-                
-                if event_type == 'StasisStart':
-                    channel_id = event['channel']['id']
-                    # 1) Ignorar si es canal External Media
-                    if channel_id.startswith("external_"):
-                        logging.debug(f"Saltando StasisStart en canal External Media: {channel_id}")
-                        continue
-                    logging.info(f"Nueva llamada recibida - Canal: {channel_id}")
-                    self.active_channels.add(channel_id)
-                    
-                    # Obtener información detallada del canal
-                    channel_info = await self.get_channel_info(channel_id)
-                    # logging.debug(f"Información del canal: {json.dumps(channel_info, indent=2)}")
-                    
-                    # Detectar codec
-                    codec = await self.get_channel_codec(channel_id)
-                    logging.info(f"Codec detectado para canal {channel_id}: {codec}")
-                    
-                    # Iniciar External Media
-                    asyncio.create_task(self.setup_external_media(event, codec))
-                    
-                elif event_type == 'StasisEnd':
-                    channel_id = event['channel']['id']
-                    logging.info(f"Llamada terminada - Canal: {channel_id}")
-                    await self.handle_stasis_end(event)
+                self.dispatcher.dispatch(event)
                     
             except websockets.ConnectionClosed:
                 logging.warning("Conexión WebSocket cerrada, reconectando...")
@@ -1462,24 +2493,90 @@ class AsteriskApp:
                 logging.error(f"Error procesando evento: {e}")
                 logging.exception("Detalles del error:")
 
+    async def process_event(self, event):
+        """
+        Procesa un evento en el worker de su canal
+
+        Los eventos de un mismo canal llegan aquí en orden y de a uno: el
+        StasisEnd espera a que termine el setup de External Media de esa
+        llamada, así el teardown nunca corre contra recursos a medio crear.
+        """
+        event_type = event.get('type', 'unknown')
+        # logging.info(f"Procesando evento tipo: {event_type}")
+        
+        if event_type == 'StasisStart':
+            channel_id = event['channel']['id']
+            # 1) Ignorar si es canal External Media
+            if channel_id.startswith("external_"):
+                logging.debug(f"Saltando StasisStart en canal External Media: {channel_id}")
+                return
+            logging.info(f"Nueva llamada recibida - Canal: {channel_id}")
+
+            # Control de admisión: con sobrecarga la llamada espera turno o se rechaza
+            if self.admission:
+                decision, reasons = self.admission.decide()
+                if decision == REJECT:
+                    asyncio.create_task(self.shed_call(channel_id, reasons[0]))
+                    return
+                if decision == QUEUE:
+                    logging.warning(f"Llamada {channel_id} en cola de espera ({', '.join(reasons)})")
+                    self.queued_calls[channel_id] = asyncio.create_task(self.queue_call(event['channel']))
+                    return
+            self.open_session(channel_id)
+            await self.start_call(event)
+
+        elif event_type == 'CallAdmitted':
+            # Llamada que esperó en cola: su sesión ya existe
+            if event['channel']['id'] in self.sessions:
+                await self.start_call(event)
+            
+        elif event_type == 'StasisEnd':
+            channel_id = event['channel']['id']
+            logging.info(f"Llamada terminada - Canal: {channel_id}")
+            if self.queued_calls.pop(channel_id, None):
+                await self.admission.abandon(channel_id)
+                return
+            await self.handle_stasis_end(event)
+
+    async def start_call(self, event):
+        """Detecta el codec e inicia External Media para una llamada ya admitida"""
+        channel_id = event['channel']['id']
+        # Obtener información detallada del canal y detectar codec
+        # (una sola ronda de peticiones en paralelo; setup_external_media reutiliza la caché)
+        codec = await self.get_channel_codec(channel_id)
+        logging.info(f"Codec detectado para canal {channel_id}: {codec}")
+
+        # Iniciar External Media
+        await self.setup_external_media(event, codec)
+
     async def setup_external_media(self, event, codec='ulaw'):
         channel_id = event['channel']['id']
+        bind_channel(channel_id)  # Esta tarea y las que cree quedan asociadas a la llamada
+        bridge_task = None
         try:
             # Evitar procesar canales External Media secundarios
             if channel_id.startswith('external_'):
                 logging.debug(f"Ignorando canal External Media secundario: {channel_id}")
                 return
             
+            session = self.sessions.get(channel_id)
+            if session is None:
+                logging.info(f"La llamada {channel_id} terminó antes del setup de External Media")
+                return
             logging.info(f"Iniciando configuración External Media - Canal: {channel_id}")
+
+            # 0) El bridge no depende de nada: se crea (o se toma de la reserva) en paralelo
+            bridge_started = time.perf_counter()
+            bridge_task = asyncio.create_task(self.create_bridge(channel_id))
             
             # 1) Obtener información RTP del canal original primero
             original_channel_info = await self.get_channel_info(channel_id)
             rtp_remote_address = None
             rtp_remote_port = None
+            peer_ip = None
             
             if original_channel_info and 'channelInfo' in original_channel_info:
                 rtp_dest = original_channel_info['channelInfo'].get('rtp_dest')
-                rtp_source = original_channel_info['channelInfo'].get('rtp_source')
                 peer_ip = original_channel_info['channelInfo'].get('peer_ip')
                 
                 if rtp_dest:
@@ -1496,7 +2593,9 @@ class AsteriskApp:
             
             # 2) Crear RTP handler y obtener puerto local
             local_address = LOCAL_IP_ADDRESS
-            rtp_handler = RTPAudioHandler()
+            timeline = session.timeline
+            rtp_handler = RTPAudioHandler(channel_id=channel_id, timeline=timeline)
+            self.index_resource(channel_id, 'rtp_handler', rtp_handler)
             
             #Crear OpenAIHandler con el rtp_handler
             if rtp_handler != None:
@@ -1511,8 +2610,11 @@ class AsteriskApp:
                 logging.error(f"No se pudo encontrar puerto RTP: {e}")
                 return
             
+            self.index_resource(channel_id, 'port', available_port)
+
             # 3) Crear el canal External Media con la información RTP
             external_channel_id = f"external_{channel_id}"
+            self.index_resource(channel_id, 'external_channel', external_channel_id)
             media_data = {
                 "app": "openai-app",
                 "channelId": external_channel_id,
@@ -1524,7 +2626,7 @@ class AsteriskApp:
                 "variables": {
                     "CHANNEL_PURPOSE": "openai_chat",
                     "ORIGINAL_CHANNEL_ID": channel_id,
-                    "RTP_REMOTE_ADDRESS": rtp_remote_address,
+                    "RTP_REMOTE_ADDRESS": rtp_remote_address or "",
                     "RTP_REMOTE_PORT": str(rtp_remote_port) if rtp_remote_port else "",
                     "PEER_IP": peer_ip if peer_ip else ""
                 }
@@ -1532,148 +2634,296 @@ class AsteriskApp:
             #"direction": "both",
 
             # 4) Crear canal en Asterisk
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_url}/channels/externalMedia",
-                    json=media_data,
-                    auth=aiohttp.BasicAuth(self.username, self.password)
-                ) as response:
-                    if response.status == 200:
-                        channel_info = await response.json()
-                        logging.info(f"Canal External Media creado: {external_channel_id}")
+            media_started = time.perf_counter()
+            response = await self.ari.post("/channels/externalMedia", json=media_data)
+            media_elapsed = time.perf_counter() - media_started
+            if response.status == 200:
+                channel_info = response.data
+                logging.info(f"Canal External Media creado: {external_channel_id}")
+                if channel_info and channel_info.get('name'):
+                    self.index_resource(channel_id, 'unicast_channel', channel_info['name'])
                         
-                        # 5) Iniciar RTP handler con la información completa
-                        success = await rtp_handler.start(
-                            local_address=local_address,
-                            local_port=available_port,
-                            remote_address=rtp_remote_address,
-                            remote_port=rtp_remote_port,
-                            codec=codec
-                        )
+                # 5) Iniciar RTP handler con la información completa
+                success = await rtp_handler.start(
+                    local_address=local_address,
+                    local_port=available_port,
+                    remote_address=rtp_remote_address,
+                    remote_port=rtp_remote_port,
+                    codec=codec
+                )
                         
-                        if not success:
-                            raise Exception("No se pudo iniciar RTP Handler")
+                if not success:
+                    raise Exception("No se pudo iniciar RTP Handler")
                         
-                        logging.info(
-                            f"RTP Handler iniciado - Local: {local_address}:{available_port}, "
-                            f"Remoto: {rtp_remote_address}:{rtp_remote_port}"
-                        )
+                logging.info(
+                    f"RTP Handler iniciado - Local: {local_address}:{available_port}, "
+                    f"Remoto: {rtp_remote_address}:{rtp_remote_port}"
+                )
 
-                        # 6) Configurar bridge
-                        bridge_success = await self.setup_bridge(channel_id, external_channel_id)
-                        if not bridge_success:
-                            raise Exception("Error configurando el bridge")
-
-                        # 7) Iniciar procesamiento de audio
-                        rtp_task = asyncio.create_task(
-                            rtp_handler.process_audio_stream(
-                                local_address=local_address,
-                                codec=codec,
-                                openai_handler=openai_handler
-                            )
-                        )
-                        self.active_tasks[external_channel_id] = rtp_task
-                        self.rtp_handlers[external_channel_id] = rtp_handler
+                # 6) Configurar bridge (ya creado en paralelo): un solo addChannel con ambos canales
+                bridge = await bridge_task
+                bridge_wait_started = time.perf_counter()
+                bridge_elapsed = bridge_wait_started - bridge_started  # cota superior: pudo terminar antes
+                bridge_success = await self.setup_bridge(channel_id, external_channel_id, bridge)
+                add_elapsed = time.perf_counter() - bridge_wait_started
+                if not bridge_success:
+                    raise Exception("Error configurando el bridge")
+                if timeline:
+                    timeline.mark('bridge_up')
+                    timeline.observe_between('bridge_setup', 'stasis_start', 'bridge_up')
+                    timeline.observe('external_media_create', media_elapsed)
+                    timeline.observe('bridge_add_channels', add_elapsed)
+                logging.info(
+                    f"⏱️ Setup de media: externalMedia {media_elapsed:.3f}s, "
+                    f"bridge {'de reserva' if bridge[1] else 'creado en paralelo'} (listo en ≤{bridge_elapsed:.3f}s), "
+                    f"addChannel x2 en una petición {add_elapsed:.3f}s"
+                )
 
-                        logging.info("Configuración External Media completada exitosamente")
-                    else:
-                        response_text = await response.text()
-                        raise Exception(
-                            f"Error creando canal External Media: {response.status} - {response_text}"
-                        )
+                # 7) Iniciar procesamiento de audio
+                rtp_task = asyncio.create_task(
+                    rtp_handler.process_audio_stream(
+                        local_address=local_address,
+                        codec=codec,
+                        openai_handler=openai_handler
+                    )
+                )
+                self.index_resource(channel_id, 'rtp_task', rtp_task)
+
+                logging.info("Configuración External Media completada exitosamente")
+            else:
+                raise Exception(
+                    f"Error creando canal External Media: {response.status} - {response.text}"
+                )
 
         except Exception as e:
             logging.error(f"Error en setup de External Media: {e}")
             logging.exception("Detalles del error:")
-            await self.cleanup_channel(channel_id)
+            if bridge_task:
+                # Que el POST del bridge termine antes de liberar, para no dejarlo huérfano
+                await asyncio.gather(bridge_task, return_exceptions=True)
+            await self.close_session(channel_id, reason='setup_failed')
 
     async def handle_stasis_end(self, event):
         """Maneja el fin de Stasis para un canal"""
         channel_id = event['channel']['id']
+        channel_token = bind_channel(channel_id)
         try:
-            # Limpiar recursos del canal original
-            await self.cleanup_channel(channel_id)
-
-            # Limpiar recursos del canal External Media si existe
-            external_channel_id = f"external_{channel_id}"
-            if external_channel_id in self.active_channels:
-                await self.cleanup_channel(external_channel_id)
+            # Canal creado por nosotros: si sigue en el índice se cayó el media de una
+            # llamada viva y se libera su sesión; si no, su llamada ya lo liberó
+            if channel_id.startswith('external_') or channel_id.startswith('UnicastRTP'):
+                owner = self.resource_owner.get(channel_id)
+                if owner:
+                    logging.warning(f"Canal {channel_id} terminó con la llamada {owner} activa")
+                    await self.close_session(owner, reason='media_lost')
+                else:
+                    logging.debug(f"StasisEnd de canal ya liberado: {channel_id}")
+                return
 
-            # NUEVO: Buscar y limpiar TODOS los canales UnicastRTP asociados
-            # (a veces quedan canales huérfanos que no están en active_channels)
-            try:
-                async with aiohttp.ClientSession() as session:
-                    channels_url = f"{self.base_url}/channels"
-                    async with session.get(
-                        channels_url,
-                        auth=aiohttp.BasicAuth(self.username, self.password)
-                    ) as response:
-                        if response.status == 200:
-                            all_channels = await response.json()
-                            for ch in all_channels:
-                                ch_id = ch.get('id', '')
-                                # Cerrar canales UnicastRTP que están en openai-app
-                                if ch_id.startswith('UnicastRTP') and ch.get('dialplan', {}).get('app_name') == 'openai-app':
-                                    await self.cleanup_channel(ch_id)
-                                    logging.info(f"Canal UnicastRTP huérfano cerrado: {ch_id}")
-            except Exception as cleanup_error:
-                logging.debug(f"Error limpiando canales huérfanos: {cleanup_error}")
+            # Liberación en orden fijo de todo lo que creó esta llamada
+            session = await self.close_session(channel_id)
 
-            # Limpiar bridge si existe
-            if channel_id in self.bridges:
-                await self.cleanup_bridge(self.bridges[channel_id])
+            # Volcar la timeline de la llamada y los histogramas del proceso
+            timeline = session.timeline if session else None
+            if timeline:
+                timeline.mark('stasis_end')
+                path = await asyncio.to_thread(timeline.dump, CALL_METRICS_DIR)
+                logging.info(f"📊 Timeline de la llamada guardada en {path}")
+                logging.info(f"📊 Latencias del proceso: {json.dumps(LATENCY.snapshot())}")
 
             logging.info(f"Recursos liberados para canal {channel_id}")
 
         except Exception as e:
             logging.error(f"Error en handle_stasis_end: {e}")
             logging.exception("Detalles del error:")
+        finally:
+            current_channel.reset(channel_token)
 
     async def cleanup_channel(self, channel_id):
-        """Limpia recursos asociados a un canal"""
+        """Cuelga un canal External Media/UnicastRTP que no pertenece a ninguna llamada"""
         try:
-            # Remover de canales activos
-            if channel_id in self.active_channels:
-                self.active_channels.remove(channel_id)
-
-            # Limpiar RTP handler
-            if channel_id in self.rtp_handlers:
-                handler = self.rtp_handlers[channel_id]
-                await handler.cleanup()
-                del self.rtp_handlers[channel_id]
-
-            # Cancelar tareas activas
-            if channel_id in self.active_tasks:
-                task = self.active_tasks[channel_id]
-                task.cancel()
-                try:
-                    await task
-                except asyncio.CancelledError:
-                    pass
-                del self.active_tasks[channel_id]
-
-            # NUEVO: Hacer hangup explícito del canal si es UnicastRTP (External Media)
-            try:
-                if channel_id.startswith('UnicastRTP') or channel_id.startswith('external_'):
-                    async with aiohttp.ClientSession() as session:
-                        hangup_url = f"{self.base_url}/channels/{channel_id}"
-                        async with session.delete(
-                            hangup_url,
-                            auth=aiohttp.BasicAuth(self.username, self.password)
-                        ) as response:
-                            if response.status in [204, 404]:
-                                logging.info(f"Canal External Media cerrado: {channel_id}")
-                            else:
-                                logging.warning(f"Error cerrando canal {channel_id}: {response.status}")
-            except Exception as hangup_error:
-                logging.debug(f"Error haciendo hangup de {channel_id}: {hangup_error}")
-
-            logging.info(f"Recursos liberados para canal {channel_id}")
-
+            response = await self.ari.delete(f"/channels/{channel_id}")
+            if response.status in [204, 404]:
+                logging.info(f"Canal External Media cerrado: {channel_id}")
+            else:
+                logging.warning(f"Error cerrando canal {channel_id}: {response.status}")
         except Exception as e:
             logging.error(f"Error en cleanup_channel: {e}")
             logging.exception("Detalles del error:")
 
+    def collect_metrics(self):
+        """Reúne el estado del proceso para el endpoint /metrics"""
+        fds, sockets = open_file_descriptors()
+        uplink_depth = []
+        downlink_depth = []
+        packets_in = 0
+        packets_out = 0
+        openai_sessions = 0
+        for channel_id, session in list(self.sessions.items()):
+            handler = session.rtp_handler
+            if handler is None:
+                continue
+            packets_in += handler.packets_in
+            packets_out += handler.packets_out
+            client = handler.openai_client
+            if client:
+                if client.thread and client.thread.is_alive():
+                    openai_sessions += 1
+                labels = {'channel': handler.channel_id or channel_id}
+                uplink_depth.append(('inbound_uplink_queue_depth', labels, client.outgoing_audio_queue.qsize()))
+                downlink_depth.append(('inbound_downlink_queue_depth', labels, client.incoming_audio_queue.qsize()))
+
+        counters = COUNTERS.snapshot()
+        packets_in += counters.get(('rtp_packets_in_total', ()), 0)
+        packets_out += counters.get(('rtp_packets_out_total', ()), 0)
+        openai_errors = [
+            ('inbound_openai_errors_total', dict(labels), value)
+            for (name, labels), value in counters.items() if name == 'openai_errors_total'
+        ]
+
+        cache_samples = []
+        if _mikrotik_client and _mikrotik_client.cache:
+            cache_stats = _mikrotik_client.cache.stats()
+            for result in ('hits', 'misses', 'bypassed', 'expired', 'evictions'):
+                cache_samples.append(('inbound_mikrotik_cache_lookups_total', {'result': result}, cache_stats[result]))
+        coalescing_samples = []
+        if _mikrotik_client:
+            for key, value in _mikrotik_client.inflight.metrics.items():
+                coalescing_samples.append(('inbound_mikrotik_requests_total', {'kind': key}, value))
+        engine_samples = []
+        breaker_samples = []
+        engine_gauges = []
+        if _tool_engine:
+            engine_stats = _tool_engine.snapshot()
+            for key, value in _tool_engine.metrics.items():
+                engine_samples.append(('inbound_tool_calls_total', {'result': key}, value))
+            engine_gauges = [
+                ('inbound_tool_calls_pending', {'state': 'queued'}, engine_stats['queued']),
+                ('inbound_tool_calls_pending', {'state': 'in_flight'}, engine_stats['in_flight'])
+            ]
+            for backend, breaker in _tool_engine.breakers.items():
+                breaker_samples.append(('inbound_tool_breaker_open', {'backend': backend},
+                                        0 if breaker.state == 'closed' else 1))
+
+        return [
+            ('inbound_active_calls', 'gauge', 'Llamadas activas',
+             [('inbound_active_calls', {}, len(self.sessions))]),
+            ('inbound_threads', 'gauge', 'Threads vivos en el proceso',
+             [('inbound_threads', {}, threading.active_count())]),
+            ('inbound_openai_sessions', 'gauge',
+             'Sesiones Realtime con thread vivo: de llamadas activas (active) y de todo el proceso (process); '
+             'si process supera a active hay sesiones filtradas',
+             [('inbound_openai_sessions', {'scope': 'active'}, openai_sessions),
+              ('inbound_openai_sessions', {'scope': 'process'},
+               sum(1 for thread in threading.enumerate() if thread.name.startswith('openai-')))]),
+            ('inbound_call_sessions_closed_total', 'counter', 'Sesiones de llamada liberadas por motivo',
+             [('inbound_call_sessions_closed_total', dict(labels), value)
+              for (name, labels), value in counters.items() if name == 'call_sessions_closed_total']),
+            ('inbound_call_teardown_timeouts_total', 'counter', 'Pasos de liberación que excedieron su timeout',
+             [('inbound_call_teardown_timeouts_total', dict(labels), value)
+              for (name, labels), value in counters.items() if name == 'call_teardown_timeouts_total']),
+            ('inbound_open_fds', 'gauge', 'Descriptores de archivo abiertos',
+             [('inbound_open_fds', {}, fds)]),
+            ('inbound_open_sockets', 'gauge', 'Sockets abiertos',
+             [('inbound_open_sockets', {}, sockets)]),
+            ('inbound_event_loop_lag_seconds', 'gauge', 'Retraso del event loop en la última medición',
+             [('inbound_event_loop_lag_seconds', {}, self.loop_monitor.last_lag)]),
+            ('inbound_event_loop_lag_max_seconds', 'gauge', 'Retraso máximo observado del event loop',
+             [('inbound_event_loop_lag_max_seconds', {}, self.loop_monitor.max_lag)]),
+            ('inbound_uplink_queue_depth', 'gauge', 'Chunks pendientes de enviar a OpenAI', uplink_depth),
+            ('inbound_downlink_queue_depth', 'gauge', 'Chunks de audio de OpenAI pendientes de reproducir', downlink_depth),
+            ('inbound_rtp_packets_in_total', 'counter', 'Paquetes RTP recibidos desde Asterisk',
+             [('inbound_rtp_packets_in_total', {}, packets_in)]),
+            ('inbound_rtp_packets_out_total', 'counter', 'Paquetes RTP enviados hacia Asterisk',
+             [('inbound_rtp_packets_out_total', {}, packets_out)]),
+            ('inbound_openai_errors_total', 'counter', 'Errores reportados por OpenAI', openai_errors),
+            ('inbound_tool_calls_cancelled_total', 'counter', 'Herramientas canceladas por motivo (hangup/barge_in)',
+             [('inbound_tool_calls_cancelled_total', dict(labels), value)
+              for (name, labels), value in counters.items() if name == 'tool_calls_cancelled_total']),
+            ('inbound_tool_wasted_seconds_total', 'counter',
+             'Segundos de herramientas cuyo resultado se descartó (colgado, barge-in, especulación fallida)',
+             [('inbound_tool_wasted_seconds_total', dict(labels), value)
+              for (name, labels), value in counters.items() if name == 'tool_wasted_seconds_total']),
+            ('inbound_speculative_tools_total', 'counter', 'Consultas especulativas por resultado (hit/miss)',
+             [('inbound_speculative_tools_total', dict(labels), value)
+              for (name, labels), value in counters.items() if name == 'speculative_tools_total']),
+            ('inbound_mikrotik_cache_lookups_total', 'counter', 'Consultas a la caché MikroTik por resultado',
+             cache_samples),
+            ('inbound_mikrotik_requests_total', 'counter',
+             'Peticiones MikroTik: upstream_calls, upstream_avoided (coalescidas) y abandoned',
+             coalescing_samples),
+            ('inbound_tool_calls_total', 'counter',
+             'Llamadas al motor de herramientas por resultado (incluye rechazos por cola o breaker)',
+             engine_samples),
+            ('inbound_tool_calls_pending', 'gauge', 'Herramientas esperando turno o ejecutándose',
+             engine_gauges),
+            ('inbound_tool_result_bytes_total', 'counter',
+             'Bytes de resultados de herramientas antes (raw) y después (shaped) de compactarlos',
+             [('inbound_tool_result_bytes_total', {'stage': stage.replace('_bytes', '')}, value)
+              for stage, value in (_tool_registry.metrics.items() if _tool_registry else ())]),
+            ('inbound_tool_breaker_open', 'gauge', 'Circuit breaker abierto (1) o cerrado (0) por backend',
+             breaker_samples),
+            latency_summary('inbound_latency_seconds', 'Latencias por etapa (turnos, setup, function calls)',
+                            LATENCY.snapshot()),
+            ('inbound_ari_introspection_total', 'counter',
+             'Introspecciones de canal por resultado (fetched/coalesced/cached)',
+             [('inbound_ari_introspection_total', dict(labels), value)
+              for (name, labels), value in counters.items() if name == 'ari_introspection_total']),
+            ('inbound_ari_introspection_saved_seconds_total', 'counter',
+             'Segundos ahorrados al consultar canal y variables en paralelo en vez de en serie',
+             [('inbound_ari_introspection_saved_seconds_total', {},
+               counters.get(('ari_introspection_saved_seconds_total', ()), 0))]),
+            ('inbound_ari_events_total', 'counter', 'Eventos ARI despachados, procesados y con error',
+             [('inbound_ari_events_total', {'result': key}, value)
+              for key, value in self.dispatcher.metrics.items() if key != 'max_queue_depth']),
+            ('inbound_ari_event_queue_depth', 'gauge', 'Eventos ARI encolados sin procesar',
+             [('inbound_ari_event_queue_depth', {}, self.dispatcher.queue_depth())]),
+            ('inbound_ari_event_workers', 'gauge', 'Workers de eventos ARI vivos (uno por canal con eventos recientes)',
+             [('inbound_ari_event_workers', {}, len(self.dispatcher.workers))]),
+            ('inbound_calls_shed_total', 'counter',
+             'Llamadas rechazadas por sobrecarga por motivo (hard_limit, queue_full, queue_timeout, abandoned)',
+             [('inbound_calls_shed_total', dict(labels), value)
+              for (name, labels), value in counters.items() if name == 'calls_shed_total']),
+            ('inbound_admission_decisions_total', 'counter', 'Decisiones del control de admisión',
+             [('inbound_admission_decisions_total', {'decision': key}, value)
+              for key, value in (self.admission.metrics.items() if self.admission else ())]),
+            ('inbound_admission_queue_depth', 'gauge', 'Llamadores esperando turno',
+             [('inbound_admission_queue_depth', {}, len(self.admission.queue) if self.admission else 0)]),
+            ('inbound_rtp_latch_total', 'counter', 'Endpoints RTP aprendidos del tráfico (latched) y cambios por SSRC (relatched)',
+             [('inbound_rtp_latch_total', dict(labels), value)
+              for (name, labels), value in counters.items() if name == 'rtp_latch_total']),
+            ('inbound_bridge_pool_total', 'counter', 'Bridges pedidos a la reserva por resultado (hit/miss)',
+             [('inbound_bridge_pool_total', dict(labels), value)
+              for (name, labels), value in counters.items() if name == 'bridge_pool_total']),
+            ('inbound_bridge_pool_size', 'gauge', 'Bridges listos en la reserva',
+             [('inbound_bridge_pool_size', {}, len(self.bridge_pool))]),
+            ('inbound_ari_reconnects_total', 'counter', 'Reconexiones del WebSocket de eventos ARI por resultado',
+             [('inbound_ari_reconnects_total', dict(labels), value)
+              for (name, labels), value in counters.items() if name == 'ari_reconnects_total']),
+            ('inbound_ari_reconcile_total', 'counter',
+             'Acciones de la reconciliación con Asterisk (ended, media_lost, reattached, adopted, swept)',
+             [('inbound_ari_reconcile_total', dict(labels), value)
+              for (name, labels), value in counters.items() if name == 'ari_reconcile_total']),
+            ('inbound_ari_orphans_swept_total', 'counter', 'Canales y bridges sin dueño cerrados por el barrido periódico',
+             [('inbound_ari_orphans_swept_total', dict(labels), value)
+              for (name, labels), value in counters.items() if name == 'ari_orphans_swept_total']),
+            ('inbound_ari_requests_total', 'counter', 'Peticiones REST a ARI por endpoint y status HTTP',
+             [('inbound_ari_requests_total', dict(labels), value)
+              for (name, labels), value in self.ari.requests.snapshot().items()]),
+            latency_summary('inbound_ari_request_seconds', 'Latencia de peticiones REST a ARI por endpoint',
+                            self.ari.latency.snapshot()),
+        ]
+
+    async def start_observability(self):
+        """Arranca el monitor de lag y, si está configurado, el endpoint de métricas"""
+        self.loop_monitor.start()
+        if METRICS_PORT and not self.metrics_server:
+            try:
+                self.metrics_server = MetricsServer(self.collect_metrics, METRICS_HOST, int(METRICS_PORT))
+                await self.metrics_server.start()
+            except Exception as e:
+                logging.error(f"No se pudo iniciar el endpoint de métricas: {e}")
+                self.metrics_server = None
+
     async def start(self):
         """
         Inicia la aplicación ARI y mantiene la conexión WebSocket con Asterisk.
@@ -1688,8 +2938,16 @@ class AsteriskApp:
             # Construimos la URL del WebSocket con las credenciales usando variables de entorno
             ws_url = f"ws://{ASTERISK_HOST}:{ASTERISK_PORT}/ari/events?api_key={self.username}:{self.password}&app=openai-app"
             logging.info(f"Iniciando conexión ARI a {ASTERISK_HOST}:{ASTERISK_PORT}")
+            await self.start_observability()
+            if ARI_ORPHAN_SWEEP_INTERVAL > 0 and self.sweeps_orphans:
+                self.sweeper_task = asyncio.create_task(self.run_orphan_sweeper())
+            if self.handles_calls:
+                asyncio.create_task(self.refill_bridge_pool())
             
-            # Bucle principal de reconexión
+            # Bucle principal de reconexión: backoff exponencial con jitter y
+            # reconciliación del estado en cada conexión
+            attempt = 0
+            disconnected_at = None
             while True:
                 try:
                     # Establecer conexión WebSocket
@@ -1699,31 +2957,237 @@ class AsteriskApp:
                         ping_timeout=20    # Timeout para detectar desconexiones
                     ) as websocket:
                         logging.info("Conexión ARI establecida")
+                        if disconnected_at is not None:
+                            reconnect = time.monotonic() - disconnected_at
+                            LATENCY.observe('ari_reconnect', reconnect)
+                            COUNTERS.inc('ari_reconnects_total', result='ok')
+                            logging.info(f"⏱️ Reconexión ARI tras {reconnect:.3f}s ({attempt} intentos)")
+                        attempt = 0
+                        # Los eventos que lleguen mientras tanto se encolan con normalidad
+                        asyncio.create_task(self.recover(disconnected_at))
                         
                         # Procesar eventos
                         await self.handle_events(websocket)
+                    logging.warning("Conexión ARI cerrada")
                         
                 except websockets.ConnectionClosed:
                     # La conexión se cerró, intentamos reconectar
-                    logging.warning("Conexión cerrada, reintentando en 5 segundos...")
-                    await asyncio.sleep(5)
+                    logging.warning("Conexión ARI cerrada")
                     
                 except Exception as e:
                     # Otros errores inesperados
+                    if disconnected_at is not None:
+                        COUNTERS.inc('ari_reconnects_total', result='failed')
                     logging.error(f"Error en la conexión: {e}")
                     logging.info(f"Conectando a Asterisk en {self.base_url}")
                     logging.info(f"Usuario: {ASTERISK_USERNAME}")
-                    logging.info(f"Contraseña: {ASTERISK_PASSWORD}")
                     logging.exception("Detalles del error:")
-                    await asyncio.sleep(5)
+
+                if disconnected_at is None or attempt == 0:
+                    disconnected_at = time.monotonic()
+                attempt += 1
+                delay = reconnect_delay(attempt, ARI_RECONNECT_BASE_DELAY, ARI_RECONNECT_MAX_DELAY)
+                logging.warning(f"Reconectando con ARI en {delay:.2f}s (intento {attempt})")
+                await asyncio.sleep(delay)
                     
         except Exception as e:
             # Error fatal que requiere atención manual
             logging.error(f"Error fatal en start: {e}")
             logging.exception("Detalles del error fatal:")
             raise
+        finally:
+            if self.sweeper_task:
+                self.sweeper_task.cancel()
+            await self.dispatcher.close()
+            await self.drain_bridge_pool()
+            await self.ari.close()
+
+
+class SupervisorApp(AsteriskApp):
+    """
+    Dueño del WebSocket de eventos ARI en modo multiproceso
+
+    No atiende llamadas: cada StasisStart se asigna al worker con menos
+    llamadas y todos los eventos de esa llamada (incluido su canal External
+    Media) se le reenvían por el socket local. El barrido de huérfanos corre
+    aquí, con los recursos que reportan los workers.
+    """
+    owns_all_calls = False
+    handles_calls = False
+
+    def __init__(self, workers):
+        super().__init__()
+        self.pool = WorkerPool(
+            [sys.executable, os.path.abspath(__file__)] + sys.argv[1:],
+            workers,
+            INBOUND_SUPERVISOR_SOCKET,
+            port_range=(RTP_PORT_START, RTP_PORT_END),
+            extra_env=worker_env,
+            on_lost=self.hangup_lost_calls
+        )
+
+    async def process_event(self, event):
+        index = self.pool.route(event)
+        channel_id = (event.get('channel') or {}).get('id', '')
+        if index is None and event.get('type') == 'StasisStart' and not channel_id.startswith('external_'):
+            # Ningún worker conectado: mejor rechazar que dejar al llamador en silencio
+            asyncio.create_task(self.shed_call(channel_id, 'no_workers'))
+
+    async def hangup_lost_calls(self, channel_ids):
+        """
+        Cuelga las llamadas de un worker que terminó
+
+        Nadie más atiende esos canales: sin esto el llamador queda en silencio
+        hasta que el barrido de huérfanos quite su External Media
+        """
+        async def hangup(channel_id):
+            try:
+                await self.ari.delete(f"/channels/{channel_id}", params={'reason': 'congestion'})
+                await self.ari.delete(f"/channels/external_{channel_id}")
+            except Exception as e:
+                logging.error(f"Error colgando la llamada perdida {channel_id}: {e}")
+
+        logging.warning(f"Colgando {len(channel_ids)} llamadas de un worker caído")
+        await asyncio.gather(*(hangup(channel_id) for channel_id in channel_ids))
+
+    async def owned_resources(self, listed_at):
+        """
+        Recursos que reportan los workers en un reporte posterior al listado
+
+        Cada worker indexa un recurso antes de crearlo en Asterisk, así que todo
+        lo que aparece en el listado ya está en cualquier reporte generado
+        después. Un worker caído no reporta: sus recursos son huérfanos.
+        """
+        if not await self.pool.wait_reports(listed_at):
+            logging.warning("Barrido de huérfanos omitido: no todos los workers reportaron sus recursos")
+            return None
+        return self.pool.reported_resources()
+
+    async def reconcile(self):
+        """
+        Reconciliación del lado supervisor: llamadas asignadas cuyo canal ya no
+        existe reciben un StasisEnd, canales en Stasis sin worker se asignan,
+        cada worker revisa los recursos de sus propias llamadas y se barren los
+        huérfanos de todos
+        """
+        actions = {'ended': 0, 'adopted': 0, 'swept': 0}
+        channel_list, bridge_list = await self.list_channels_and_bridges()
+        if channel_list is None:
+            return actions
+        plan = plan_reconcile(dict.fromkeys(self.pool.assignments), channel_list, bridge_list)
+
+        for channel_id in plan.ended:
+            self.dispatcher.dispatch({'type': 'StasisEnd', 'channel': {'id': channel_id}})
+        for channel in plan.adopt:
+            logging.warning(f"Adoptando llamada sin StasisStart recibido: {channel.get('id')}")
+            self.dispatcher.dispatch({'type': 'StasisStart', 'channel': channel})
+        actions.update(ended=len(plan.ended), adopted=len(plan.adopt))
+
+        self.pool.broadcast({'type': 'reconcile'})
+        actions['swept'] = await self.sweep_orphans(channel_list, bridge_list)
+        for action, count in actions.items():
+            if count:
+                COUNTERS.inc('ari_reconcile_total', count, action=action)
+        return actions
+
+    def collect_metrics(self):
+        metrics = super().collect_metrics()
+        workers = self.pool.workers
+        counters = COUNTERS.snapshot()
+        metrics += [
+            ('inbound_worker_up', 'gauge', 'Worker conectado al supervisor (1) o no (0)',
+             [('inbound_worker_up', {'worker': str(worker.index)}, int(worker.connected)) for worker in workers]),
+            ('inbound_worker_calls', 'gauge', 'Llamadas asignadas a cada worker',
+             [('inbound_worker_calls', {'worker': str(worker.index)}, len(worker.channels)) for worker in workers]),
+            ('inbound_worker_loop_lag_seconds', 'gauge', 'Último retraso del event loop reportado por cada worker',
+             [('inbound_worker_loop_lag_seconds', {'worker': str(worker.index)}, worker.report.get('loop_lag', 0))
+              for worker in workers]),
+            ('inbound_worker_restarts_total', 'counter', 'Workers relanzados tras terminar',
+             [('inbound_worker_restarts_total', {'worker': str(worker.index)}, worker.restarts) for worker in workers]),
+            ('inbound_worker_calls_lost_total', 'counter', 'Llamadas en curso perdidas al terminar un worker',
+             [('inbound_worker_calls_lost_total', dict(labels), value)
+              for (name, labels), value in counters.items() if name == 'worker_calls_lost_total']),
+        ]
+        return metrics
+
+    async def start(self):
+        await self.pool.start()
+        try:
+            # Sin workers conectados las llamadas adoptadas al conectar se rechazarían
+            if not await self.pool.wait_ready():
+                logging.warning("No todos los workers se conectaron a tiempo; se continúa con los disponibles")
+            await super().start()
+        finally:
+            await self.pool.close()
 
 
+class WorkerApp(AsteriskApp):
+    """
+    Worker en modo multiproceso: atiende las llamadas que le asigna el supervisor
+
+    No abre el WebSocket de eventos ARI, los eventos llegan por el socket
+    local. Tiene su propio event loop, su rango de puertos RTP y sus sesiones
+    de OpenAI; cada segundo reporta su carga al supervisor.
+    """
+    owns_all_calls = False
+    sweeps_orphans = False
+
+    def __init__(self, index):
+        super().__init__()
+        self.index = index
+        self.link = SupervisorLink(INBOUND_SUPERVISOR_SOCKET, index)
+        self.report_task = None
+
+    async def close_session(self, channel_id, reason='hangup'):
+        session = await super().close_session(channel_id, reason)
+        if session is not None:
+            self.link.send({'type': 'call_ended', 'channel': channel_id})
+        return session
+
+    async def report_load(self):
+        while True:
+            resources = set(self.pool_bridge_ids)
+            for session in self.sessions.values():
+                resources.update(session.ari_resources())
+            self.link.send({
+                'type': 'report',
+                'at': time.monotonic(),  # reloj monotónico del host, común a todos los procesos
+                'resources': sorted(resources),
+                'active_calls': len(self.sessions),
+                'queued_calls': len(self.queued_calls),
+                'loop_lag': self.loop_monitor.last_lag,
+                'threads': threading.active_count()
+            })
+            await asyncio.sleep(1)
+
+    async def start(self):
+        try:
+            await self.start_observability()
+            await self.link.connect()
+            logging.info(f"Worker {self.index} conectado al supervisor (puertos RTP {RTP_PORT_START}-{RTP_PORT_END - 1})")
+            asyncio.create_task(self.refill_bridge_pool())
+            self.report_task = asyncio.create_task(self.report_load())
+
+            async for message in self.link.messages():
+                if message.get('type') == 'event':
+                    self.dispatcher.dispatch(message['event'])
+                elif message.get('type') == 'reconcile':
+                    asyncio.create_task(self.recover(None))
+            logging.warning("Conexión con el supervisor cerrada, terminando worker")
+        except Exception as e:
+            logging.error(f"Error fatal en worker {self.index}: {e}")
+            logging.exception("Detalles del error fatal:")
+            raise
+        finally:
+            if self.report_task:
+                self.report_task.cancel()
+            # Sin supervisor nadie reenvía los StasisEnd: se liberan las llamadas en curso
+            for channel_id in list(self.sessions):
+                await self.close_session(channel_id, reason='shutdown')
+            await self.dispatcher.close()
+            await self.drain_bridge_pool()
+            self.link.close()
+            await self.ari.close()
 
 
 async def main():
@@ -1731,12 +3195,23 @@ async def main():
     logging.info("Iniciando aplicación Asterisk ARI")
     await asyncio.sleep(1)
     try:
-        app = AsteriskApp()
+        if INBOUND_WORKER_INDEX is not None:
+            app = WorkerApp(int(INBOUND_WORKER_INDEX))
+        elif INBOUND_WORKERS > 0:
+            app = SupervisorApp(INBOUND_WORKERS)
+        else:
+            app = AsteriskApp()
+        if app.handles_calls:
+            load_filler_library()
+            get_tool_registry()
         logging.info("Aplicación iniciada") 
         await app.start()
         logging.info("Aplicación finalizada")
     except Exception as e:
         logging.error(f"Error en main: {e}")
+    finally:
+        if _mikrotik_client:
+            await _mikrotik_client.close()
 
 if __name__ == "__main__":
     logging.info("Iniciando script...")
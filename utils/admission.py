@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Control de admisión de llamadas entrantes
+
+Pasado cierto punto, aceptar una llamada más degrada a todas las demás
+(CPU del event loop, rate limits de OpenAI, API de MikroTik). El
+controlador decide con tres señales:
+
+- llamadas activas (límite blando y límite duro)
+- retraso del event loop
+- tasa de errores de OpenAI (errores por minuto en una ventana deslizante)
+
+Por debajo del límite blando y sin presión: se admite. Con presión: la
+llamada espera en una cola FIFO (el llamador escucha un aviso de espera)
+hasta que haya capacidad o venza su plazo. En el límite duro o con la
+cola llena: se rechaza.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable, List, Tuple
+
+from utils.call_metrics import LATENCY, COUNTERS
+
+ADMIT = 'admit'
+QUEUE = 'queue'
+REJECT = 'reject'
+
+
+class AdmissionController:
+    """Decide si una llamada nueva entra, espera o se rechaza"""
+
+    def __init__(self, active_calls: Callable[[], int],
+                 loop_lag: Callable[[], float] = lambda: 0.0,
+                 error_count: Callable[[], float] = lambda: 0,
+                 soft_limit: int = 20, hard_limit: int = 30,
+                 max_queue: int = 10, queue_timeout: float = 60,
+                 max_loop_lag: float = 0.2, max_error_rate: float = 10,
+                 error_window: float = 60):
+        """
+        Args:
+            active_calls: Llamadas en curso
+            loop_lag: Retraso actual del event loop en segundos
+            error_count: Total acumulado de errores de OpenAI
+            soft_limit: Desde aquí las llamadas nuevas esperan en cola
+            hard_limit: Desde aquí las llamadas nuevas se rechazan
+            max_queue: Llamadores en espera como máximo
+            queue_timeout: Segundos máximos de espera antes de rechazar
+            max_loop_lag: Retraso del loop que se considera sobrecarga
+            max_error_rate: Errores de OpenAI por minuto que se consideran sobrecarga
+            error_window: Ventana en segundos para la tasa de errores
+        """
+        self.active_calls = active_calls
+        self.loop_lag = loop_lag
+        self.error_count = error_count
+        self.soft_limit = soft_limit
+        self.hard_limit = hard_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_loop_lag = max_loop_lag
+        self.max_error_rate = max_error_rate
+        self.error_window = error_window
+
+        self.error_samples = deque()  # (monotonic, total acumulado)
+        self.queue = deque()  # channel_id en orden de llegada
+        self.changed = asyncio.Condition()
+        self.metrics = {
+            'admitted': 0,
+            'queued': 0,
+            'rejected': 0,
+            'queue_timeout': 0,
+            'abandoned': 0
+        }
+
+    def error_rate(self) -> float:
+        """Errores de OpenAI por minuto en la ventana"""
+        now = time.monotonic()
+        total = self.error_count()
+        self.error_samples.append((now, total))
+        while len(self.error_samples) > 1 and now - self.error_samples[0][0] > self.error_window:
+            self.error_samples.popleft()
+        oldest_at, oldest_total = self.error_samples[0]
+        return (total - oldest_total) * 60.0 / self.error_window if now > oldest_at else 0.0
+
+    def pressure(self) -> List[str]:
+        """Señales de sobrecarga activas"""
+        reasons = []
+        if self.active_calls() >= self.soft_limit:
+            reasons.append('calls')
+        if self.loop_lag() > self.max_loop_lag:
+            reasons.append('loop_lag')
+        if self.error_rate() > self.max_error_rate:
+            reasons.append('openai_errors')
+        return reasons
+
+    def decide(self) -> Tuple[str, List[str]]:
+        """
+        Decisión para una llamada nueva
+
+        Returns:
+            (ADMIT | QUEUE | REJECT, motivos)
+        """
+        if self.active_calls() >= self.hard_limit:
+            decision, reasons = REJECT, ['hard_limit']
+        elif len(self.queue) >= self.max_queue:
+            decision, reasons = REJECT, ['queue_full']
+        else:
+            reasons = self.pressure()
+            if self.queue and not reasons:
+                reasons = ['fifo']  # Nadie se salta a los que ya esperan
+            decision = QUEUE if reasons else ADMIT
+
+        if decision == ADMIT:
+            self.metrics['admitted'] += 1
+        elif decision == REJECT:
+            self.metrics['rejected'] += 1
+            COUNTERS.inc('calls_shed_total', reason=reasons[0])
+        return decision, reasons
+
+    async def wait_turn(self, channel_id: str) -> bool:
+        """
+        Espera en la cola FIFO hasta que haya capacidad
+
+        Returns:
+            True si la llamada fue admitida, False si venció el plazo o colgó
+        """
+        self.queue.append(channel_id)
+        self.metrics['queued'] += 1
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        try:
+            async with self.changed:
+                while True:
+                    if channel_id not in self.queue:
+                        return False  # Abandonada (colgó mientras esperaba)
+                    if self.queue[0] == channel_id and not self.pressure():
+                        self.queue.popleft()
+                        self.metrics['admitted'] += 1
+                        LATENCY.observe('admission_wait', time.monotonic() - started)
+                        # El siguiente de la cola puede tener lugar también
+                        self.changed.notify_all()
+                        return True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.metrics['queue_timeout'] += 1
+                        COUNTERS.inc('calls_shed_total', reason='queue_timeout')
+                        logging.warning(f"Llamada {channel_id} rechazada tras {self.queue_timeout:.0f}s en cola")
+                        return False
+                    # Las señales (lag, errores) cambian sin aviso: se reevalúan cada segundo
+                    try:
+                        await asyncio.wait_for(self.changed.wait(), timeout=min(1.0, remaining))
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            if channel_id in self.queue:
+                self.queue.remove(channel_id)
+
+    async def abandon(self, channel_id: str):
+        """El llamador colgó mientras esperaba"""
+        if channel_id in self.queue:
+            self.queue.remove(channel_id)
+            self.metrics['abandoned'] += 1
+            COUNTERS.inc('calls_shed_total', reason='abandoned')
+            await self.release()
+
+    async def release(self):
+        """Se liberó capacidad (terminó una llamada o salió alguien de la cola)"""
+        async with self.changed:
+            self.changed.notify_all()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Cliente REST de Asterisk ARI con pool de conexiones compartido
+
+Todas las llamadas ARI del proceso pasan por una única sesión aiohttp con
+conexiones keep-alive, autenticación y timeouts preconfigurados. Cada
+petición se mide por endpoint (ruta con los IDs reemplazados por {id}) para
+ver qué operación ARI domina el setup y el teardown de las llamadas.
+"""
+
+import logging
+import re
+import time
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from utils.call_metrics import LatencyRegistry, CounterRegistry
+
+# Segmentos que siguen a estos recursos son identificadores
+ID_SEGMENT_RE = re.compile(r'/(channels|bridges|playbacks|recordings)/(?!externalMedia\b)[^/]+')
+
+
+def endpoint_name(method: str, path: str) -> str:
+    """'GET', '/channels/123/variable' -> 'GET /channels/{id}/variable'"""
+    return f"{method} {ID_SEGMENT_RE.sub(lambda match: f'/{match.group(1)}/{{id}}', path)}"
+
+
+class ARIResponse:
+    """Respuesta ya leída (la conexión vuelve al pool antes de retornar)"""
+
+    def __init__(self, status: int, data: Any = None, text: str = ''):
+        self.status = status
+        self.data = data
+        self.text = text
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+
+class ARIClient:
+    """Cliente REST de ARI compartido por toda la aplicación"""
+
+    def __init__(self, base_url: str, username: str, password: str, pool_size: int = 20,
+                 keepalive_timeout: float = 60, timeout: float = 10):
+        """
+        Args:
+            base_url: URL base de ARI (http://host:puerto/ari)
+            username: Usuario ARI
+            password: Contraseña ARI
+            pool_size: Conexiones simultáneas máximas hacia Asterisk
+            keepalive_timeout: Segundos que una conexión ociosa se mantiene abierta
+            timeout: Timeout total por petición en segundos
+        """
+        self.base_url = base_url.rstrip('/')
+        self.auth = aiohttp.BasicAuth(username, password)
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.session: Optional[aiohttp.ClientSession] = None
+
+        self.latency = LatencyRegistry()    # por endpoint
+        self.requests = CounterRegistry()   # ari_requests_total{endpoint, status}
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """Crea la sesión compartida la primera vez (debe llamarse dentro del event loop)"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                auth=self.auth,
+                timeout=self.timeout
+            )
+        return self.session
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                      json: Any = None, timeout: Optional[float] = None) -> ARIResponse:
+        """
+        Hace una petición ARI y retorna la respuesta ya leída
+
+        Los errores de conexión (aiohttp.ClientError, asyncio.TimeoutError) se
+        propagan para que cada llamador los maneje como antes.
+        """
+        endpoint = endpoint_name(method, path)
+        status = 'error'
+        started = time.perf_counter()
+        options = {'params': params, 'json': json}
+        if timeout:
+            options['timeout'] = aiohttp.ClientTimeout(total=timeout)
+        try:
+            async with self.get_session().request(method, f"{self.base_url}{path}", **options) as response:
+                status = response.status
+                text = await response.text()
+                data = None
+                if text and response.content_type == 'application/json':
+                    try:
+                        data = await response.json()
+                    except ValueError:
+                        logging.debug(f"Respuesta ARI no es JSON válido en {endpoint}")
+                return ARIResponse(response.status, data, text)
+        finally:
+            self.latency.observe(endpoint, time.perf_counter() - started)
+            self.requests.inc('ari_requests_total', endpoint=endpoint, status=str(status))
+
+    async def get(self, path: str, **kwargs) -> ARIResponse:
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> ARIResponse:
+        return await self.request('POST', path, **kwargs)
+
+    async def delete(self, path: str, **kwargs) -> ARIResponse:
+        return await self.request('DELETE', path, **kwargs)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Recuperación tras una desconexión del WebSocket de eventos ARI
+
+Mientras el WebSocket está caído pudo perderse cualquier StasisStart o
+StasisEnd. Al reconectar, plan_reconcile compara las llamadas que la
+aplicación cree vivas con /channels y /bridges y decide qué corregir; la
+aplicación ejecuta el plan reinyectando eventos sintéticos en su despachador
+(así respetan el orden por canal y usan el camino normal):
+
+- llamada cuyo canal ya no existe: StasisEnd sintético (se libera su sesión)
+- canal External Media desaparecido: StasisEnd sintético de ese canal
+- bridge desaparecido o incompleto: se recrea y se vuelven a añadir los canales
+- canal en Stasis(openai-app) sin sesión: StasisStart sintético (se adopta)
+"""
+
+import random
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple
+
+STASIS_APP = 'openai-app'
+
+
+def reconnect_delay(attempt: int, base: float, maximum: float) -> float:
+    """
+    Espera antes del intento de reconexión número `attempt` (desde 1)
+
+    Backoff exponencial con tope y jitter de hasta la mitad: varios procesos
+    que pierden Asterisk a la vez no reconectan todos en el mismo instante.
+    """
+    delay = min(maximum, base * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def is_stasis_call(channel: Dict[str, Any]) -> bool:
+    """Canal de un llamador dentro de Stasis(openai-app) (no uno creado por nosotros)"""
+    dialplan = channel.get('dialplan') or {}
+    return (not channel.get('id', '').startswith(('external_', 'UnicastRTP'))
+            and dialplan.get('app_name') == 'Stasis'
+            and (dialplan.get('app_data') or '').split(',')[0] == STASIS_APP)
+
+
+class Reattach(NamedTuple):
+    """Bridge de una llamada viva que hay que reparar"""
+    session: Any
+    exists: bool          # False = recrear el bridge antes de añadir los canales
+    missing: List[str]    # Canales que ya no están en el bridge
+
+
+class ReconcilePlan:
+    """Correcciones que necesita el estado local para coincidir con Asterisk"""
+
+    def __init__(self):
+        self.ended: List[str] = []            # Llamadas cuyo canal ya no existe
+        self.media_lost: List[str] = []       # Canales External Media desaparecidos
+        self.reattach: List[Reattach] = []
+        self.adopt: List[Dict[str, Any]] = []  # Canales en Stasis sin sesión
+
+
+def plan_reconcile(sessions: Mapping[str, Any], channels: Iterable[Dict[str, Any]],
+                   bridges: Iterable[Dict[str, Any]], queued: Iterable[str] = (),
+                   adopt: bool = True) -> ReconcilePlan:
+    """
+    Decide cómo reconciliar las llamadas locales con el listado de Asterisk
+
+    Args:
+        sessions: canal -> CallSession de las llamadas vivas (None si solo se
+                  sabe que la llamada existe, como en el supervisor)
+        channels: Listado de /channels
+        bridges: Listado de /bridges
+        queued: Canales esperando turno en la cola de admisión
+        adopt: False si el proceso solo ve parte de las llamadas (un worker):
+               adoptar tocaría las de otros
+
+    Returns:
+        ReconcilePlan
+    """
+    plan = ReconcilePlan()
+    channels = {channel.get('id'): channel for channel in channels}
+    bridges = {bridge.get('id'): bridge for bridge in bridges}
+    queued = list(queued)
+
+    plan.ended.extend(channel_id for channel_id in queued if channel_id not in channels)
+
+    for channel_id, session in sessions.items():
+        if channel_id not in channels:
+            plan.ended.append(channel_id)
+            continue
+        if session is None or session.rtp_task is None:
+            continue  # Sin sesión local, o setup en curso: sus recursos pueden no existir todavía
+        if session.external_channel and session.external_channel not in channels:
+            plan.media_lost.append(session.external_channel)
+            continue
+        if session.bridge and session.external_channel:
+            bridge = bridges.get(session.bridge)
+            members = set(bridge.get('channels', [])) if bridge else set()
+            missing = [member for member in (channel_id, session.external_channel) if member not in members]
+            if missing:
+                plan.reattach.append(Reattach(session, bridge is not None, missing))
+
+    if adopt:
+        plan.adopt = [
+            channel for channel_id, channel in channels.items()
+            if channel_id not in sessions and channel_id not in queued and is_stasis_call(channel)
+        ]
+    return plan
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Cola acotada para el audio de subida (Asterisk -> OpenAI)
+
+Reemplaza a la asyncio.Queue sin límite usada para `outgoing_audio_queue`.
+Si el WebSocket de OpenAI se atasca, la cola no crece indefinidamente: se
+aplica una política de descarte configurable y se exponen métricas de
+profundidad para cada llamada.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Dict
+
+# Políticas soportadas cuando la cola está llena
+POLICY_DROP_OLDEST = 'drop_oldest'  # Descartar el chunk más antiguo (audio viejo no sirve)
+POLICY_COALESCE = 'coalesce'        # Unir chunks antiguos en uno solo (menos mensajes al recuperar)
+POLICY_PAUSE = 'pause'              # Dejar de encolar hasta que la cola baje del umbral inferior
+
+VALID_POLICIES = (POLICY_DROP_OLDEST, POLICY_COALESCE, POLICY_PAUSE)
+
+
+class BoundedAudioQueue:
+    """Cola de chunks de audio con límite, política de desborde y detector de atasco"""
+
+    def __init__(self, maxsize: int = 40, policy: str = POLICY_DROP_OLDEST,
+                 max_coalesced_bytes: int = 4800, resume_ratio: float = 0.5):
+        """
+        Args:
+            maxsize: Número máximo de chunks en cola
+            policy: 'drop_oldest', 'coalesce' o 'pause'
+            max_coalesced_bytes: Tamaño máximo de un chunk coalescido
+            resume_ratio: Fracción de maxsize bajo la cual se reanuda en modo 'pause'
+        """
+        if policy not in VALID_POLICIES:
+            logging.warning(f"Política de cola desconocida '{policy}', usando {POLICY_DROP_OLDEST}")
+            policy = POLICY_DROP_OLDEST
+
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.max_coalesced_bytes = max_coalesced_bytes
+        self.resume_level = int(self.maxsize * resume_ratio)
+
+        self._items = deque()  # (timestamp_encolado, chunk)
+        self._not_empty = asyncio.Event()
+        self.paused = False
+        self.last_get_time = time.time()
+
+        self.metrics = {
+            'enqueued': 0,
+            'dequeued': 0,
+            'dropped_chunks': 0,
+            'dropped_bytes': 0,
+            'coalesced_chunks': 0,
+            'max_depth': 0,
+            'pauses': 0
+        }
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def full(self) -> bool:
+        return len(self._items) >= self.maxsize
+
+    def put_nowait(self, chunk: bytes) -> bool:
+        """
+        Encola un chunk aplicando la política de desborde
+
+        Returns:
+            bool: True si el chunk quedó encolado
+        """
+        if self.paused:
+            if len(self._items) > self.resume_level:
+                self._drop(chunk)
+                return False
+            self.paused = False
+            logging.info(f"Cola de subida reanudada (profundidad: {len(self._items)})")
+
+        if self.full():
+            if self.policy == POLICY_PAUSE:
+                self.paused = True
+                self.metrics['pauses'] += 1
+                logging.warning(f"Cola de subida llena ({self.maxsize} chunks), pausando envío de audio")
+                self._drop(chunk)
+                return False
+            elif self.policy == POLICY_COALESCE and self._coalesce_oldest():
+                pass
+            else:
+                _, oldest = self._items.popleft()
+                self._drop(oldest)
+
+        self._items.append((time.time(), chunk))
+        self.metrics['enqueued'] += 1
+        if len(self._items) > self.metrics['max_depth']:
+            self.metrics['max_depth'] = len(self._items)
+        self._not_empty.set()
+        return True
+
+    def _coalesce_oldest(self) -> bool:
+        """Une el par de chunks contiguos más antiguo que quepa en max_coalesced_bytes"""
+        for i in range(len(self._items) - 1):
+            ts, first = self._items[i]
+            _, second = self._items[i + 1]
+            if len(first) + len(second) <= self.max_coalesced_bytes:
+                self._items[i] = (ts, first + second)
+                del self._items[i + 1]
+                self.metrics['coalesced_chunks'] += 1
+                return True
+        return False
+
+    def _drop(self, chunk: bytes):
+        self.metrics['dropped_chunks'] += 1
+        self.metrics['dropped_bytes'] += len(chunk)
+
+    def get_nowait(self) -> bytes:
+        if not self._items:
+            raise asyncio.QueueEmpty
+        _, chunk = self._items.popleft()
+        if not self._items:
+            self._not_empty.clear()
+        self.last_get_time = time.time()
+        self.metrics['dequeued'] += 1
+        return chunk
+
+    async def get(self) -> bytes:
+        """Espera y retorna el siguiente chunk"""
+        while not self._items:
+            await self._not_empty.wait()
+        return self.get_nowait()
+
+    def clear(self):
+        """Descarta todo el audio pendiente"""
+        while self._items:
+            _, chunk = self._items.popleft()
+            self._drop(chunk)
+        self._not_empty.clear()
+
+    def oldest_age(self) -> float:
+        """Segundos que lleva esperando el chunk más antiguo (0 si la cola está vacía)"""
+        if not self._items:
+            return 0.0
+        return time.time() - self._items[0][0]
+
+    def is_stalled(self, stall_timeout: float) -> bool:
+        """
+        Detecta un atasco: hay audio pendiente y nadie ha consumido la cola
+        durante más de stall_timeout segundos
+        """
+        if not self._items:
+            return False
+        return (time.time() - self.last_get_time) > stall_timeout and self.oldest_age() > stall_timeout
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Métricas actuales de la cola para logging/exportación"""
+        data = dict(self.metrics)
+        data['depth'] = len(self._items)
+        data['oldest_age'] = round(self.oldest_age(), 3)
+        data['paused'] = self.paused
+        data['policy'] = self.policy
+        return data
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga: thread por consulta (requests) vs cliente asíncrono con pool (aiohttp)
+
+Lanza N consultas concurrentes a la API de MikroTik con cada estrategia y
+compara latencias (p50/p95/máx), tiempo total y threads vivos en el pico.
+Ambos clientes van sin caché y cada consulta lleva una pregunta distinta,
+así ninguna estrategia se ahorra peticiones a la API.
+
+Uso:
+    python3 utils/bench_mikrotik_concurrency.py [concurrencia] [pregunta]
+
+    MIKROTIK_API_URL=http://127.0.0.1:5050 python3 utils/bench_mikrotik_concurrency.py 20
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.mikrotik_api_client import MikroTikAPIClient
+from utils.mikrotik_async_client import AsyncMikroTikAPIClient
+
+API_URL = os.getenv('MIKROTIK_API_URL', 'http://10.0.0.9:5050')
+
+
+def print_separator(title):
+    """Imprime un separador visual"""
+    print("\n" + "=" * 70)
+    print(f"  {title}")
+    print("=" * 70 + "\n")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def print_results(name, latencies, wall_time, peak_threads, successes):
+    print(f"{name}:")
+    print(f"   Consultas exitosas: {successes}/{len(latencies)}")
+    print(f"   Tiempo total:       {wall_time:.2f}s")
+    print(f"   Latencia p50:       {percentile(latencies, 50):.3f}s")
+    print(f"   Latencia p95:       {percentile(latencies, 95):.3f}s")
+    print(f"   Latencia máx:       {max(latencies) if latencies else 0:.3f}s")
+    print(f"   Threads en el pico: {peak_threads}")
+
+
+class ThreadSampler:
+    """Muestrea threading.active_count() para capturar el pico"""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while self.running:
+            self.peak = max(self.peak, threading.active_count())
+            time.sleep(0.005)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.running = False
+        self.thread.join()
+
+
+def distinct_questions(question, concurrency):
+    """
+    Una pregunta distinta por consulta: con la misma pregunta el cliente
+    asíncrono haría una sola petición (coalescencia) y la comparación con
+    los threads dejaría de medir el transporte
+    """
+    return [f"{question} (consulta {index + 1})" for index in range(concurrency)]
+
+
+def bench_threads(concurrency, question):
+    """Estrategia anterior: un thread y una conexión nueva por consulta"""
+    client = MikroTikAPIClient(api_url=API_URL, enable_cache=False)
+    latencies = []
+    successes = []
+    lock = threading.Lock()
+
+    def worker(question):
+        start = time.perf_counter()
+        result = client.query(question, timeout=15)
+        with lock:
+            latencies.append(time.perf_counter() - start)
+            successes.append(result.get('success', False))
+
+    with ThreadSampler() as sampler:
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(target=worker, args=(text,), daemon=True)
+            for text in distinct_questions(question, concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_time = time.perf_counter() - start
+
+    print_results("Thread por consulta (requests)", latencies, wall_time, sampler.peak, sum(successes))
+
+
+async def bench_async(concurrency, question):
+    """Estrategia nueva: tareas en un solo event loop con pool keep-alive"""
+    client = AsyncMikroTikAPIClient(api_url=API_URL, pool_size=concurrency, enable_cache=False)
+    latencies = []
+    successes = []
+
+    async def worker(question):
+        start = time.perf_counter()
+        result = await client.query(question, timeout=15)
+        latencies.append(time.perf_counter() - start)
+        successes.append(result.get('success', False))
+
+    try:
+        # Calentar el pool para medir el estado estable (conexiones reutilizadas)
+        await client.check_health()
+        with ThreadSampler() as sampler:
+            start = time.perf_counter()
+            await asyncio.gather(*(worker(text) for text in distinct_questions(question, concurrency)))
+            wall_time = time.perf_counter() - start
+    finally:
+        await client.close()
+
+    print_results("Async con pool (aiohttp)", latencies, wall_time, sampler.peak, sum(successes))
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    question = sys.argv[2] if len(sys.argv) > 2 else "¿Qué routers están configurados?"
+
+    print_separator(f"Carga: {concurrency} consultas concurrentes a {API_URL}")
+    print(f"Pregunta: {question}\n")
+
+    bench_threads(concurrency, question)
+    print()
+    asyncio.run(bench_async(concurrency, question))
+
+
+if __name__ == "__main__":
+    main()
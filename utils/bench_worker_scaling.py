@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Modelo de escalado: llamadas sostenidas por host según el número de procesos
+
+Es un modelo, no una prueba del modo supervisor: no arranca SupervisorApp ni
+WorkerPool, no hay socket entre procesos ni eventos ARI. Cada proceso es un
+event loop independiente que reproduce solo la carga de CPU por llamada de
+handle_incoming_call.py, sin Asterisk ni OpenAI, para estimar el techo de
+un proceso y cuánto se gana repartiendo llamadas entre núcleos. El costo del
+supervisor (reenviar eventos ARI, reportes) no está incluido; validar el modo
+multiproceso requiere llamadas reales con INBOUND_WORKERS > 1.
+
+Carga simulada por llamada:
+
+- subida: un paquete RTP cada 20 ms (parseo de cabecera y buffer) y cada
+  600 bytes un input_audio_buffer.append (base64 + json.dumps)
+- bajada: un response.audio.delta cada 100 ms (json.loads + base64) y un
+  paquete RTP cada 20 ms enviado por UDP a un socket local
+
+Cada worker sube la cantidad de llamadas hasta que el p95 del retraso de los
+ticks de 20 ms pasa el umbral (por defecto 20 ms: un paquete de jitter). La
+capacidad del host es la suma de las capacidades de los workers corriendo a
+la vez, así la tabla muestra cuánto escala con los núcleos disponibles.
+
+Uso:
+    python3 utils/bench_worker_scaling.py [max_workers] [umbral_ms]
+
+    python3 utils/bench_worker_scaling.py 8 20
+"""
+
+import asyncio
+import base64
+import json
+import multiprocessing
+import os
+import socket
+import struct
+import sys
+import time
+import warnings
+
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', DeprecationWarning)
+    from audioop import ulaw2lin
+
+PACKET_INTERVAL = 0.020   # 20 ms de audio por paquete RTP
+PAYLOAD_BYTES = 160       # G.711 a 8 kHz
+UPLINK_CHUNK = 600        # bytes acumulados antes de enviar a OpenAI
+DELTA_INTERVAL = 5        # un delta de OpenAI cada 5 paquetes (100 ms)
+WINDOW_SECONDS = 1.0      # duración de cada escalón de carga
+MAX_CALLS = 5000
+
+
+def print_separator(title):
+    """Imprime un separador visual"""
+    print("\n" + "=" * 70)
+    print(f"  {title}")
+    print("=" * 70 + "\n")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class SimulatedCall:
+    """Trabajo por paquete de una llamada (sin red externa)"""
+
+    def __init__(self, sink, sink_address):
+        self.sink = sink
+        self.sink_address = sink_address
+        self.sequence = 0
+        self.timestamp = 0
+        self.ssrc = 0x1234
+        self.uplink_buffer = b''
+        self.downlink_audio = b''
+        self.inbound_packet = struct.pack('!BBHII', 0x80, 0, 0, 0, 0x5678) + bytes(range(PAYLOAD_BYTES))
+        self.delta_message = json.dumps({
+            'type': 'response.audio.delta',
+            'delta': base64.b64encode(os.urandom(PAYLOAD_BYTES * DELTA_INTERVAL)).decode('utf-8')
+        })
+
+    def tick(self):
+        # Subida: cabecera RTP, payload y envío a OpenAI cada 600 bytes
+        header = struct.unpack('!BBHII', self.inbound_packet[:12])
+        self.uplink_buffer += self.inbound_packet[12:]
+        ulaw2lin(self.inbound_packet[12:], 2)  # VAD / normalización en PCM
+        if len(self.uplink_buffer) >= UPLINK_CHUNK:
+            json.dumps({
+                'event_id': f"audio_{header[3]}",
+                'type': 'input_audio_buffer.append',
+                'audio': base64.b64encode(self.uplink_buffer[:UPLINK_CHUNK]).decode('utf-8')
+            })
+            self.uplink_buffer = self.uplink_buffer[UPLINK_CHUNK:]
+
+        # Bajada: delta de OpenAI cada 100 ms, un paquete RTP cada 20 ms
+        if self.sequence % DELTA_INTERVAL == 0:
+            self.downlink_audio += base64.b64decode(json.loads(self.delta_message)['delta'])
+        payload, self.downlink_audio = self.downlink_audio[:PAYLOAD_BYTES], self.downlink_audio[PAYLOAD_BYTES:]
+        packet = struct.pack('!BBHII', 0x80, 0, self.sequence & 0xFFFF, self.timestamp & 0xFFFFFFFF, self.ssrc) + payload
+        try:
+            self.sink.sendto(packet, self.sink_address)
+        except BlockingIOError:
+            pass  # Buffer del socket sumidero lleno: el costo del syscall ya se pagó
+        self.sequence += 1
+        self.timestamp += PAYLOAD_BYTES
+
+
+async def run_call(call, lateness, stop):
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
+    while not stop.is_set():
+        next_tick += PACKET_INTERVAL
+        delay = next_tick - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        lateness.append(max(0.0, loop.time() - next_tick))
+        call.tick()
+
+
+async def find_capacity(threshold):
+    """Sube la carga por escalones hasta que el p95 del retraso supera el umbral"""
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(('127.0.0.1', 0))
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sender.setblocking(False)
+    stop = asyncio.Event()
+    tasks = []
+    lateness = []
+    capacity = 0
+    try:
+        calls = 5
+        while calls <= MAX_CALLS:
+            while len(tasks) < calls:
+                call = SimulatedCall(sender, sink.getsockname())
+                tasks.append(asyncio.create_task(run_call(call, lateness, stop)))
+            # Medio escalón para estabilizar, medio para medir
+            await asyncio.sleep(WINDOW_SECONDS / 2)
+            lateness.clear()
+            await asyncio.sleep(WINDOW_SECONDS / 2)
+            if percentile(lateness, 95) > threshold:
+                break
+            capacity = calls
+            calls += max(5, calls // 4)
+    finally:
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        sink.close()
+        sender.close()
+    return capacity
+
+
+def worker_main(threshold, barrier, results):
+    barrier.wait()  # Todos los workers cargan el host a la vez
+    results.put(asyncio.run(find_capacity(threshold)))
+
+
+def bench(workers, threshold):
+    barrier = multiprocessing.Barrier(workers)
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker_main, args=(threshold, barrier, results))
+        for _ in range(workers)
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    capacities = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return capacities, time.perf_counter() - started
+
+
+def main():
+    cores = os.cpu_count() or 1
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else cores
+    threshold = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else PACKET_INTERVAL
+
+    counts = []
+    count = 1
+    while count < max_workers:
+        counts.append(count)
+        count *= 2
+    counts.append(max_workers)
+
+    print_separator(f"Modelo de escalado por procesos: {cores} núcleos, umbral p95 {threshold * 1000:.0f} ms")
+    print("Carga de CPU simulada por llamada; no incluye el supervisor ni el socket entre procesos.\n")
+    print(f"{'Workers':>8} {'Llamadas':>10} {'Por worker':>11} {'Escalado':>9} {'Mín/Máx':>12} {'Tiempo':>8}")
+    baseline = None
+    for workers in counts:
+        capacities, elapsed = bench(workers, threshold)
+        total = sum(capacities)
+        baseline = baseline or total or 1
+        print(
+            f"{workers:>8} {total:>10} {total / workers:>11.1f} {total / baseline:>8.2f}x "
+            f"{min(capacities):>5}/{max(capacities):<6} {elapsed:>7.1f}s"
+        )
+    if max_workers > cores:
+        print(f"\nCon más workers que núcleos ({cores}) la capacidad deja de crecer: compiten por la CPU.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Instrumentación de latencia por llamada
+
+- CallTimeline: línea de tiempo de una llamada (StasisStart, bridge, sesión
+  lista, cada turno, function calls...) que se vuelca a JSON al colgar.
+- LatencyRegistry: histogramas de latencia agregados a nivel de proceso
+  (p50/p95/p99), alimentados por todas las timelines.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+
+class LatencyHistogram:
+    """Histograma de latencias con muestras recientes para calcular percentiles"""
+
+    def __init__(self, max_samples: int = 2048):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self.lock:
+            self.samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    @staticmethod
+    def _percentile(ordered: List[float], pct: float) -> float:
+        if not ordered:
+            return 0.0
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            ordered = sorted(self.samples)
+            count = self.count
+            total = self.total
+            max_value = self.max
+        return {
+            'count': count,
+            'sum': round(total, 4),
+            'mean': round(total / count, 4) if count else 0.0,
+            'p50': round(self._percentile(ordered, 50), 4),
+            'p95': round(self._percentile(ordered, 95), 4),
+            'p99': round(self._percentile(ordered, 99), 4),
+            'max': round(max_value, 4)
+        }
+
+
+class LatencyRegistry:
+    """Conjunto de histogramas con nombre, compartido por todo el proceso"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            items = list(self.histograms.items())
+        return {name: histogram.snapshot() for name, histogram in items}
+
+
+class CounterRegistry:
+    """Contadores monotónicos del proceso, con etiquetas opcionales"""
+
+    def __init__(self):
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def snapshot(self) -> Dict[tuple, float]:
+        with self.lock:
+            return dict(self.values)
+
+
+# Histogramas y contadores globales del proceso
+LATENCY = LatencyRegistry()
+COUNTERS = CounterRegistry()
+
+
+class CallTimeline:
+    """Registra los hitos de una llamada y deriva latencias de turno y de setup"""
+
+    def __init__(self, channel_id: str, registry: LatencyRegistry = LATENCY):
+        self.channel_id = channel_id
+        self.registry = registry
+        self.started_at = time.time()
+        self.events = []  # (nombre, segundos desde el inicio, extra)
+        self.first_marks = {}
+        self.latencies = {}
+        self.lock = threading.Lock()
+
+        # Estado del turno en curso (speech_stopped -> primer audio -> primer RTP)
+        self.turn_started_at = None
+        self.awaiting_audio = False
+        self.awaiting_rtp = False
+        self.function_calls = {}
+        self.tool_response_at = None  # response.create tras resultados de herramientas
+
+    def mark(self, name: str, **extra) -> float:
+        """Registra un hito y retorna su marca de tiempo absoluta"""
+        now = time.time()
+        with self.lock:
+            self.events.append((name, round(now - self.started_at, 4), extra or None))
+            self.first_marks.setdefault(name, now)
+        return now
+
+    def mark_once(self, name: str, **extra) -> Optional[float]:
+        """Registra un hito solo la primera vez"""
+        if name in self.first_marks:
+            return None
+        return self.mark(name, **extra)
+
+    def observe(self, name: str, seconds: float):
+        """Guarda una latencia en la llamada y en el histograma global"""
+        with self.lock:
+            self.latencies.setdefault(name, []).append(round(seconds, 4))
+        self.registry.observe(name, seconds)
+
+    def observe_between(self, name: str, start_mark: str, end_mark: str):
+        """Observa la latencia entre dos hitos ya registrados"""
+        start = self.first_marks.get(start_mark)
+        end = self.first_marks.get(end_mark)
+        if start is not None and end is not None:
+            self.observe(name, end - start)
+
+    # Hitos de turno -------------------------------------------------------
+
+    def speech_stopped(self):
+        self.turn_started_at = self.mark('speech_stopped')
+        self.awaiting_audio = True
+        self.awaiting_rtp = True
+
+    def audio_delta(self):
+        """Primer response.audio.delta del turno"""
+        self.mark_once('first_audio_delta')
+        if self.awaiting_audio:
+            self.awaiting_audio = False
+            now = self.mark('turn_first_audio_delta')
+            self.observe('turn_latency', now - self.turn_started_at)
+
+    def rtp_sent(self):
+        """Primer paquete RTP enviado del turno"""
+        if 'first_rtp_out' not in self.first_marks:
+            self.mark('first_rtp_out')
+            self.observe_between('call_first_audio', 'stasis_start', 'first_rtp_out')
+        if self.awaiting_rtp and not self.awaiting_audio:
+            self.awaiting_rtp = False
+            now = self.mark('turn_first_rtp_out')
+            self.observe('turn_playout_latency', now - self.turn_started_at)
+
+    # Function calls -------------------------------------------------------
+
+    def function_call_started(self, call_id: str, name: str):
+        self.function_calls[call_id] = self.mark('function_call_start', call_id=call_id, tool=name)
+
+    def function_call_finished(self, call_id: str, success: bool = True):
+        started = self.function_calls.pop(call_id, None)
+        now = self.mark('function_call_end', call_id=call_id, success=success)
+        if started is not None:
+            self.observe('function_call', now - started)
+
+    def tool_response_requested(self):
+        self.tool_response_at = self.mark('tool_response_requested')
+
+    def tool_audio_delta(self, name: str = 'tool_result_first_audio') -> Optional[float]:
+        """Primer audio tras entregar resultados de herramientas; retorna la latencia una sola vez"""
+        if self.tool_response_at is None:
+            return None
+        now = self.mark('tool_first_audio_delta')
+        latency = now - self.tool_response_at
+        self.tool_response_at = None
+        self.observe(name, latency)
+        return latency
+
+    # Exportación ----------------------------------------------------------
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'channel_id': self.channel_id,
+                'started_at': self.started_at,
+                'duration': round(time.time() - self.started_at, 3),
+                'events': [
+                    {'event': name, 't': offset, **({'extra': extra} if extra else {})}
+                    for name, offset, extra in self.events
+                ],
+                'latencies': dict(self.latencies)
+            }
+
+    def dump(self, directory: str) -> Optional[str]:
+        """Escribe la timeline en <directory>/<channel_id>.json"""
+        try:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{self.channel_id}.json")
+            with open(path, 'w') as f:
+                json.dump(
+                    {'call': self.to_dict(), 'process_latency': self.registry.snapshot()},
+                    f, indent=2, ensure_ascii=False
+                )
+            return path
+        except Exception as e:
+            logging.error(f"Error guardando timeline de la llamada {self.channel_id}: {e}")
+            return None
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Recursos de una llamada y su liberación determinista
+
+CallSession es dueña de todo lo que se crea para una llamada: la sesión
+Realtime de OpenAI (WebSocket y su thread), la tarea y el socket RTP, el
+canal External Media y el bridge. Al colgar se liberan siempre en el mismo
+orden, cada paso con su timeout, de modo que un paso colgado no impide los
+siguientes:
+
+    1. openai   - cerrar el WebSocket y esperar al thread (deja de facturar)
+    2. rtp_task - cancelar el bucle de audio
+    3. rtp      - cerrar el socket UDP
+    4. asterisk - colgar el canal External Media y destruir el bridge
+                  (en paralelo: Asterisk no exige orden entre ambos)
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from utils.call_metrics import LATENCY, COUNTERS
+
+TEARDOWN_STEPS = ('openai', 'rtp_task', 'rtp', 'asterisk')
+
+# Atributos que son recursos de Asterisk (indexables por id)
+ARI_RESOURCES = ('external_channel', 'unicast_channel', 'bridge')
+
+
+class CallSession:
+    """Todos los recursos de una llamada entrante"""
+
+    def __init__(self, channel_id: str, ari, timeline=None, step_timeout: float = 3.0):
+        """
+        Args:
+            channel_id: Canal original de la llamada
+            ari: ARIClient para liberar los recursos de Asterisk
+            timeline: CallTimeline de la llamada
+            step_timeout: Segundos máximos por paso de liberación
+        """
+        self.channel_id = channel_id
+        self.ari = ari
+        self.timeline = timeline
+        self.step_timeout = step_timeout
+
+        self.external_channel: Optional[str] = None
+        self.unicast_channel: Optional[str] = None
+        self.bridge: Optional[str] = None
+        self.port: Optional[int] = None
+        self.rtp_handler = None
+        self.rtp_task: Optional[asyncio.Task] = None
+
+        self.state = 'open'  # open -> closing -> closed
+        self.teardown_times: Dict[str, float] = {}
+
+    @property
+    def openai_client(self):
+        return self.rtp_handler.openai_client if self.rtp_handler else None
+
+    def ari_resources(self) -> List[str]:
+        """IDs de canales y bridges de Asterisk creados para esta llamada"""
+        return [getattr(self, kind) for kind in ARI_RESOURCES if getattr(self, kind)]
+
+    async def close(self, reason: str = 'hangup') -> Dict[str, float]:
+        """
+        Libera todos los recursos en orden fijo (idempotente)
+
+        Returns:
+            Duración en segundos de cada paso
+        """
+        if self.state != 'open':
+            return self.teardown_times
+        self.state = 'closing'
+        started = time.perf_counter()
+
+        for step in TEARDOWN_STEPS:
+            step_started = time.perf_counter()
+            try:
+                await asyncio.wait_for(getattr(self, f'close_{step}')(), timeout=self.step_timeout)
+            except asyncio.TimeoutError:
+                COUNTERS.inc('call_teardown_timeouts_total', step=step)
+                logging.warning(f"Timeout liberando {step} de la llamada {self.channel_id} ({self.step_timeout}s)")
+            except Exception as e:
+                logging.error(f"Error liberando {step} de la llamada {self.channel_id}: {e}")
+            self.teardown_times[step] = round(time.perf_counter() - step_started, 4)
+
+        total = time.perf_counter() - started
+        LATENCY.observe('call_teardown', total)
+        COUNTERS.inc('call_sessions_closed_total', reason=reason)
+        self.state = 'closed'
+        logging.info(
+            f"Sesión de llamada {self.channel_id} cerrada ({reason}) en {total:.3f}s: "
+            f"{self.teardown_times}"
+        )
+        return self.teardown_times
+
+    async def close_openai(self):
+        client = self.openai_client
+        if client is None:
+            return
+        # close() espera el handshake de cierre del WebSocket (puede tardar segundos):
+        # en un thread, para no detener el audio ni los eventos ARI de las demás llamadas
+        await asyncio.to_thread(client.close)
+        thread = getattr(client, 'thread', None)
+        if thread and thread.is_alive():
+            await asyncio.to_thread(thread.join, self.step_timeout)
+            if thread.is_alive():
+                raise asyncio.TimeoutError()
+
+    async def close_rtp_task(self):
+        task = self.rtp_task
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def close_rtp(self):
+        if self.rtp_handler:
+            await self.rtp_handler.cleanup()
+
+    async def close_asterisk(self):
+        await asyncio.gather(self.close_external_channel(), self.close_bridge())
+
+    async def close_external_channel(self):
+        if not self.external_channel:
+            return
+        response = await self.ari.delete(f"/channels/{self.external_channel}")
+        if response.status in [204, 404]:
+            logging.info(f"Canal External Media cerrado: {self.external_channel}")
+        else:
+            logging.warning(f"Error cerrando canal {self.external_channel}: {response.status}")
+
+    async def close_bridge(self):
+        if not self.bridge:
+            return
+        response = await self.ari.delete(f"/bridges/{self.bridge}")
+        if response.status in [200, 204, 404]:
+            logging.info(f"Bridge {self.bridge} eliminado correctamente")
+        else:
+            logging.warning(f"Error eliminando bridge {self.bridge}: {response.status} - {response.text}")
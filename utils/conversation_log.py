@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Log compacto de la conversación para reanudar una sesión de OpenAI Realtime
+
+Tras una caída del WebSocket la sesión nueva empieza vacía: se le reenvían
+los últimos turnos (mensajes de texto, llamadas a herramientas y sus
+resultados). El log guarda un máximo de items y expulsa los más viejos; al
+reproducirlo, un resultado cuya llamada ya se expulsó se omite, porque la API
+rechaza un function_call_output sin su function_call.
+"""
+
+from collections import deque
+from typing import Any, Dict, Iterable, List
+
+
+class ConversationLog:
+    """Últimos items de la conversación en formato conversation.item.create"""
+
+    def __init__(self, max_items: int = 30):
+        self.items = deque(maxlen=max_items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def append(self, item: Dict[str, Any]):
+        self.items.append(item)
+
+    def replay_items(self, acknowledged: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        """
+        Items a reproducir en una sesión nueva, con cada llamada y su resultado juntos
+
+        Args:
+            acknowledged: call_ids cuyo resultado la sesión nueva ya confirmó
+                          (conversation.item.created); no se envían dos veces
+        """
+        acknowledged = set(acknowledged)
+        calls = {item.get('call_id') for item in self.items if item.get('type') == 'function_call'}
+        replay = []
+        for item in self.items:
+            if item.get('type') == 'function_call_output':
+                call_id = item.get('call_id')
+                if call_id not in calls or call_id in acknowledged:
+                    continue
+            replay.append(item)
+        return replay
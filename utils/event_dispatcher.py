@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Despacho no bloqueante de eventos ARI
+
+El bucle del WebSocket de ARI solo lee, decodifica y encola: cada canal
+tiene su propia cola y su propio worker, así un setup lento de una llamada
+no retrasa los eventos de las demás, y los eventos de un mismo canal se
+procesan en el orden en que llegaron (StasisStart antes que StasisEnd).
+Los workers terminan solos tras un rato sin eventos.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from utils.call_metrics import LATENCY
+
+GLOBAL_KEY = '_global'
+
+
+def event_key(event: Dict[str, Any]) -> str:
+    """Clave de orden de un evento: su canal, si no su bridge, si no una cola global"""
+    channel = event.get('channel') or {}
+    if channel.get('id'):
+        return channel['id']
+    bridge = event.get('bridge') or {}
+    if bridge.get('id'):
+        return bridge['id']
+    return GLOBAL_KEY
+
+
+def event_age(event: Dict[str, Any]) -> Optional[float]:
+    """Segundos desde el timestamp que puso Asterisk en el evento (None si no viene o no se entiende)"""
+    timestamp = event.get('timestamp')
+    if not timestamp:
+        return None
+    try:
+        emitted = datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S.%f%z')
+    except ValueError:
+        return None
+    return time.time() - emitted.timestamp()
+
+
+class ChannelEventDispatcher:
+    """Una cola FIFO y un worker por canal"""
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Awaitable[None]], idle_timeout: float = 30):
+        """
+        Args:
+            handler: Corrutina que procesa un evento
+            idle_timeout: Segundos sin eventos tras los cuales el worker del canal termina
+        """
+        self.handler = handler
+        self.idle_timeout = idle_timeout
+        self.queues: Dict[str, asyncio.Queue] = {}
+        self.workers: Dict[str, asyncio.Task] = {}
+        self.metrics = {
+            'dispatched': 0,
+            'processed': 0,
+            'errors': 0,
+            'max_queue_depth': 0
+        }
+
+    def dispatch(self, event: Dict[str, Any]):
+        """Encola el evento sin esperar a que se procese"""
+        key = event_key(event)
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = self.queues[key] = asyncio.Queue()
+            self.workers[key] = asyncio.create_task(self.run_worker(key, queue))
+        queue.put_nowait((time.monotonic(), event))
+        self.metrics['dispatched'] += 1
+        self.metrics['max_queue_depth'] = max(self.metrics['max_queue_depth'], queue.qsize())
+
+    async def run_worker(self, key: str, queue: asyncio.Queue):
+        try:
+            while True:
+                try:
+                    received_at, event = await asyncio.wait_for(queue.get(), timeout=self.idle_timeout)
+                except asyncio.TimeoutError:
+                    if queue.empty():
+                        break
+                    continue
+
+                # Lag en cola (recepción -> inicio de proceso) y lag total desde Asterisk
+                LATENCY.observe('ari_event_queue_lag', time.monotonic() - received_at)
+                age = event_age(event)
+                if age is not None and age >= 0:
+                    LATENCY.observe('ari_event_lag', age)
+
+                try:
+                    await self.handler(event)
+                    self.metrics['processed'] += 1
+                except Exception as e:
+                    self.metrics['errors'] += 1
+                    logging.error(f"Error procesando evento {event.get('type', 'unknown')} de {key}: {e}")
+                    logging.exception("Detalles del error:")
+        except asyncio.CancelledError:
+            pass
+        finally:
+            # Sin await entre el último get y el borrado: dispatch() no puede colarse en medio
+            if self.queues.get(key) is queue:
+                del self.queues[key]
+                del self.workers[key]
+
+    def queue_depth(self) -> int:
+        return sum(queue.qsize() for queue in self.queues.values())
+
+    async def close(self):
+        workers = list(self.workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Audio de relleno mientras se ejecuta una herramienta
+
+Las consultas a MikroTik pueden tardar 10-30 s y, si el modelo no improvisa,
+el cliente escucha silencio. Este módulo carga en memoria (una sola vez, al
+arrancar) clips µ-law 8 kHz y los entrega en frames RTP de 20 ms:
+- Clips hablados ("un momento por favor") que se reproducen una vez
+- Tonos de espera suaves que se repiten hasta que llega el audio del resultado
+
+Clips en FILLER_AUDIO_DIR: archivos .ulaw/.raw (µ-law 8 kHz crudo) o .wav
+(PCM o µ-law, se convierte). Los que empiezan por "hold" son tonos de espera;
+el resto son clips hablados en orden alfabético. Si no hay tonos de espera se
+genera uno sintético.
+"""
+
+import audioop
+import logging
+import os
+import threading
+import time
+import wave
+from typing import List, Optional
+
+import numpy as np
+
+SAMPLE_RATE = 8000
+FRAME_BYTES = 160  # 20 ms de µ-law a 8 kHz
+ULAW_SILENCE = b'\xff'
+
+
+def pcm16_to_ulaw(pcm: bytes) -> bytes:
+    return audioop.lin2ulaw(pcm, 2)
+
+
+def load_wav_as_ulaw(path: str) -> bytes:
+    """Lee un WAV y lo convierte a µ-law mono 8 kHz"""
+    with wave.open(path, 'rb') as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+        compression = wav.getcomptype()
+
+    if compression == 'ULAW' or (width == 1 and compression != 'NONE'):
+        frames = audioop.ulaw2lin(frames, 1)
+        width = 2
+    if width != 2:
+        frames = audioop.lin2lin(frames, width, 2)
+    if channels == 2:
+        frames = audioop.tomono(frames, 2, 0.5, 0.5)
+    if rate != SAMPLE_RATE:
+        frames, _ = audioop.ratecv(frames, 2, 1, rate, SAMPLE_RATE, None)
+    return pcm16_to_ulaw(frames)
+
+
+def synth_hold_tone(frequency: float = 440.0, tone_seconds: float = 0.25,
+                    pause_seconds: float = 1.75, amplitude: float = 0.08) -> bytes:
+    """Tono de espera suave: un pitido corto con fundido y una pausa"""
+    samples = int(SAMPLE_RATE * tone_seconds)
+    t = np.arange(samples) / SAMPLE_RATE
+    envelope = np.minimum(1.0, np.minimum(t, tone_seconds - t) / 0.03)
+    tone = amplitude * 32767 * envelope * np.sin(2 * np.pi * frequency * t)
+    pcm = tone.astype(np.int16).tobytes()
+    silence = ULAW_SILENCE * int(SAMPLE_RATE * pause_seconds)
+    return pcm16_to_ulaw(pcm) + silence
+
+
+def split_frames(clip: bytes) -> List[bytes]:
+    """Parte un clip en frames de 20 ms (el último se rellena con silencio)"""
+    frames = []
+    for offset in range(0, len(clip), FRAME_BYTES):
+        frame = clip[offset:offset + FRAME_BYTES]
+        if len(frame) < FRAME_BYTES:
+            frame += ULAW_SILENCE * (FRAME_BYTES - len(frame))
+        frames.append(frame)
+    return frames
+
+
+class FillerLibrary:
+    """Clips de relleno precargados en memoria, ya partidos en frames RTP"""
+
+    def __init__(self, prompts: Optional[List[List[bytes]]] = None,
+                 holds: Optional[List[List[bytes]]] = None):
+        self.prompts = prompts or []
+        self.holds = holds or [split_frames(synth_hold_tone())]
+
+    @classmethod
+    def load(cls, directory: Optional[str]) -> 'FillerLibrary':
+        """Carga los clips de un directorio; sin directorio solo queda el tono sintético"""
+        prompts, holds = [], []
+        if directory and os.path.isdir(directory):
+            for filename in sorted(os.listdir(directory)):
+                path = os.path.join(directory, filename)
+                extension = os.path.splitext(filename)[1].lower()
+                try:
+                    if extension in ('.ulaw', '.raw', '.ul'):
+                        with open(path, 'rb') as clip_file:
+                            clip = clip_file.read()
+                    elif extension == '.wav':
+                        clip = load_wav_as_ulaw(path)
+                    else:
+                        continue
+                except Exception as e:
+                    logging.error(f"No se pudo cargar el clip de relleno {path}: {e}")
+                    continue
+                if not clip:
+                    continue
+                (holds if filename.lower().startswith('hold') else prompts).append(split_frames(clip))
+        elif directory:
+            logging.warning(f"Directorio de audio de relleno no encontrado: {directory}")
+
+        library = cls(prompts, holds)
+        logging.info(
+            f"Audio de relleno cargado: {len(library.prompts)} clips hablados, "
+            f"{len(library.holds)} tonos de espera"
+        )
+        return library
+
+
+class FillerPlayer:
+    """
+    Reproductor de relleno de una llamada
+
+    start()/stop() se llaman desde el thread del WebSocket de OpenAI y
+    next_frame() desde la tarea que envía RTP en el event loop.
+    """
+
+    def __init__(self, library: FillerLibrary, start_delay: float = 1.0, max_seconds: float = 45.0):
+        """
+        Args:
+            library: Clips precargados
+            start_delay: Segundos de espera antes del primer frame (las consultas
+                         rápidas o cacheadas no llegan a sonar)
+            max_seconds: Tiempo máximo de relleno por herramienta
+        """
+        self.library = library
+        self.start_delay = start_delay
+        self.max_seconds = max_seconds
+        self.lock = threading.Lock()
+        self.active = False
+        self.waiting_audio = False
+        self.started_at = 0.0
+        self.frames: List[bytes] = []
+        self.position = 0
+        self.prompt_index = 0
+        self.hold_index = 0
+        self.metrics = {'activations': 0, 'frames_played': 0}
+
+    def start(self, wait_for_audio: bool = False):
+        """
+        Args:
+            wait_for_audio: True si la respuesta que pidió la herramienta todavía puede
+                            estar enviando audio; el relleno no suena hasta audio_finished()
+        """
+        with self.lock:
+            if self.active:
+                return
+            self.active = True
+            self.waiting_audio = wait_for_audio
+            self.started_at = time.monotonic()
+            # Primero un clip hablado (rotando entre herramientas), luego tonos de espera
+            self.frames = self.next_prompt() or self.next_hold()
+            self.position = 0
+            self.metrics['activations'] += 1
+
+    def stop(self):
+        with self.lock:
+            self.active = False
+            self.waiting_audio = False
+
+    def audio_finished(self):
+        """Terminó el audio previo a la herramienta; el retardo inicial cuenta desde ahora"""
+        with self.lock:
+            if self.active and self.waiting_audio:
+                self.waiting_audio = False
+                self.started_at = time.monotonic()
+
+    def next_prompt(self) -> List[bytes]:
+        if not self.library.prompts:
+            return []
+        clip = self.library.prompts[self.prompt_index % len(self.library.prompts)]
+        self.prompt_index += 1
+        return clip
+
+    def next_hold(self) -> List[bytes]:
+        clip = self.library.holds[self.hold_index % len(self.library.holds)]
+        self.hold_index += 1
+        return clip
+
+    def next_frame(self) -> Optional[bytes]:
+        """Retorna el siguiente frame de 20 ms, o None si todavía no debe sonar nada"""
+        with self.lock:
+            if not self.active or self.waiting_audio:
+                return None
+            elapsed = time.monotonic() - self.started_at
+            if elapsed < self.start_delay:
+                return None
+            if elapsed > self.start_delay + self.max_seconds:
+                self.active = False
+                logging.info("Audio de relleno detenido: se alcanzó el tiempo máximo")
+                return None
+            if self.position >= len(self.frames):
+                self.frames = self.next_hold()
+                self.position = 0
+            frame = self.frames[self.position]
+            self.position += 1
+            self.metrics['frames_played'] += 1
+            return frame
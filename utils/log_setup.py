@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Logging no bloqueante para el servicio de llamadas
+
+Los handlers del hot path (event loop, threads de WebSocket) solo encolan el
+registro mediante un QueueHandler; un QueueListener en su propio thread hace
+la escritura real al archivo, a la consola y al sink JSONL. Así un disco
+lento nunca retrasa el ciclo de audio de 20 ms.
+
+También incluye:
+- Contexto por llamada (channel_id) mediante contextvars
+- Límite de tasa para mensajes DEBUG/INFO repetidos en el hot path
+- Formateador JSONL para logs estructurados
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from typing import Optional
+
+# Canal de la llamada en curso; las tareas asyncio lo heredan al crearse
+current_channel = contextvars.ContextVar('channel_id', default='-')
+
+LOG_FORMAT = '%(asctime)s.%(msecs)03d - %(levelname)s - %(funcName)s - [%(channel_id)s] - %(message)s'
+LOG_DATEFMT = '%Y-%m-%d %H:%M:%S'
+CONSOLE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(channel_id)s] - %(message)s'
+
+
+def bind_channel(channel_id: Optional[str]):
+    """Asocia el contexto actual (tarea o thread) a una llamada"""
+    return current_channel.set(channel_id or '-')
+
+
+class ChannelContextFilter(logging.Filter):
+    """Añade record.channel_id desde el contexto del productor del log"""
+
+    def filter(self, record):
+        if not hasattr(record, 'channel_id'):
+            record.channel_id = current_channel.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limita la tasa de mensajes DEBUG/INFO por punto de origen (archivo:línea)
+
+    Los WARNING y superiores nunca se descartan. Cuando una ventana se cierra
+    con mensajes suprimidos, el siguiente registro emitido lo indica.
+    """
+
+    def __init__(self, max_per_interval: int = 20, interval: float = 1.0):
+        super().__init__()
+        self.max_per_interval = max_per_interval
+        self.interval = interval
+        self.windows = {}  # origen -> [inicio_ventana, emitidos, suprimidos]
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self.windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.getMessage()} (+{suppressed} mensajes similares suprimidos)"
+                    record.args = None
+                return True
+            if window[1] < self.max_per_interval:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+class JsonlFormatter(logging.Formatter):
+    """Una línea JSON por registro, para análisis posterior"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'func': record.funcName,
+            'thread': record.threadName,
+            'channel_id': getattr(record, 'channel_id', '-'),
+            'msg': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SampledLog:
+    """Emite uno de cada N mensajes de un evento muy frecuente (p. ej. audio delta)"""
+
+    def __init__(self, every: int = 50, level: int = logging.DEBUG):
+        self.every = max(1, every)
+        self.level = level
+        self.counts = {}
+
+    def log(self, key: str, message: str):
+        count = self.counts.get(key, 0) + 1
+        self.counts[key] = count
+        if count % self.every == 1 or self.every == 1:
+            logging.log(self.level, f"{message} (#{count})")
+
+
+def setup_logging(log_file: str, jsonl_file: Optional[str] = None, level: int = logging.DEBUG,
+                  console: bool = True, rate_limit: int = 20) -> logging.handlers.QueueListener:
+    """
+    Configura el logging raíz con QueueHandler/QueueListener
+
+    Args:
+        log_file: Archivo de log en texto (mismo formato de siempre + channel_id)
+        jsonl_file: Archivo opcional con logs estructurados JSONL
+        level: Nivel del logger raíz
+        console: Añadir salida a consola
+        rate_limit: Máximo de mensajes DEBUG/INFO por segundo y por línea de código (0 = sin límite)
+
+    Returns:
+        QueueListener ya iniciado (se detiene automáticamente al salir)
+    """
+    log_queue = queue.SimpleQueue()
+
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(ChannelContextFilter())
+    if rate_limit:
+        queue_handler.addFilter(RateLimitFilter(max_per_interval=rate_limit))
+
+    handlers = []
+    file_handler = logging.FileHandler(log_file)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT))
+    handlers.append(file_handler)
+
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        handlers.append(console_handler)
+
+    if jsonl_file:
+        jsonl_handler = logging.FileHandler(jsonl_file)
+        jsonl_handler.setFormatter(JsonlFormatter())
+        handlers.append(jsonl_handler)
+
+    root = logging.getLogger('')
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+    def flush_on_exit():
+        # stop() falla si ya se detuvo manualmente
+        if getattr(listener, '_thread', None) is not None:
+            listener.stop()
+
+    atexit.register(flush_on_exit)
+    return listener
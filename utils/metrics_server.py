@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Endpoint HTTP local de métricas en formato Prometheus
+
+Se levanta opcionalmente dentro del servicio de llamadas entrantes
+(METRICS_PORT) y expone el estado interno del proceso sin tener que
+revisar los logs: llamadas activas, sockets/threads, profundidad de colas,
+lag del event loop, paquetes RTP, latencias y errores de OpenAI.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from aiohttp import web
+
+# Cada muestra: (nombre_metrica, etiquetas, valor)
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    parts = []
+    for key, value in sorted(labels.items()):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{escaped}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def render_prometheus(metrics: Iterable[Tuple[str, str, str, List[Sample]]]) -> str:
+    """
+    Serializa métricas al formato de texto de Prometheus
+
+    Args:
+        metrics: Tuplas (nombre, tipo, ayuda, muestras)
+    """
+    lines = []
+    for name, metric_type, help_text, samples in metrics:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for sample_name, labels, value in samples:
+            lines.append(f"{sample_name}{_format_labels(labels)} {float(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+def latency_summary(name: str, help_text: str, snapshot: Dict[str, Dict[str, float]]):
+    """Convierte LATENCY.snapshot() en una métrica summary de Prometheus"""
+    samples = []
+    for key, data in sorted(snapshot.items()):
+        for quantile, field in (('0.5', 'p50'), ('0.95', 'p95'), ('0.99', 'p99')):
+            samples.append((name, {'name': key, 'quantile': quantile}, data[field]))
+        samples.append((f"{name}_sum", {'name': key}, data['sum']))
+        samples.append((f"{name}_count", {'name': key}, data['count']))
+    return (name, 'summary', help_text, samples)
+
+
+def open_file_descriptors() -> Tuple[int, int]:
+    """Retorna (descriptores abiertos, sockets abiertos) del proceso (solo Linux)"""
+    fd_dir = '/proc/self/fd'
+    if not os.path.isdir(fd_dir):
+        return 0, 0
+    total = 0
+    sockets = 0
+    for fd in os.listdir(fd_dir):
+        total += 1
+        try:
+            if os.readlink(os.path.join(fd_dir, fd)).startswith('socket:'):
+                sockets += 1
+        except OSError:
+            continue
+    return total, sockets
+
+
+class LoopLagMonitor:
+    """Mide cuánto se retrasa el event loop respecto a un sleep programado"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.task = None
+
+    def start(self):
+        if not self.task:
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        try:
+            while True:
+                expected = time.perf_counter() + self.interval
+                await asyncio.sleep(self.interval)
+                self.last_lag = max(0.0, time.perf_counter() - expected)
+                self.max_lag = max(self.max_lag, self.last_lag)
+        except asyncio.CancelledError:
+            pass
+
+
+class MetricsServer:
+    """Servidor aiohttp mínimo que sirve /metrics a partir de un colector"""
+
+    def __init__(self, collect: Callable[[], Iterable], host: str = '127.0.0.1', port: int = 9464):
+        """
+        Args:
+            collect: Función que retorna las métricas para render_prometheus
+            host: Dirección de escucha (por defecto solo local)
+            port: Puerto TCP
+        """
+        self.collect = collect
+        self.host = host
+        self.port = port
+        self.runner: Optional[web.AppRunner] = None
+
+    async def handle_metrics(self, request):
+        try:
+            body = render_prometheus(self.collect())
+            return web.Response(text=body, content_type='text/plain', charset='utf-8')
+        except Exception as e:
+            logging.error(f"Error generando métricas: {e}")
+            return web.Response(status=500, text=str(e))
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        logging.info(f"📈 Endpoint de métricas en http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
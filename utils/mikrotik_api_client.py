@@ -8,15 +8,24 @@ import requests
 import logging
 from typing import Dict, Any, Optional
 
+try:
+    from utils.mikrotik_cache import QueryCache
+except ImportError:  # Ejecutado desde utils/ (scripts de prueba)
+    from mikrotik_cache import QueryCache
+
 class MikroTikAPIClient:
     """Cliente para interactuar con la API REST de MikroTik"""
 
-    def __init__(self, api_url: str = "http://10.0.0.9:5050"):
+    def __init__(self, api_url: str = "http://10.0.0.9:5050", cache: Optional[QueryCache] = None,
+                 enable_cache: bool = False):
         """
         Inicializa el cliente de API MikroTik
 
         Args:
             api_url: URL base de la API (default: http://10.0.0.9:5050)
+            cache: Caché de respuestas a usar (por defecto se crea una propia)
+            enable_cache: True para cachear respuestas (apagado por defecto: los
+                          scripts de prueba miden la API, no la caché)
         """
         self.api_url = api_url
         self.query_endpoint = f"{api_url}/query"
@@ -26,6 +35,9 @@ class MikroTikAPIClient:
         self.default_timeout = 60
         self.request_timeout = 70  # timeout del request HTTP (debe ser mayor que default_timeout)
 
+        # Caché TTL/LRU por pregunta normalizada
+        self.cache = (cache or QueryCache()) if enable_cache else None
+
     def check_health(self) -> bool:
         """
         Verifica que la API esté funcionando
@@ -54,13 +66,14 @@ class MikroTikAPIClient:
             logging.error(f"Error en health check de API MikroTik: {e}")
             return False
 
-    def query(self, question: str, timeout: Optional[int] = None) -> Dict[str, Any]:
+    def query(self, question: str, timeout: Optional[int] = None, use_cache: bool = True) -> Dict[str, Any]:
         """
         Hace una consulta a la API de MikroTik
 
         Args:
             question: Pregunta en lenguaje natural
             timeout: Timeout en segundos (default: 60)
+            use_cache: False para forzar la consulta a la API ignorando la caché
 
         Returns:
             Dict con la respuesta:
@@ -70,23 +83,25 @@ class MikroTikAPIClient:
                 "metadata": dict  # Información adicional (opcional)
             }
         """
+        # Validar longitud de la pregunta
+        invalid = self.validate_question(question)
+        if invalid:
+            return invalid
+
+        cached = self.cache_lookup(question, use_cache)
+        if cached:
+            return cached
+
+        result = self.request_query(question, timeout)
+        self.cache_store(question, result)
+        return result
+
+    def request_query(self, question: str, timeout: Optional[int] = None) -> Dict[str, Any]:
+        """Hace la petición POST a /query (sin caché)"""
         if timeout is None:
             timeout = self.default_timeout
 
         try:
-            # Validar longitud de la pregunta
-            if len(question) > 500:
-                return {
-                    "success": False,
-                    "response": "La pregunta es demasiado larga. Por favor, hazla más corta."
-                }
-
-            if len(question) < 3:
-                return {
-                    "success": False,
-                    "response": "La pregunta es demasiado corta. Por favor, sé más específico."
-                }
-
             logging.info(f"Consultando API MikroTik: '{question}' (timeout: {timeout}s)")
 
             # Hacer la petición POST
@@ -101,41 +116,102 @@ class MikroTikAPIClient:
 
             # Procesar respuesta
             if response.status_code == 200:
-                data = response.json()
-
-                # La API siempre devuelve el campo "response" con el texto a reproducir
-                return {
-                    "success": data.get("success", False),
-                    "response": data.get("response", "No recibí respuesta del servidor."),
-                    "metadata": data.get("metadata", {})
-                }
+                return self.parse_query_response(response.json())
             else:
                 logging.error(f"API MikroTik error HTTP {response.status_code}")
-                return {
-                    "success": False,
-                    "response": "Hubo un error al consultar el servidor. Por favor, intenta nuevamente."
-                }
+                return self.http_error_response()
 
         except requests.Timeout:
             logging.error(f"Timeout al consultar API MikroTik después de {timeout}s: {question}")
-            return {
-                "success": False,
-                "response": "La consulta tardó demasiado tiempo en responder. Por favor, intenta con una pregunta más simple o inténtalo nuevamente."
-            }
+            return self.timeout_response()
 
         except requests.ConnectionError:
             logging.error("No se pudo conectar a la API MikroTik")
+            return self.connection_error_response()
+
+        except Exception as e:
+            logging.error(f"Error consultando API MikroTik: {e}")
+            return self.unexpected_error_response()
+
+    # Caché y respuestas compartidas con AsyncMikroTikAPIClient
+
+    def cache_lookup(self, question: str, use_cache: bool = True,
+                     count_miss: bool = True) -> Optional[Dict[str, Any]]:
+        """Retorna la respuesta cacheada si existe y la caché está permitida"""
+        if not self.cache:
+            return None
+        if not use_cache:
+            self.cache.record_bypass()
+            return None
+        cached = self.cache.get(question, count_miss=count_miss)
+        if cached:
+            logging.info(f"Respuesta MikroTik desde caché: '{question}'")
+        return cached
+
+    def cache_store(self, question: str, result: Dict[str, Any]):
+        if self.cache:
+            self.cache.set(question, result)
+
+    @staticmethod
+    def validate_question(question: str) -> Optional[Dict[str, Any]]:
+        """Retorna la respuesta de error si la pregunta no es válida, o None"""
+        if len(question) > 500:
             return {
                 "success": False,
-                "response": "No pude conectarme al servidor de información. Por favor, intenta más tarde."
+                "response": "La pregunta es demasiado larga. Por favor, hazla más corta."
             }
 
-        except Exception as e:
-            logging.error(f"Error consultando API MikroTik: {e}")
+        if len(question) < 3:
             return {
                 "success": False,
-                "response": "Ocurrió un error al procesar tu consulta. Por favor, intenta nuevamente."
+                "response": "La pregunta es demasiado corta. Por favor, sé más específico."
             }
+        return None
+
+    @staticmethod
+    def parse_query_response(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Normaliza la respuesta JSON de /query"""
+        # La API siempre devuelve el campo "response" con el texto a reproducir
+        return {
+            "success": data.get("success", False),
+            "response": data.get("response", "No recibí respuesta del servidor."),
+            "metadata": data.get("metadata", {})
+        }
+
+    # error_type marca fallos de transporte (no respuestas negativas de la API),
+    # usado por el circuit breaker del motor de herramientas
+
+    @staticmethod
+    def http_error_response() -> Dict[str, Any]:
+        return {
+            "success": False,
+            "response": "Hubo un error al consultar el servidor. Por favor, intenta nuevamente.",
+            "error_type": "http"
+        }
+
+    @staticmethod
+    def timeout_response() -> Dict[str, Any]:
+        return {
+            "success": False,
+            "response": "La consulta tardó demasiado tiempo en responder. Por favor, intenta con una pregunta más simple o inténtalo nuevamente.",
+            "error_type": "timeout"
+        }
+
+    @staticmethod
+    def connection_error_response() -> Dict[str, Any]:
+        return {
+            "success": False,
+            "response": "No pude conectarme al servidor de información. Por favor, intenta más tarde.",
+            "error_type": "connection"
+        }
+
+    @staticmethod
+    def unexpected_error_response() -> Dict[str, Any]:
+        return {
+            "success": False,
+            "response": "Ocurrió un error al procesar tu consulta. Por favor, intenta nuevamente.",
+            "error_type": "unexpected"
+        }
 
     def get_tool_definition(self) -> Dict[str, Any]:
         """
@@ -172,6 +248,14 @@ class MikroTikAPIClient:
                             "'¿Cuál es el tráfico de la interfaz WAN?'"
                         )
                     },
+                    "forzar_actualizacion": {
+                        "type": "boolean",
+                        "description": (
+                            "true para ignorar respuestas recientes guardadas y consultar de nuevo "
+                            "(por ejemplo si la persona dice que acaba de pagar o de reiniciar su equipo)"
+                        ),
+                        "default": False
+                    },
                     "timeout": {
                         "type": "integer",
                         "description": "Tiempo máximo de espera en segundos (default: 60, rango: 15-90)",
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Cliente asíncrono para la API de MikroTik
+
+Variante de MikroTikAPIClient sobre aiohttp para usarse desde el event loop
+principal: un único connector keep-alive compartido por todas las llamadas
+(sin handshake TCP por consulta), deadline por petición y cancelación real
+de la petición HTTP cuando se cancela la tarea.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from utils.mikrotik_api_client import MikroTikAPIClient
+from utils.mikrotik_cache import QueryCache, classify_question, normalize_question
+from utils.single_flight import SingleFlight
+
+
+class AsyncMikroTikAPIClient(MikroTikAPIClient):
+    """Cliente aiohttp con pool de conexiones para la API REST de MikroTik"""
+
+    def __init__(self, api_url: str = "http://10.0.0.9:5050", pool_size: int = 20,
+                 keepalive_timeout: float = 60, cache: Optional[QueryCache] = None,
+                 enable_cache: bool = True):
+        """
+        Args:
+            api_url: URL base de la API
+            pool_size: Conexiones simultáneas máximas hacia la API
+            keepalive_timeout: Segundos que una conexión ociosa se mantiene abierta
+            cache: Caché de respuestas a usar (por defecto se crea una propia)
+            enable_cache: False para no cachear ninguna respuesta
+        """
+        super().__init__(api_url=api_url, cache=cache, enable_cache=enable_cache)
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.session: Optional[aiohttp.ClientSession] = None
+
+        # Preguntas idénticas (normalizadas, mismo timeout y deadline) en vuelo comparten una sola petición
+        self.inflight = SingleFlight(name='mikrotik')
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """Crea la sesión compartida la primera vez (debe llamarse dentro del event loop)"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def check_health(self) -> bool:
+        """Verifica que la API esté funcionando"""
+        try:
+            async with self.get_session().get(
+                self.health_endpoint,
+                timeout=aiohttp.ClientTimeout(total=5)
+            ) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    logging.info(f"API MikroTik: {data.get('status', 'unknown')}")
+                    return True
+                logging.error(f"API MikroTik health check failed: {response.status}")
+                return False
+
+        except asyncio.TimeoutError:
+            logging.error("API MikroTik health check timeout")
+            return False
+        except Exception as e:
+            logging.error(f"Error en health check de API MikroTik: {e}")
+            return False
+
+    async def query(self, question: str, timeout: Optional[int] = None,
+                    deadline: Optional[float] = None, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Hace una consulta a la API de MikroTik sin bloquear el event loop
+
+        Args:
+            question: Pregunta en lenguaje natural
+            timeout: Timeout en segundos que se envía a la API (default: 60)
+            deadline: Tiempo máximo total de la petición HTTP en segundos
+                      (default: request_timeout). Cancelar la tarea aborta la petición.
+            use_cache: False para forzar la consulta a la API ignorando la caché
+
+        Returns:
+            Dict con el mismo formato que MikroTikAPIClient.query
+        """
+        invalid = self.validate_question(question)
+        if invalid:
+            return invalid
+
+        cached = self.cache_lookup(question, use_cache)
+        if cached:
+            return cached
+
+        async def fetch():
+            result = await self.request_query(question, timeout, deadline)
+            self.cache_store(question, result)
+            return result
+
+        key = normalize_question(question)
+        if not use_cache or classify_question(key) == 'live':
+            # Una actualización forzada no puede recibir el resultado que venía a
+            # reemplazar, y dos clientes que dan la misma orden no comparten una ejecución
+            return await fetch()
+
+        result, shared = await self.inflight.do((key, timeout, deadline), fetch)
+        result = dict(result)
+        if shared:
+            result['metadata'] = dict(result.get('metadata') or {}, coalesced=True)
+        return result
+
+    async def request_query(self, question: str, timeout: Optional[int] = None,
+                            deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Hace la petición POST a /query (sin caché)"""
+        if timeout is None:
+            timeout = self.default_timeout
+        if deadline is None:
+            deadline = self.request_timeout
+
+        try:
+            logging.info(f"Consultando API MikroTik (async): '{question}' (timeout: {timeout}s)")
+
+            async with self.get_session().post(
+                self.query_endpoint,
+                json={
+                    "question": question,
+                    "timeout": timeout
+                },
+                timeout=aiohttp.ClientTimeout(total=deadline)
+            ) as response:
+                if response.status == 200:
+                    return self.parse_query_response(await response.json())
+                logging.error(f"API MikroTik error HTTP {response.status}")
+                return self.http_error_response()
+
+        except asyncio.TimeoutError:
+            logging.error(f"Timeout al consultar API MikroTik después de {deadline}s: {question}")
+            return self.timeout_response()
+
+        except aiohttp.ClientConnectionError:
+            logging.error("No se pudo conectar a la API MikroTik")
+            return self.connection_error_response()
+
+        except asyncio.CancelledError:
+            logging.info(f"Consulta a API MikroTik cancelada: '{question}'")
+            raise
+
+        except Exception as e:
+            logging.error(f"Error consultando API MikroTik: {e}")
+            return self.unexpected_error_response()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Caché de respuestas de la API de MikroTik
+
+Los clientes repiten las mismas preguntas (routers configurados, clientes
+conectados, "¿hay una caída?"). Cada una cuesta 10-30 s contra la API, así
+que las respuestas exitosas se guardan con un TTL según la categoría de la
+pregunta: el estado técnico expira rápido y la información estática dura más.
+La clave es la pregunta normalizada (acentos, mayúsculas, espacios, números).
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Números escritos que el transcriptor suele dejar en palabras
+NUMBER_WORDS = {
+    'cero': '0', 'uno': '1', 'una': '1', 'dos': '2', 'tres': '3', 'cuatro': '4',
+    'cinco': '5', 'seis': '6', 'siete': '7', 'ocho': '8', 'nueve': '9', 'diez': '10',
+    'once': '11', 'doce': '12', 'trece': '13', 'catorce': '14', 'quince': '15',
+    'dieciseis': '16', 'diecisiete': '17', 'dieciocho': '18', 'diecinueve': '19', 'veinte': '20'
+}
+
+# Palabras sin valor para la clave ("por favor, dime ...")
+FILLER_WORDS = {'por', 'favor', 'dime', 'me', 'puedes', 'podrias', 'quiero', 'saber', 'el', 'la', 'los', 'las'}
+
+# Categorías en orden de prioridad: (categoría, términos). Cada término es una
+# palabra completa de la pregunta normalizada; "*" al final la vuelve raíz
+# ("reinici*" = reinicia, reiniciar...). Las categorías vivas y dinámicas van
+# antes que la estática: "lista de clientes morosos" es de cuentas, no estática.
+# Las órdenes que cambian estado ("cambia el plan", "bloquea al cliente") son
+# vivas: repetirlas desde la caché devolvería un "éxito" sin tocar el router
+CATEGORY_KEYWORDS = (
+    ('live', ('ping', 'reinici*', 'desbloque*', 'bloque*', 'activar', 'activa', 'activale', 'desactiv*',
+              'cortar', 'corta', 'cortale', 'suspend*', 'reconect*', 'cambi*', 'asign*', 'elimin*',
+              'borr*', 'agreg*', 'anad*', 'quit*', 'modific*', 'habilit*', 'deshabilit*', 'configura',
+              'configurar', 'configurale', 'restablec*')),
+    ('status', ('estado', 'caid*', 'falla*', 'problema*', 'conectad*', 'activos', 'online', 'trafico',
+                'consumo', 'senal', 'sfp', 'latencia', 'uptime', 'interfaz', 'interfaces', 'gateway')),
+    ('account', ('deuda*', 'debe*', 'factura*', 'pago*', 'pagar', 'saldo*', 'cortad*', 'corte*',
+                 'cuenta*', 'mora', 'moros*')),
+    ('static', ('configurados', 'configuradas', 'lista', 'listado', 'cuales son', 'cuantos routers',
+                'direccion', 'horario*')),
+)
+
+
+def keyword_pattern(terms) -> re.Pattern:
+    """Términos de una categoría -> regex que solo acepta palabras completas"""
+    parts = [re.escape(term[:-1]) + r'\w*' if term.endswith('*') else re.escape(term) for term in terms]
+    return re.compile(r'\b(?:' + '|'.join(parts) + r')\b')
+
+
+CATEGORY_PATTERNS = tuple((category, keyword_pattern(terms)) for category, terms in CATEGORY_KEYWORDS)
+
+# TTL por categoría en segundos (0 = nunca cachear). Solo se cachean las
+# categorías de consulta reconocidas; lo que no se reconoce puede ser una orden
+DEFAULT_TTLS = {
+    'live': 0,
+    'status': 30,
+    'account': 120,
+    'static': 900,
+    'default': 0
+}
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normaliza una pregunta para usarla como clave de caché
+
+    Quita acentos y signos, pasa a minúsculas, colapsa espacios, convierte
+    números escritos en dígitos, separa letras de números ("router-146" ->
+    "router 146") y elimina ceros a la izquierda.
+    """
+    text = unicodedata.normalize('NFKD', question.lower())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    # Conservar los puntos de las IPs, quitar el resto de la puntuación
+    text = re.sub(r'(?<!\d)\.|\.(?!\d)', ' ', text)
+    text = re.sub(r'[^\w\s.]', ' ', text)
+    text = re.sub(r'(?<=[a-z])(?=\d)|(?<=\d)(?=[a-z])', ' ', text)
+    text = re.sub(r'(?<!\d)0+(?=\d)', '', text)
+
+    words = []
+    for word in text.split():
+        word = NUMBER_WORDS.get(word, word)
+        if word in FILLER_WORDS:
+            continue
+        words.append(word)
+    return ' '.join(words)
+
+
+def classify_question(normalized: str) -> str:
+    """Asigna una categoría de TTL a una pregunta ya normalizada"""
+    for category, pattern in CATEGORY_PATTERNS:
+        if pattern.search(normalized):
+            return category
+    return 'default'
+
+
+class QueryCache:
+    """Caché LRU con TTL por categoría para respuestas de la API de MikroTik"""
+
+    def __init__(self, max_entries: int = 256, ttls: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            max_entries: Máximo de respuestas guardadas (se expulsa la menos usada)
+            ttls: TTL por categoría, sobrescribe DEFAULT_TTLS
+        """
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.entries = OrderedDict()  # clave -> (expira_en, categoría, resultado)
+        self.lock = threading.Lock()
+        self.metrics = {
+            'hits': 0,
+            'misses': 0,
+            'bypassed': 0,
+            'stores': 0,
+            'expired': 0,
+            'evictions': 0
+        }
+
+    def key_for(self, question: str) -> str:
+        return normalize_question(question)
+
+    def get(self, question: str, count_miss: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Retorna una copia de la respuesta cacheada, o None
+
+        count_miss=False para una consulta previa cuyo fallo contará la búsqueda que sigue
+        """
+        key = self.key_for(question)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.metrics['misses'] += count_miss
+                return None
+            expires_at, category, result = entry
+            if time.monotonic() >= expires_at:
+                del self.entries[key]
+                self.metrics['expired'] += 1
+                self.metrics['misses'] += count_miss
+                return None
+            self.entries.move_to_end(key)
+            self.metrics['hits'] += 1
+
+        cached = dict(result)
+        cached['metadata'] = dict(cached.get('metadata') or {}, cached=True, cache_category=category)
+        return cached
+
+    def set(self, question: str, result: Dict[str, Any]):
+        """Guarda una respuesta exitosa según el TTL de su categoría"""
+        if not result or not result.get('success'):
+            return
+        key = self.key_for(question)
+        category = classify_question(key)
+        ttl = self.ttls.get(category, self.ttls['default'])
+        if ttl <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, category, dict(result))
+            self.entries.move_to_end(key)
+            self.metrics['stores'] += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.metrics['evictions'] += 1
+
+    def record_bypass(self):
+        with self.lock:
+            self.metrics['bypassed'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            data = dict(self.metrics)
+            data['entries'] = len(self.entries)
+        lookups = data['hits'] + data['misses']
+        data['hit_rate'] = round(data['hits'] / lookups, 3) if lookups else 0.0
+        return data
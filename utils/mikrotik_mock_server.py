@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita la API de MikroTik (/query y /health)
+
+Permite probar y medir el camino de herramientas (caché, coalescencia,
+motor con circuit breaker, relleno de audio) sin la red de producción.
+Simula latencias con distribución log-normal, cuelgues (sin respuesta),
+errores HTTP y respuestas predefinidas por palabra clave.
+
+Uso:
+    python3 utils/mikrotik_mock_server.py [--profile realista] [--port 5050]
+
+    MIKROTIK_API_URL=http://127.0.0.1:5050 python3 utils/test_mikrotik_integration.py
+    MIKROTIK_API_URL=http://127.0.0.1:5050 python3 utils/bench_mikrotik_concurrency.py 50
+
+Perfiles: rapido, realista, lento, inestable, caida. Se puede cambiar en
+caliente (p. ej. para abrir el circuit breaker a mitad de una prueba):
+
+    curl -X POST http://127.0.0.1:5050/admin/profile -d '{"profile": "caida"}'
+
+Estadísticas de lo recibido (útil para verificar coalescencia y caché):
+
+    curl http://127.0.0.1:5050/stats
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+
+from aiohttp import web
+
+# median: latencia mediana en segundos; sigma: dispersión log-normal;
+# hang_rate: fracción de consultas que nunca responden (cuelgue hasta hang_seconds);
+# error_rate: fracción que responde HTTP 500; health_ok: estado de /health
+PROFILES = {
+    'rapido': {'median': 0.15, 'sigma': 0.3, 'hang_rate': 0.0, 'error_rate': 0.0, 'health_ok': True},
+    'realista': {'median': 3.0, 'sigma': 0.6, 'hang_rate': 0.01, 'error_rate': 0.01, 'health_ok': True},
+    'lento': {'median': 15.0, 'sigma': 0.5, 'hang_rate': 0.05, 'error_rate': 0.02, 'health_ok': True},
+    'inestable': {'median': 3.0, 'sigma': 0.8, 'hang_rate': 0.15, 'error_rate': 0.2, 'health_ok': True},
+    'caida': {'median': 0.05, 'sigma': 0.1, 'hang_rate': 0.0, 'error_rate': 1.0, 'health_ok': False},
+}
+
+# Preguntas que en producción recorren todos los routers
+SLOW_KEYWORDS = ('todos', 'resumen', 'completo')
+SLOW_FACTOR = 3.0
+
+# Respuestas predefinidas: (palabras clave, respuesta)
+DEFAULT_ANSWERS = [
+    (('ping',), "El ping a la IP respondió correctamente: 4 paquetes enviados, 4 recibidos, latencia promedio de 12 milisegundos."),
+    (('sfp',), "Las interfaces SFP del router 152.1 están activas: sfp1 con 245 megabits de bajada y sfp2 con 37 megabits."),
+    (('trafico', 'tráfico'), "La interfaz WAN tiene 312 megabits de bajada y 58 megabits de subida en este momento."),
+    (('conectad', 'activos', 'dispositivos'), "El router 146 tiene 87 clientes conectados en este momento."),
+    (('routers', 'router'), "Hay 6 routers configurados: 146, 147, 150, 152.1, 152.2 y 160."),
+    (('caida', 'caída', 'falla', 'problema'), "No se detectan caídas en la red. Todos los routers responden con normalidad."),
+    (('factura', 'deuda', 'debe', 'saldo', 'pago'), "El cliente tiene una factura pendiente de 65.000 pesos con vencimiento el día 5."),
+    (('cortad', 'corte'), "El servicio del cliente está activo y no tiene cortes programados."),
+    (('plan',), "El cliente tiene contratado el plan de 30 megas."),
+]
+FALLBACK_ANSWER = "No encontré información específica para esa consulta en los routers configurados."
+
+
+class MockMikroTikAPI:
+    """Estado y handlers del servidor simulado"""
+
+    def __init__(self, profile: str = 'realista', answers=None, hang_seconds: float = 120, seed=None):
+        self.random = random.Random(seed)
+        self.answers = answers or DEFAULT_ANSWERS
+        self.hang_seconds = hang_seconds
+        self.set_profile(profile)
+        self.in_flight = 0
+        self.stats = {
+            'queries': 0,
+            'health_checks': 0,
+            'ok': 0,
+            'api_timeouts': 0,
+            'hangs': 0,
+            'errors': 0,
+            'max_in_flight': 0,
+            'by_question': {}
+        }
+
+    def set_profile(self, name: str, **overrides):
+        if name not in PROFILES:
+            raise ValueError(f"Perfil desconocido: {name} (disponibles: {', '.join(PROFILES)})")
+        self.profile_name = name
+        self.profile = dict(PROFILES[name])
+        self.profile.update({key: value for key, value in overrides.items() if value is not None})
+        logging.info(f"Perfil activo: {name} {self.profile}")
+
+    def sample_latency(self, question: str) -> float:
+        latency = self.random.lognormvariate(0, self.profile['sigma']) * self.profile['median']
+        if any(keyword in question.lower() for keyword in SLOW_KEYWORDS):
+            latency *= SLOW_FACTOR
+        return latency
+
+    def answer_for(self, question: str) -> str:
+        lowered = question.lower()
+        for keywords, answer in self.answers:
+            if any(keyword in lowered for keyword in keywords):
+                return answer
+        return FALLBACK_ANSWER
+
+    async def handle_health(self, request):
+        self.stats['health_checks'] += 1
+        if not self.profile['health_ok']:
+            return web.json_response({'status': 'unavailable'}, status=503)
+        return web.json_response({'status': 'ok', 'profile': self.profile_name})
+
+    async def handle_query(self, request):
+        try:
+            payload = await request.json()
+        except json.JSONDecodeError:
+            return web.json_response({'success': False, 'response': 'JSON inválido'}, status=400)
+
+        question = payload.get('question', '')
+        timeout = float(payload.get('timeout', 60))
+        self.stats['queries'] += 1
+        by_question = self.stats['by_question']
+        by_question[question] = by_question.get(question, 0) + 1
+
+        self.in_flight += 1
+        self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.in_flight)
+        started = time.monotonic()
+        try:
+            roll = self.random.random()
+            if roll < self.profile['hang_rate']:
+                # Sin respuesta: obliga al cliente a cortar por su propio deadline
+                self.stats['hangs'] += 1
+                await asyncio.sleep(self.hang_seconds)
+                return web.json_response({'success': False, 'response': 'Sin respuesta'}, status=504)
+
+            if roll < self.profile['hang_rate'] + self.profile['error_rate']:
+                self.stats['errors'] += 1
+                await asyncio.sleep(min(0.5, self.sample_latency(question)))
+                return web.json_response({'success': False, 'response': 'Error interno'}, status=500)
+
+            latency = self.sample_latency(question)
+            if latency > timeout:
+                # La API real corta en el timeout pedido y responde con success false
+                self.stats['api_timeouts'] += 1
+                await asyncio.sleep(timeout)
+                return web.json_response({
+                    'success': False,
+                    'response': "La consulta tardó demasiado tiempo. Intenta con una pregunta más específica.",
+                    'metadata': {'timeout': timeout}
+                })
+
+            await asyncio.sleep(latency)
+            self.stats['ok'] += 1
+            return web.json_response({
+                'success': True,
+                'response': self.answer_for(question),
+                'metadata': {
+                    'mock': True,
+                    'profile': self.profile_name,
+                    'total_time': round(time.monotonic() - started, 3)
+                }
+            })
+        finally:
+            self.in_flight -= 1
+
+    async def handle_stats(self, request):
+        data = dict(self.stats)
+        data['in_flight'] = self.in_flight
+        data['profile'] = self.profile_name
+        return web.json_response(data)
+
+    async def handle_set_profile(self, request):
+        payload = await request.json()
+        try:
+            self.set_profile(payload.get('profile', self.profile_name), **{
+                key: payload.get(key) for key in ('median', 'sigma', 'hang_rate', 'error_rate', 'health_ok')
+            })
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
+        return web.json_response({'profile': self.profile_name, 'settings': self.profile})
+
+    async def handle_reset_stats(self, request):
+        for key in self.stats:
+            self.stats[key] = {} if key == 'by_question' else 0
+        return web.json_response({'reset': True})
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/health', self.handle_health)
+        app.router.add_post('/query', self.handle_query)
+        app.router.add_get('/stats', self.handle_stats)
+        app.router.add_post('/admin/profile', self.handle_set_profile)
+        app.router.add_post('/admin/reset', self.handle_reset_stats)
+        return app
+
+
+def load_answers(path):
+    """Archivo JSON: lista de {"keywords": [...], "response": "..."}"""
+    with open(path, encoding='utf-8') as answers_file:
+        entries = json.load(answers_file)
+    return [(tuple(entry['keywords']), entry['response']) for entry in entries]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor simulado de la API de MikroTik")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5050)
+    parser.add_argument('--profile', default='realista', choices=sorted(PROFILES))
+    parser.add_argument('--median', type=float, help="Latencia mediana en segundos")
+    parser.add_argument('--sigma', type=float, help="Dispersión log-normal de la latencia")
+    parser.add_argument('--hang-rate', type=float, help="Fracción de consultas que no responden")
+    parser.add_argument('--error-rate', type=float, help="Fracción de consultas con HTTP 500")
+    parser.add_argument('--hang-seconds', type=float, default=120)
+    parser.add_argument('--answers', help="JSON con respuestas predefinidas")
+    parser.add_argument('--seed', type=int, help="Semilla para resultados reproducibles")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    api = MockMikroTikAPI(
+        profile=args.profile,
+        answers=load_answers(args.answers) if args.answers else None,
+        hang_seconds=args.hang_seconds,
+        seed=args.seed
+    )
+    api.set_profile(args.profile, median=args.median, sigma=args.sigma,
+                    hang_rate=args.hang_rate, error_rate=args.error_rate)
+    print(f"API MikroTik simulada en http://{args.host}:{args.port} (perfil: {api.profile_name})")
+    web.run_app(api.make_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Compactación de resultados de herramientas antes de enviarlos al modelo
+
+Todo lo que va en function_call_output son tokens de entrada que el modelo
+procesa antes de empezar a hablar. Cada herramienta declara una forma de
+resultado: campos permitidos, listas truncadas con conteo, números ya
+formateados para voz y un presupuesto de tamaño.
+"""
+
+import json
+import re
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Corte de texto preferido: fin de oración dentro del presupuesto
+SENTENCE_END_RE = re.compile(r'[.!?;]\s')
+
+
+def format_number_for_speech(value):
+    """1234567 -> '1.234.567', 3.14159 -> '3,14' (convención de lectura en español)"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value
+    if isinstance(value, int) or float(value).is_integer():
+        return f"{int(value):,}".replace(',', '.')
+    text = f"{value:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
+    return text.rstrip('0').rstrip(',')
+
+
+def truncate_text(text: str, max_chars: int) -> str:
+    """Recorta en el último fin de oración que quepa; si no hay, en el último espacio"""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    ends = [match.end() for match in SENTENCE_END_RE.finditer(cut + ' ')]
+    if ends and ends[-1] > max_chars // 2:
+        return cut[:ends[-1]].rstrip()
+    space = cut.rfind(' ')
+    return (cut[:space] if space > max_chars // 2 else cut).rstrip() + '…'
+
+
+def json_size(value: Any) -> int:
+    return len(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+
+
+class ResultShape:
+    """Forma del resultado de una herramienta tal como lo verá el modelo"""
+
+    def __init__(self, fields: Iterable[str] = ('success', 'response'),
+                 metadata_fields: Iterable[str] = (), max_list_items: int = 5,
+                 max_string_chars: int = 800, max_bytes: int = 1500,
+                 speech_numbers: bool = True):
+        """
+        Args:
+            fields: Campos de primer nivel que se conservan
+            metadata_fields: Claves de "metadata" que se conservan (vacío = se descarta)
+            max_list_items: Elementos por lista; el resto se resume con un conteo
+            max_string_chars: Largo máximo de cada texto
+            max_bytes: Presupuesto total del JSON; se recorta "response" para cumplirlo
+            speech_numbers: Formatear números para que el modelo los lea bien
+        """
+        self.fields = tuple(fields)
+        self.metadata_fields = tuple(metadata_fields)
+        self.max_list_items = max_list_items
+        self.max_string_chars = max_string_chars
+        self.max_bytes = max_bytes
+        self.speech_numbers = speech_numbers
+
+    def compact(self, value: Any) -> Any:
+        if isinstance(value, dict):
+            return {key: self.compact(item) for key, item in value.items()}
+        if isinstance(value, list):
+            items = [self.compact(item) for item in value[:self.max_list_items]]
+            if len(value) > self.max_list_items:
+                items.append(f"... y {len(value) - self.max_list_items} más (total {len(value)})")
+            return items
+        if isinstance(value, str):
+            return truncate_text(value, self.max_string_chars)
+        if self.speech_numbers:
+            return format_number_for_speech(value)
+        return value
+
+    def apply(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        shaped = {key: self.compact(result[key]) for key in self.fields if key in result}
+        metadata = result.get('metadata') or {}
+        kept = {key: self.compact(metadata[key]) for key in self.metadata_fields if key in metadata}
+        if kept:
+            shaped['metadata'] = kept
+
+        # Presupuesto total: recortar el texto principal hasta que quepa
+        overflow = json_size(shaped) - self.max_bytes
+        response = shaped.get('response')
+        if overflow > 0 and isinstance(response, str):
+            # Aproximación por caracteres (los acentos ocupan 2 bytes)
+            target = max(80, len(response) - overflow - 8)
+            shaped['response'] = truncate_text(response, target)
+        return shaped
+
+
+def shape_result(result: Dict[str, Any], shape: Optional[ResultShape]) -> Tuple[Dict[str, Any], int, int]:
+    """
+    Aplica la forma al resultado
+
+    Returns:
+        (resultado compactado, bytes originales, bytes compactados)
+    """
+    raw_bytes = json_size(result)
+    if shape is None or not isinstance(result, dict):
+        return result, raw_bytes, raw_bytes
+    shaped = shape.apply(result)
+    return shaped, raw_bytes, json_size(shaped)
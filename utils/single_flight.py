@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Coalescencia de peticiones idénticas en vuelo (single-flight)
+
+Durante una caída muchos clientes preguntan lo mismo en pocos segundos.
+En vez de lanzar una consulta a la API por cada llamada, las peticiones
+concurrentes con la misma clave comparten una única petición upstream y
+todas reciben su resultado.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Agrupa corrutinas concurrentes con la misma clave en una sola ejecución"""
+
+    def __init__(self, name: str = 'single_flight'):
+        self.name = name
+        self.calls: Dict[Hashable, Dict[str, Any]] = {}  # clave -> {'task', 'waiters'}
+        self.metrics = {
+            'upstream_calls': 0,
+            'upstream_avoided': 0,
+            'abandoned': 0
+        }
+
+    def in_flight(self) -> int:
+        return len(self.calls)
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]):
+        """
+        Ejecuta factory() una sola vez por clave mientras haya una en vuelo
+
+        La petición upstream corre en su propia tarea: si uno de los
+        solicitantes se cancela (p. ej. cuelga), los demás siguen esperando.
+        Solo cuando se van todos se cancela la petición compartida.
+
+        Returns:
+            (resultado, compartido) donde compartido indica si se reutilizó
+            una petición ya en vuelo
+        """
+        entry = self.calls.get(key)
+        shared = entry is not None
+        if entry is None:
+            task = asyncio.ensure_future(factory())
+            entry = {'task': task, 'waiters': 0}
+            self.calls[key] = entry
+            task.add_done_callback(lambda _: self._forget(key, entry))
+            self.metrics['upstream_calls'] += 1
+        else:
+            self.metrics['upstream_avoided'] += 1
+            logging.info(f"[{self.name}] Reutilizando petición en vuelo ({entry['waiters']} esperando)")
+
+        entry['waiters'] += 1
+        cancelled = False
+        try:
+            return await asyncio.shield(entry['task']), shared
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            entry['waiters'] -= 1
+            if cancelled and entry['waiters'] == 0 and not entry['task'].done():
+                # Nadie espera ya este resultado. Se olvida en el acto: la tarea
+                # termina de cancelarse más tarde y un solicitante nuevo con la
+                # misma clave no debe unirse a ella (recibiría CancelledError)
+                self._forget(key, entry)
+                entry['task'].cancel()
+                self.metrics['abandoned'] += 1
+
+    def _forget(self, key: Hashable, entry: Dict[str, Any]):
+        if self.calls.get(key) is entry:
+            del self.calls[key]
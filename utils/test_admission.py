@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Pruebas del control de admisión de llamadas
+
+Las señales (llamadas activas, lag del loop, errores de OpenAI) son valores
+que cada prueba ajusta a mano.
+
+Uso:
+    python3 utils/test_admission.py
+    python3 -m pytest utils/test_admission.py
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.admission import AdmissionController, ADMIT, QUEUE, REJECT
+
+
+class Signals:
+    def __init__(self):
+        self.calls = 0
+        self.lag = 0.0
+        self.errors = 0
+
+
+def controller(signals, **options):
+    limits = dict(soft_limit=2, hard_limit=4, max_queue=2, queue_timeout=5)
+    limits.update(options)
+    return AdmissionController(
+        active_calls=lambda: signals.calls,
+        loop_lag=lambda: signals.lag,
+        error_count=lambda: signals.errors,
+        **limits
+    )
+
+
+def test_admit_below_soft_limit():
+    signals = Signals()
+    assert controller(signals).decide() == (ADMIT, [])
+
+
+def test_queue_between_limits_and_reject_at_hard_limit():
+    signals = Signals()
+    admission = controller(signals)
+    signals.calls = 2
+    assert admission.decide() == (QUEUE, ['calls'])
+    signals.calls = 4
+    assert admission.decide() == (REJECT, ['hard_limit'])
+    assert admission.metrics['rejected'] == 1
+
+
+def test_loop_lag_and_error_rate_are_pressure():
+    signals = Signals()
+    admission = controller(signals, max_loop_lag=0.2, max_error_rate=10)
+    signals.lag = 0.5
+    assert admission.decide() == (QUEUE, ['loop_lag'])
+    signals.lag = 0.0
+    admission.error_rate()  # Primera muestra de la ventana
+    signals.errors = 20
+    assert admission.decide()[1] == ['openai_errors']
+
+
+def test_reject_when_queue_full():
+    async def scenario():
+        signals = Signals()
+        signals.calls = 2
+        admission = controller(signals, max_queue=1)
+        waiting = asyncio.create_task(admission.wait_turn('c1'))
+        await asyncio.sleep(0)
+        assert admission.decide() == (REJECT, ['queue_full'])
+        await admission.abandon('c1')
+        assert await waiting is False
+
+    asyncio.run(scenario())
+
+
+def test_queue_is_fifo_and_admits_on_release():
+    async def scenario():
+        signals = Signals()
+        signals.calls = 2
+        admission = controller(signals, max_queue=3)
+        admitted = []
+
+        async def caller(channel_id):
+            if await admission.wait_turn(channel_id):
+                admitted.append(channel_id)
+                signals.calls += 1
+
+        first = asyncio.create_task(caller('c1'))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(caller('c2'))
+        await asyncio.sleep(0)
+        # Con gente esperando, una llamada nueva no se salta la cola
+        signals.calls = 0
+        assert admission.decide() == (QUEUE, ['fifo'])
+
+        signals.calls = 1  # Terminó una llamada: hay lugar para uno
+        await admission.release()
+        await asyncio.sleep(0.01)
+        assert admitted == ['c1']
+        signals.calls = 0
+        await admission.release()
+        await asyncio.gather(first, second)
+        assert admitted == ['c1', 'c2']
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout():
+    async def scenario():
+        signals = Signals()
+        signals.calls = 2
+        admission = controller(signals, queue_timeout=0.05)
+        assert await admission.wait_turn('c1') is False
+        assert admission.metrics['queue_timeout'] == 1
+        assert not admission.queue
+
+    asyncio.run(scenario())
+
+
+def test_abandon_removes_caller():
+    async def scenario():
+        signals = Signals()
+        signals.calls = 2
+        admission = controller(signals)
+        waiting = asyncio.create_task(admission.wait_turn('c1'))
+        await asyncio.sleep(0)
+        await admission.abandon('c1')
+        assert await waiting is False
+        assert admission.metrics['abandoned'] == 1
+
+    asyncio.run(scenario())
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} pruebas correctas")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
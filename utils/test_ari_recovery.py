@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la reconciliación con Asterisk tras reconectar ARI
+
+No necesitan red ni Asterisk: los listados de /channels y /bridges se
+escriben a mano y las sesiones son CallSession sin cliente ARI.
+
+Uso:
+    python3 utils/test_ari_recovery.py
+    python3 -m pytest utils/test_ari_recovery.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ari_recovery import is_stasis_call, plan_reconcile, reconnect_delay
+from utils.call_session import CallSession
+
+
+def caller(channel_id, app_data='openai-app'):
+    return {'id': channel_id, 'dialplan': {'app_name': 'Stasis', 'app_data': app_data}}
+
+
+def media(channel_id):
+    return {'id': channel_id, 'name': f'UnicastRTP/{channel_id}'}
+
+
+def live_session(channel_id):
+    """Sesión con el setup completo: External Media y bridge creados, audio corriendo"""
+    session = CallSession(channel_id, ari=None)
+    session.external_channel = f'external_{channel_id}'
+    session.bridge = f'openai_app_bridge_{channel_id}'
+    session.rtp_task = object()
+    return session
+
+
+def bridge(session, *members):
+    return {'id': session.bridge, 'channels': list(members)}
+
+
+def test_healthy_call_needs_nothing():
+    session = live_session('c1')
+    plan = plan_reconcile(
+        {'c1': session},
+        [caller('c1'), media('external_c1')],
+        [bridge(session, 'c1', 'external_c1')]
+    )
+    assert (plan.ended, plan.media_lost, plan.reattach, plan.adopt) == ([], [], [], [])
+
+
+def test_missed_stasis_end_ends_call_and_queued_caller():
+    plan = plan_reconcile({'c1': live_session('c1')}, [], [], queued=['c2'])
+    assert sorted(plan.ended) == ['c1', 'c2']
+
+
+def test_lost_external_media_ends_its_channel():
+    session = live_session('c1')
+    plan = plan_reconcile({'c1': session}, [caller('c1')], [bridge(session, 'c1')])
+    assert plan.media_lost == ['external_c1']
+    assert plan.reattach == [], "sin External Media no hay nada que re-enganchar"
+
+
+def test_missing_bridge_is_recreated_with_both_channels():
+    session = live_session('c1')
+    plan = plan_reconcile({'c1': session}, [caller('c1'), media('external_c1')], [])
+    [item] = plan.reattach
+    assert item.session is session
+    assert not item.exists
+    assert item.missing == ['c1', 'external_c1']
+
+
+def test_incomplete_bridge_only_adds_missing_channel():
+    session = live_session('c1')
+    plan = plan_reconcile(
+        {'c1': session}, [caller('c1'), media('external_c1')], [bridge(session, 'external_c1')]
+    )
+    [item] = plan.reattach
+    assert item.exists
+    assert item.missing == ['c1']
+
+
+def test_call_still_in_setup_is_left_alone():
+    session = live_session('c1')
+    session.rtp_task = None
+    plan = plan_reconcile({'c1': session}, [caller('c1')], [])
+    assert (plan.media_lost, plan.reattach) == ([], [])
+
+
+def test_missed_stasis_start_is_adopted():
+    channels = [caller('c1'), caller('c2'), caller('c3'), caller('otra', app_data='otra-app'),
+                media('external_c1'), {'id': 'UnicastRTP/1', 'dialplan': {}}]
+    plan = plan_reconcile({'c1': None}, channels, [], queued=['c3'])
+    assert [channel['id'] for channel in plan.adopt] == ['c2']
+
+
+def test_worker_does_not_adopt_other_calls():
+    plan = plan_reconcile({}, [caller('c2')], [], adopt=False)
+    assert plan.adopt == []
+
+
+def test_stasis_call_detection():
+    assert is_stasis_call(caller('c1', app_data='openai-app,entrante'))
+    assert not is_stasis_call(caller('external_c1'))
+    assert not is_stasis_call({'id': 'c1', 'dialplan': {'app_name': 'Dial', 'app_data': 'openai-app'}})
+
+
+def test_reconnect_delay_grows_caps_and_jitters():
+    for attempt, ceiling in ((1, 0.5), (2, 1.0), (4, 4.0), (10, 30.0)):
+        delays = [reconnect_delay(attempt, 0.5, 30) for _ in range(50)]
+        assert all(ceiling / 2 <= delay <= ceiling for delay in delays)
+        assert len(set(delays)) > 1
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} pruebas correctas")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
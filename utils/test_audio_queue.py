@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Pruebas de BoundedAudioQueue (cola acotada del audio de subida)
+
+No necesitan red: los chunks son bytes fijos y el reloj se adelanta
+reescribiendo las marcas de tiempo de la cola.
+
+Uso:
+    python3 utils/test_audio_queue.py
+    python3 -m pytest utils/test_audio_queue.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.audio_queue import BoundedAudioQueue
+
+
+def chunks(queue):
+    """Vacía la cola y retorna los chunks en orden"""
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+
+def test_drop_oldest_keeps_newest_audio():
+    queue = BoundedAudioQueue(maxsize=3, policy='drop_oldest')
+    for value in b'abcde':
+        assert queue.put_nowait(bytes([value]) * 10)
+    assert chunks(queue) == [b'c' * 10, b'd' * 10, b'e' * 10]
+    assert queue.metrics['dropped_chunks'] == 2
+    assert queue.metrics['dropped_bytes'] == 20
+    assert queue.metrics['max_depth'] == 3
+
+
+def test_coalesce_merges_oldest_pair_without_losing_audio():
+    queue = BoundedAudioQueue(maxsize=3, policy='coalesce', max_coalesced_bytes=20)
+    for value in b'abcd':
+        assert queue.put_nowait(bytes([value]) * 10)
+    assert chunks(queue) == [b'a' * 10 + b'b' * 10, b'c' * 10, b'd' * 10]
+    assert queue.metrics['coalesced_chunks'] == 1
+    assert queue.metrics['dropped_chunks'] == 0
+
+
+def test_coalesce_falls_back_to_drop_when_nothing_fits():
+    queue = BoundedAudioQueue(maxsize=2, policy='coalesce', max_coalesced_bytes=15)
+    for value in b'abc':
+        queue.put_nowait(bytes([value]) * 10)
+    assert chunks(queue) == [b'b' * 10, b'c' * 10]
+    assert queue.metrics['coalesced_chunks'] == 0
+    assert queue.metrics['dropped_chunks'] == 1
+
+
+def test_pause_drops_until_queue_drains_below_resume_level():
+    queue = BoundedAudioQueue(maxsize=4, policy='pause', resume_ratio=0.5)
+    for _ in range(4):
+        assert queue.put_nowait(b'x')
+    assert not queue.put_nowait(b'y')
+    assert queue.paused
+    assert queue.metrics['pauses'] == 1
+
+    queue.get_nowait()
+    assert not queue.put_nowait(b'y'), "con 3 chunks sigue por encima del umbral (2)"
+    queue.get_nowait()
+    assert queue.put_nowait(b'z')
+    assert not queue.paused
+    assert queue.qsize() == 3
+    assert queue.metrics['dropped_chunks'] == 2
+
+
+def test_unknown_policy_falls_back_to_drop_oldest():
+    queue = BoundedAudioQueue(maxsize=2, policy='descartar_todo')
+    assert queue.policy == 'drop_oldest'
+
+
+def test_stall_needs_pending_audio_and_no_consumer():
+    queue = BoundedAudioQueue(maxsize=4)
+    queue.last_get_time -= 10
+    assert not queue.is_stalled(2.0), "una cola vacía no está atascada"
+
+    queue.put_nowait(b'x')
+    assert not queue.is_stalled(2.0), "el chunk acaba de llegar"
+
+    queue._items[0] = (time.time() - 5, b'x')
+    assert queue.is_stalled(2.0)
+
+    queue.get_nowait()
+    queue.put_nowait(b'y')
+    queue._items[0] = (time.time() - 5, b'y')
+    assert not queue.is_stalled(2.0), "alguien consumió la cola hace menos de 2 s"
+
+
+def test_clear_counts_discarded_audio():
+    queue = BoundedAudioQueue(maxsize=4)
+    queue.put_nowait(b'abc')
+    queue.put_nowait(b'de')
+    queue.clear()
+    assert queue.empty()
+    assert queue.snapshot()['depth'] == 0
+    assert queue.metrics['dropped_bytes'] == 5
+
+
+def test_get_waits_for_next_chunk():
+    async def scenario():
+        queue = BoundedAudioQueue(maxsize=4)
+        waiter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        queue.put_nowait(b'audio')
+        assert await asyncio.wait_for(waiter, timeout=1) == b'audio'
+        assert queue.metrics['dequeued'] == 1
+
+    asyncio.run(scenario())
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} pruebas correctas")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Pruebas de CallSession (liberación ordenada de los recursos de una llamada)
+
+No necesitan red ni Asterisk: ARI, el manejador RTP y el cliente de OpenAI
+son objetos simulados que anotan en una lista común cuándo se liberan.
+
+Uso:
+    python3 utils/test_call_session.py
+    python3 -m pytest utils/test_call_session.py
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.call_metrics import COUNTERS
+from utils.call_session import CallSession
+
+
+class Response:
+    def __init__(self, status):
+        self.status = status
+        self.text = ''
+
+
+class FakeARI:
+    """Responde a los DELETE con el estado indicado por ruta (204 por defecto)"""
+
+    def __init__(self, events, statuses=None):
+        self.events = events
+        self.statuses = statuses or {}
+
+    async def delete(self, path, **params):
+        await asyncio.sleep(0.01)
+        self.events.append(f'DELETE {path}')
+        return Response(self.statuses.get(path, 204))
+
+
+class FakeOpenAI:
+    def __init__(self, events):
+        self.events = events
+        self.thread = None
+
+    def close(self):
+        self.events.append('openai')
+
+
+class FakeRTPHandler:
+    def __init__(self, events, cleanup_delay=0.0):
+        self.events = events
+        self.cleanup_delay = cleanup_delay
+        self.openai_client = FakeOpenAI(events)
+
+    async def cleanup(self):
+        await asyncio.sleep(self.cleanup_delay)
+        self.events.append('rtp')
+
+
+def make_session(events, step_timeout=1.0, cleanup_delay=0.0, statuses=None):
+    session = CallSession('canal-1', FakeARI(events, statuses), step_timeout=step_timeout)
+    session.rtp_handler = FakeRTPHandler(events, cleanup_delay)
+    session.external_channel = 'external_canal-1'
+    session.bridge = 'bridge-1'
+
+    async def rtp_loop():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            events.append('rtp_task')
+            raise
+
+    session.rtp_task = asyncio.create_task(rtp_loop())
+    return session
+
+
+def test_teardown_runs_steps_in_order():
+    async def scenario():
+        events = []
+        session = make_session(events)
+        await asyncio.sleep(0)
+        times = await session.close()
+        assert events[:3] == ['openai', 'rtp_task', 'rtp']
+        assert sorted(events[3:]) == ['DELETE /bridges/bridge-1', 'DELETE /channels/external_canal-1']
+        assert list(times) == ['openai', 'rtp_task', 'rtp', 'asterisk']
+        assert session.state == 'closed'
+
+    asyncio.run(scenario())
+
+
+def test_hung_step_times_out_and_later_steps_still_run():
+    async def scenario():
+        events = []
+        session = make_session(events, step_timeout=0.1, cleanup_delay=10)
+        before = COUNTERS.snapshot().get(('call_teardown_timeouts_total', (('step', 'rtp'),)), 0)
+        await asyncio.sleep(0)
+        times = await asyncio.wait_for(session.close(), timeout=2)
+        assert 'rtp' not in events
+        assert 'DELETE /bridges/bridge-1' in events, "el bridge se libera aunque el RTP se cuelgue"
+        assert times['rtp'] < 0.5
+        after = COUNTERS.snapshot()[('call_teardown_timeouts_total', (('step', 'rtp'),))]
+        assert after == before + 1
+
+    asyncio.run(scenario())
+
+
+def test_close_is_idempotent():
+    async def scenario():
+        events = []
+        session = make_session(events)
+        await asyncio.sleep(0)
+        first, second = await asyncio.gather(session.close('hangup'), session.close('sweep'))
+        assert events.count('openai') == 1
+        assert events.count('DELETE /bridges/bridge-1') == 1
+        assert second is first
+
+    asyncio.run(scenario())
+
+
+def test_resources_already_gone_are_not_errors():
+    async def scenario():
+        events = []
+        session = make_session(events, statuses={'/bridges/bridge-1': 404})
+        session.external_channel = None
+        await asyncio.sleep(0)
+        await session.close()
+        assert events[-1] == 'DELETE /bridges/bridge-1'
+        assert session.ari_resources() == ['bridge-1']
+
+    asyncio.run(scenario())
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} pruebas correctas")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Pruebas del log de conversación que se reproduce al reanudar la sesión de OpenAI
+
+Uso:
+    python3 utils/test_conversation_log.py
+    python3 -m pytest utils/test_conversation_log.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.conversation_log import ConversationLog
+
+
+def message(role, text):
+    return {'type': 'message', 'role': role, 'content': [{'type': 'input_text', 'text': text}]}
+
+
+def call(call_id):
+    return {'type': 'function_call', 'call_id': call_id, 'name': 'consultar_mikrotik', 'arguments': '{}'}
+
+
+def output(call_id):
+    return {'type': 'function_call_output', 'call_id': call_id, 'output': '{}'}
+
+
+def test_replays_everything_in_order():
+    log = ConversationLog()
+    items = [message('user', 'hola'), call('a'), output('a'), message('assistant', 'listo')]
+    for item in items:
+        log.append(item)
+    assert log.replay_items() == items
+
+
+def test_keeps_only_the_last_items():
+    log = ConversationLog(max_items=2)
+    for text in ('uno', 'dos', 'tres'):
+        log.append(message('user', text))
+    assert [item['content'][0]['text'] for item in log.replay_items()] == ['dos', 'tres']
+
+
+def test_output_without_its_call_is_dropped():
+    log = ConversationLog(max_items=3)
+    log.append(call('a'))
+    log.append(output('a'))
+    log.append(message('user', 'y el router 2?'))
+    log.append(call('b'))  # Expulsa la llamada 'a'; su resultado quedaría huérfano
+    assert log.replay_items() == [message('user', 'y el router 2?'), call('b')]
+
+
+def test_acknowledged_outputs_are_not_sent_twice():
+    log = ConversationLog()
+    log.append(call('a'))
+    log.append(output('a'))
+    log.append(call('b'))
+    log.append(output('b'))
+    assert log.replay_items(acknowledged={'b'}) == [call('a'), output('a'), call('b')]
+
+
+def test_pending_call_is_replayed_without_output():
+    log = ConversationLog()
+    log.append(call('a'))
+    assert log.replay_items() == [call('a')]
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} pruebas correctas")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
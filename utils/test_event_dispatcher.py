@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Pruebas del despacho de eventos ARI por canal
+
+Uso:
+    python3 utils/test_event_dispatcher.py
+    python3 -m pytest utils/test_event_dispatcher.py
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.event_dispatcher import ChannelEventDispatcher, GLOBAL_KEY, event_age, event_key
+
+
+def event(event_type, channel_id, **extra):
+    return dict({'type': event_type, 'channel': {'id': channel_id}}, **extra)
+
+
+def test_event_key():
+    assert event_key(event('StasisStart', 'c1')) == 'c1'
+    assert event_key({'type': 'BridgeDestroyed', 'bridge': {'id': 'b1'}}) == 'b1'
+    assert event_key({'type': 'ApplicationReplaced'}) == GLOBAL_KEY
+
+
+def test_event_age():
+    emitted = datetime.now(timezone.utc) - timedelta(seconds=2)
+    timestamp = emitted.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + '+0000'
+    assert 1.5 < event_age({'timestamp': timestamp}) < 3
+    assert event_age({}) is None
+    assert event_age({'timestamp': 'ayer'}) is None
+
+
+def test_events_of_a_channel_run_in_order():
+    async def scenario():
+        seen = []
+
+        async def handler(ev):
+            # El setup tarda: el StasisEnd no puede adelantarse
+            if ev['type'] == 'StasisStart':
+                await asyncio.sleep(0.05)
+            seen.append(ev['type'])
+
+        dispatcher = ChannelEventDispatcher(handler)
+        dispatcher.dispatch(event('StasisStart', 'c1'))
+        dispatcher.dispatch(event('StasisEnd', 'c1'))
+        await asyncio.sleep(0.1)
+        assert seen == ['StasisStart', 'StasisEnd']
+        await dispatcher.close()
+
+    asyncio.run(scenario())
+
+
+def test_slow_channel_does_not_block_others():
+    async def scenario():
+        release = asyncio.Event()
+        seen = []
+
+        async def handler(ev):
+            if ev['channel']['id'] == 'lento':
+                await release.wait()
+            seen.append(ev['channel']['id'])
+
+        dispatcher = ChannelEventDispatcher(handler)
+        dispatcher.dispatch(event('StasisStart', 'lento'))
+        dispatcher.dispatch(event('StasisStart', 'rapido'))
+        await asyncio.sleep(0.02)
+        assert seen == ['rapido']
+        release.set()
+        await asyncio.sleep(0.02)
+        assert seen == ['rapido', 'lento']
+        await dispatcher.close()
+
+    asyncio.run(scenario())
+
+
+def test_handler_errors_are_contained():
+    async def scenario():
+        seen = []
+
+        async def handler(ev):
+            if ev['type'] == 'Roto':
+                raise ValueError('evento inválido')
+            seen.append(ev['type'])
+
+        dispatcher = ChannelEventDispatcher(handler)
+        dispatcher.dispatch(event('Roto', 'c1'))
+        dispatcher.dispatch(event('StasisEnd', 'c1'))
+        await asyncio.sleep(0.02)
+        assert seen == ['StasisEnd']
+        assert dispatcher.metrics['errors'] == 1
+        assert dispatcher.metrics['processed'] == 1
+        await dispatcher.close()
+
+    asyncio.run(scenario())
+
+
+def test_idle_workers_exit():
+    async def scenario():
+        async def handler(ev):
+            pass
+
+        dispatcher = ChannelEventDispatcher(handler, idle_timeout=0.05)
+        dispatcher.dispatch(event('StasisStart', 'c1'))
+        await asyncio.sleep(0.01)
+        assert 'c1' in dispatcher.workers
+        await asyncio.sleep(0.1)
+        assert dispatcher.workers == {} and dispatcher.queues == {}
+
+        # Un evento posterior del mismo canal crea un worker nuevo
+        dispatcher.dispatch(event('StasisEnd', 'c1'))
+        await asyncio.sleep(0.01)
+        assert dispatcher.metrics['processed'] == 2
+        await dispatcher.close()
+
+    asyncio.run(scenario())
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} pruebas correctas")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
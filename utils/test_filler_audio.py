@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Pruebas del reproductor de audio de relleno
+
+Uso:
+    python3 utils/test_filler_audio.py
+    python3 -m pytest utils/test_filler_audio.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.filler_audio import FRAME_BYTES, FillerLibrary, FillerPlayer
+
+
+def player(**options):
+    return FillerPlayer(FillerLibrary.load(None), **options)
+
+
+def test_silent_during_start_delay():
+    filler = player(start_delay=0.05)
+    filler.start()
+    assert filler.next_frame() is None
+    time.sleep(0.06)
+    assert len(filler.next_frame()) == FRAME_BYTES
+
+
+def test_waits_for_pre_tool_audio_to_finish():
+    filler = player(start_delay=0)
+    filler.start(wait_for_audio=True)
+    assert filler.next_frame() is None
+    filler.audio_finished()
+    assert len(filler.next_frame()) == FRAME_BYTES
+
+
+def test_start_delay_counts_from_audio_finished():
+    filler = player(start_delay=0.05)
+    filler.start(wait_for_audio=True)
+    time.sleep(0.06)
+    filler.audio_finished()
+    assert filler.next_frame() is None
+
+
+def test_stop_and_max_seconds():
+    filler = player(start_delay=0, max_seconds=0.02)
+    filler.start()
+    assert filler.next_frame() is not None
+    time.sleep(0.03)
+    assert filler.next_frame() is None and not filler.active
+
+    filler.start()
+    filler.stop()
+    assert filler.next_frame() is None
+    assert filler.metrics['activations'] == 2
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} pruebas correctas")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Pruebas del límite de tasa y del contexto por llamada de utils/log_setup.py
+
+No necesitan red ni archivos: los registros se crean a mano y se pasan
+directamente a los filtros.
+
+Uso:
+    python3 utils/test_log_setup.py
+    python3 -m pytest utils/test_log_setup.py
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.log_setup import ChannelContextFilter, RateLimitFilter, bind_channel
+
+
+def make_record(message, level=logging.INFO, lineno=10, args=None):
+    return logging.LogRecord('test', level, 'handle_incoming_call.py', lineno, message, args, None)
+
+
+def test_rate_limit_suppresses_repeats_from_same_line():
+    limiter = RateLimitFilter(max_per_interval=3, interval=60)
+    passed = [limiter.filter(make_record('audio delta')) for _ in range(10)]
+    assert passed == [True] * 3 + [False] * 7
+
+
+def test_each_source_line_has_its_own_window():
+    limiter = RateLimitFilter(max_per_interval=1, interval=60)
+    assert limiter.filter(make_record('a', lineno=10))
+    assert not limiter.filter(make_record('a', lineno=10))
+    assert limiter.filter(make_record('b', lineno=20))
+
+
+def test_warnings_are_never_dropped():
+    limiter = RateLimitFilter(max_per_interval=1, interval=60)
+    limiter.filter(make_record('info'))
+    assert all(limiter.filter(make_record('atasco', level=logging.WARNING)) for _ in range(5))
+    assert limiter.filter(make_record('error', level=logging.ERROR))
+
+
+def test_next_window_reports_suppressed_count():
+    limiter = RateLimitFilter(max_per_interval=2, interval=0.05)
+    for _ in range(5):
+        limiter.filter(make_record('delta %s', args=('x',)))
+    time.sleep(0.06)
+    record = make_record('delta %s', args=('y',))
+    assert limiter.filter(record)
+    assert record.getMessage() == 'delta y (+3 mensajes similares suprimidos)'
+
+    time.sleep(0.06)
+    record = make_record('delta %s', args=('z',))
+    assert limiter.filter(record)
+    assert record.getMessage() == 'delta z', "el aviso solo acompaña a la ventana siguiente"
+
+
+def test_channel_context_follows_each_task():
+    async def call(channel_id):
+        bind_channel(channel_id)
+        await asyncio.sleep(0.01)
+        record = make_record('evento')
+        ChannelContextFilter().filter(record)
+        return record.channel_id
+
+    async def scenario():
+        return await asyncio.gather(call('canal-1'), call('canal-2'))
+
+    assert asyncio.run(scenario()) == ['canal-1', 'canal-2']
+    record = make_record('fuera de llamada')
+    ChannelContextFilter().filter(record)
+    assert record.channel_id == '-'
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} pruebas correctas")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
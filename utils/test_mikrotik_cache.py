@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la caché de respuestas de MikroTik: normalización, categorías de TTL y LRU
+
+Uso:
+    python3 utils/test_mikrotik_cache.py
+    python3 -m pytest utils/test_mikrotik_cache.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.mikrotik_api_client import MikroTikAPIClient
+from utils.mikrotik_cache import QueryCache, classify_question, normalize_question
+
+OK = {'success': True, 'response': 'Hay 3 routers configurados'}
+
+
+def classify(question):
+    return classify_question(normalize_question(question))
+
+
+def test_normalize_accents_case_and_punctuation():
+    assert normalize_question('¿Qué routers están CONFIGURADOS?') == 'que routers estan configurados'
+    assert normalize_question('Por favor, dime  el estado') == 'estado'
+
+
+def test_normalize_numbers():
+    assert normalize_question('router-0146') == 'router 146'
+    assert normalize_question('el router dos') == 'router 2'
+    assert normalize_question('ping a 10.0.0.9') == 'ping a 10.0.0.9'
+
+
+def test_equivalent_questions_share_a_key():
+    cache = QueryCache()
+    assert cache.key_for('¿Estado del router 146?') == cache.key_for('estado del ROUTER 0146')
+
+
+def test_categories():
+    assert classify('Reinicia el router 146') == 'live'
+    assert classify('¿Hay una caída en el sector norte?') == 'status'
+    assert classify('¿Cuánto debe el cliente Pérez?') == 'account'
+    assert classify('¿Qué routers están configurados?') == 'static'
+    assert classify('Hola') == 'default'
+
+
+def test_categories_match_whole_words_only():
+    assert classify('lista de clientes morosos') == 'account'
+    assert classify('el plan de Juan está cortado') == 'account'
+    assert classify('la planta eléctrica') == 'default'
+    assert classify('dame la lista de dispositivos activos') == 'status'
+
+
+def test_state_changing_commands_are_live():
+    assert classify('Cambia el plan de Juan Perez a 30 megas') == 'live'
+    assert classify('Bloquea al cliente Juan Perez') == 'live'
+    assert classify('Suspende el servicio del cliente 1520') == 'live'
+    assert classify('Reconecta al cliente Pérez') == 'live'
+    assert classify('Asigna la IP 10.0.0.50 al cliente') == 'live'
+    assert classify('Elimina la cola del cliente Pérez') == 'live'
+    assert classify('Agrega el cliente nuevo al router 146') == 'live'
+    assert classify('¿Qué planes hay?') == 'default'
+
+
+def test_commands_and_unknown_questions_are_not_cached():
+    cache = QueryCache()
+    for command in ('Cambia el plan de Juan Perez a 30 megas', 'Bloquea al cliente Juan Perez',
+                    'Suspende el servicio del cliente 1520', 'Hola'):
+        cache.set(command, OK)
+        assert cache.get(command) is None
+    assert cache.metrics['stores'] == 0
+
+
+def test_live_questions_are_never_cached():
+    cache = QueryCache()
+    cache.set('Haz ping al router 146', OK)
+    assert cache.get('Haz ping al router 146') is None
+    assert cache.metrics['stores'] == 0
+
+
+def test_failures_are_never_cached():
+    cache = QueryCache()
+    cache.set('¿Qué routers están configurados?', {'success': False, 'error_type': 'timeout'})
+    assert cache.get('¿Qué routers están configurados?') is None
+
+
+def test_hit_is_marked_and_copied():
+    cache = QueryCache()
+    cache.set('¿Qué routers están configurados?', OK)
+    hit = cache.get('que routers estan configurados')
+    assert hit['response'] == OK['response']
+    assert hit['metadata'] == {'cached': True, 'cache_category': 'static'}
+    hit['response'] = 'modificada'
+    assert cache.get('¿Qué routers están configurados?')['response'] == OK['response']
+
+
+def test_entries_expire():
+    cache = QueryCache(ttls={'status': 0.05})
+    cache.set('estado del router 146', OK)
+    assert cache.get('estado del router 146') is not None
+    time.sleep(0.06)
+    assert cache.get('estado del router 146') is None
+    assert cache.metrics['expired'] == 1
+
+
+def test_lru_eviction():
+    cache = QueryCache(max_entries=2)
+    cache.set('estado del router 1', OK)
+    cache.set('estado del router 2', OK)
+    cache.get('estado del router 1')  # El 2 queda como el menos usado
+    cache.set('estado del router 3', OK)
+    assert cache.get('estado del router 2') is None
+    assert cache.get('estado del router 1') is not None
+    assert cache.metrics['evictions'] == 1
+
+
+def test_sync_client_does_not_cache_by_default():
+    assert MikroTikAPIClient().cache is None
+    assert MikroTikAPIClient(enable_cache=True).cache is not None
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} pruebas correctas")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
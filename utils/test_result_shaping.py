@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la compactación de resultados de herramientas
+
+Uso:
+    python3 utils/test_result_shaping.py
+    python3 -m pytest utils/test_result_shaping.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.result_shaping import (
+    ResultShape, format_number_for_speech, json_size, shape_result, truncate_text
+)
+
+
+def test_numbers_for_speech():
+    assert format_number_for_speech(1234567) == '1.234.567'
+    assert format_number_for_speech(3.14159) == '3,14'
+    assert format_number_for_speech(2.50) == '2,5'
+    assert format_number_for_speech(12.0) == '12'
+    assert format_number_for_speech(True) is True
+    assert format_number_for_speech('146') == '146'
+
+
+def test_truncate_prefers_sentence_end():
+    text = 'El router 146 está en línea. Tiene 12 clientes conectados y tráfico normal en todas las interfaces.'
+    assert truncate_text(text, 50) == 'El router 146 está en línea.'
+    assert truncate_text(text, len(text)) == text
+
+
+def test_truncate_falls_back_to_word_boundary():
+    text = 'uno dos tres cuatro cinco seis siete ocho nueve diez'
+    cut = truncate_text(text, 30)
+    assert cut.endswith('…')
+    assert text.startswith(cut[:-1])
+    assert not cut[:-1].endswith(' ')
+
+
+def test_only_declared_fields_are_kept():
+    shape = ResultShape(fields=('success', 'response'))
+    shaped = shape.apply({
+        'success': True, 'response': 'ok', 'error_type': None,
+        'metadata': {'cached': True, 'routers': 3}
+    })
+    assert shaped == {'success': True, 'response': 'ok'}
+
+
+def test_metadata_fields_are_filtered():
+    shape = ResultShape(metadata_fields=('routers',))
+    shaped = shape.apply({'success': True, 'response': 'ok', 'metadata': {'cached': True, 'routers': 3000}})
+    assert shaped['metadata'] == {'routers': '3.000'}
+
+
+def test_lists_are_truncated_with_count():
+    shape = ResultShape(fields=('routers',), max_list_items=2)
+    shaped = shape.apply({'routers': ['r1', 'r2', 'r3', 'r4']})
+    assert shaped['routers'] == ['r1', 'r2', '... y 2 más (total 4)']
+
+
+def test_byte_budget_trims_response():
+    shape = ResultShape(max_bytes=300, max_string_chars=5000)
+    response = 'El cliente tiene servicio activo. ' * 40
+    shaped = shape.apply({'success': True, 'response': response})
+    assert json_size(shaped) <= 300
+    assert shaped['response'].endswith('.')
+
+
+def test_shape_result_reports_sizes():
+    result = {'success': True, 'response': 'ok', 'metadata': {'execution_time': 1.5}}
+    shaped, raw_bytes, shaped_bytes = shape_result(result, ResultShape())
+    assert shaped == {'success': True, 'response': 'ok'}
+    assert raw_bytes == json_size(result) and shaped_bytes == json_size(shaped)
+    assert shape_result(result, None) == (result, raw_bytes, raw_bytes)
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} pruebas correctas")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
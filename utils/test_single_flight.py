@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Pruebas de SingleFlight (coalescencia de consultas idénticas en vuelo)
+
+No necesitan red: la petición upstream es una corrutina simulada, y en las
+pruebas del cliente asíncrono request_query no sale del proceso.
+
+Uso:
+    python3 utils/test_single_flight.py
+    python3 -m pytest utils/test_single_flight.py
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.mikrotik_async_client import AsyncMikroTikAPIClient
+from utils.single_flight import SingleFlight
+
+
+class Upstream:
+    """Petición simulada que cuenta cuántas veces se ejecuta"""
+
+    def __init__(self, delay=0.05, result='ok'):
+        self.delay = delay
+        self.result = result
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.result
+
+
+def test_concurrent_callers_share_one_request():
+    async def scenario():
+        flight = SingleFlight()
+        upstream = Upstream()
+        results = await asyncio.gather(*(flight.do('routers', upstream) for _ in range(5)))
+        assert upstream.calls == 1
+        assert [result for result, _ in results] == ['ok'] * 5
+        assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+        assert flight.in_flight() == 0
+        assert flight.metrics['upstream_avoided'] == 4
+
+    asyncio.run(scenario())
+
+
+def test_one_waiter_cancelled_others_get_result():
+    async def scenario():
+        flight = SingleFlight()
+        upstream = Upstream()
+        leaving = asyncio.create_task(flight.do('routers', upstream))
+        staying = asyncio.create_task(flight.do('routers', upstream))
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+        assert await staying == ('ok', True)
+        assert upstream.calls == 1
+        assert flight.metrics['abandoned'] == 0
+
+    asyncio.run(scenario())
+
+
+def test_last_waiter_cancelled_cancels_request():
+    async def scenario():
+        flight = SingleFlight()
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def upstream():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        caller = asyncio.create_task(flight.do('routers', upstream))
+        await started.wait()
+        caller.cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        assert flight.metrics['abandoned'] == 1
+        assert flight.in_flight() == 0
+
+    asyncio.run(scenario())
+
+
+def test_new_caller_after_abandon_gets_fresh_request():
+    """Un solicitante que llega mientras la petición abandonada se cancela no debe heredar su CancelledError"""
+    async def scenario():
+        flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def dying():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            finally:
+                # Limpieza lenta tras la cancelación: amplía la ventana de la carrera
+                await asyncio.shield(asyncio.sleep(0.05))
+
+        caller = asyncio.create_task(flight.do('routers', dying))
+        await started.wait()
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+
+        upstream = Upstream(result='nuevo')
+        assert await flight.do('routers', upstream) == ('nuevo', False)
+        assert upstream.calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_errors_reach_every_waiter():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ConnectionError('API caída')
+
+        results = await asyncio.gather(
+            *(flight.do('routers', failing) for _ in range(3)), return_exceptions=True
+        )
+        assert all(isinstance(result, ConnectionError) for result in results)
+        assert flight.in_flight() == 0
+
+    asyncio.run(scenario())
+
+
+class CountingClient(AsyncMikroTikAPIClient):
+    """Cliente sin red que cuenta las peticiones upstream"""
+
+    def __init__(self):
+        super().__init__(api_url='http://127.0.0.1:9', enable_cache=False)
+        self.upstream_requests = 0
+
+    async def request_query(self, question, timeout=None, deadline=None):
+        self.upstream_requests += 1
+        await asyncio.sleep(0.05)
+        return {'success': True, 'response': f'respuesta {self.upstream_requests}'}
+
+
+def run_concurrently(client, calls):
+    async def scenario():
+        try:
+            return await asyncio.gather(*(client.query(question, **options) for question, options in calls))
+        finally:
+            await client.close()
+
+    return asyncio.run(scenario())
+
+
+def test_client_coalesces_identical_questions():
+    client = CountingClient()
+    results = run_concurrently(client, [('¿Hay una caída en el router 146?', {})] * 3)
+    assert client.upstream_requests == 1
+    assert sum(bool((result.get('metadata') or {}).get('coalesced')) for result in results) == 2
+
+
+def test_forced_refresh_does_not_join_in_flight_request():
+    client = CountingClient()
+    run_concurrently(client, [
+        ('¿Hay una caída en el router 146?', {}),
+        ('¿Hay una caída en el router 146?', {'use_cache': False})
+    ])
+    assert client.upstream_requests == 2
+
+
+def test_different_timeouts_do_not_share_a_request():
+    client = CountingClient()
+    run_concurrently(client, [
+        ('¿Hay una caída en el router 146?', {'timeout': 10}),
+        ('¿Hay una caída en el router 146?', {'timeout': 60})
+    ])
+    assert client.upstream_requests == 2
+
+
+def test_commands_are_never_coalesced():
+    client = CountingClient()
+    results = run_concurrently(client, [('Bloquea al cliente Juan Perez', {})] * 2)
+    assert client.upstream_requests == 2
+    assert not any((result.get('metadata') or {}).get('coalesced') for result in results)
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} pruebas correctas")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
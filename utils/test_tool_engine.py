@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Pruebas del motor de herramientas: circuit breaker, cola y deadlines
+
+No necesitan red: las herramientas son corrutinas simuladas y la API de
+MikroTik se reemplaza por una subclase cuyo request_query no sale del proceso.
+
+Uso:
+    python3 utils/test_tool_engine.py
+    python3 -m pytest utils/test_tool_engine.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.mikrotik_async_client import AsyncMikroTikAPIClient
+from utils.tool_registry import Tool, ToolRegistry
+from utils.tool_engine import (
+    CircuitBreaker, ToolExecutor, STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
+)
+
+
+async def succeed():
+    return {'success': True, 'response': 'ok'}
+
+
+async def fail():
+    return {'success': False, 'response': 'caída', 'error_type': 'connection_error'}
+
+
+class SlowTimeoutClient(AsyncMikroTikAPIClient):
+    """Cliente cuya API tarda y termina en timeout; cuenta las peticiones upstream"""
+
+    def __init__(self):
+        super().__init__(api_url='http://127.0.0.1:9', enable_cache=False)
+        self.upstream_requests = 0
+
+    async def request_query(self, question, timeout=None, deadline=None):
+        self.upstream_requests += 1
+        await asyncio.sleep(0.05)
+        return self.timeout_response()
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker('mikrotik', failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == STATE_CLOSED
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allow()
+    assert breaker.metrics == {'opened': 1, 'short_circuited': 1}
+
+
+def test_breaker_success_resets_failure_count():
+    breaker = CircuitBreaker('mikrotik', failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == STATE_CLOSED
+    assert breaker.consecutive_failures == 1
+
+
+def test_breaker_half_open_allows_one_trial():
+    breaker = CircuitBreaker('mikrotik', failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    breaker.opened_at = time.monotonic() - 31
+    assert breaker.allow()
+    assert breaker.state == STATE_HALF_OPEN
+    assert not breaker.allow()  # Solo una llamada de prueba a la vez
+
+    breaker.record_failure()  # La prueba falló: vuelve a abrirse
+    assert breaker.state == STATE_OPEN
+
+    breaker.opened_at = time.monotonic() - 31
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+
+
+def test_executor_short_circuits_when_open():
+    async def scenario():
+        executor = ToolExecutor(failure_threshold=2, reset_timeout=30)
+        for _ in range(2):
+            await executor.run('mikrotik', fail, deadline=1)
+        result = await executor.run('mikrotik', succeed, deadline=1)
+        assert result['error_type'] == 'circuit_open'
+        assert executor.metrics['rejected_circuit_open'] == 1
+
+    asyncio.run(scenario())
+
+
+def test_executor_deadline_counts_as_failure():
+    async def scenario():
+        executor = ToolExecutor(failure_threshold=1)
+
+        async def hang():
+            await asyncio.sleep(10)
+
+        result = await executor.run('mikrotik', hang, deadline=0.05)
+        assert result['error_type'] == 'timeout'
+        assert executor.breaker('mikrotik').state == STATE_OPEN
+        assert executor.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_executor_rejects_when_queue_full():
+    async def scenario():
+        executor = ToolExecutor(global_limit=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def blocking():
+            await release.wait()
+            return {'success': True}
+
+        running = asyncio.create_task(executor.run('mikrotik', blocking, deadline=5))
+        await asyncio.sleep(0.01)  # Que tome los semáforos antes de encolar la siguiente
+        waiting = asyncio.create_task(executor.run('mikrotik', blocking, deadline=5))
+        await asyncio.sleep(0.01)
+        rejected = await executor.run('mikrotik', blocking, deadline=5)
+        assert rejected['error_type'] == 'overloaded'
+        release.set()
+        assert (await running)['success'] and (await waiting)['success']
+
+    asyncio.run(scenario())
+
+
+def test_coalesced_failures_count_once():
+    """5 llamadas con la misma pregunta, 1 timeout upstream: 1 fallo para el breaker"""
+    async def scenario():
+        client = SlowTimeoutClient()
+        executor = ToolExecutor(failure_threshold=2)
+        try:
+            results = await asyncio.gather(*(
+                executor.run('mikrotik', lambda: client.query('¿Hay una caída en el router 146?'), deadline=5)
+                for _ in range(5)
+            ))
+        finally:
+            await client.close()
+        assert client.upstream_requests == 1
+        assert all(result['error_type'] == 'timeout' for result in results)
+        breaker = executor.breaker('mikrotik')
+        assert breaker.consecutive_failures == 1
+        assert breaker.state == STATE_CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_cached_result_does_not_close_half_open_breaker():
+    async def scenario():
+        executor = ToolExecutor(failure_threshold=1, reset_timeout=30)
+        await executor.run('mikrotik', fail, deadline=1)
+        breaker = executor.breaker('mikrotik')
+        breaker.opened_at = time.monotonic() - 31
+
+        async def from_cache():
+            return {'success': True, 'response': 'ok', 'metadata': {'cached': True}}
+
+        assert (await executor.run('mikrotik', from_cache, deadline=1))['success']
+        assert breaker.state == STATE_HALF_OPEN
+        # La llamada de prueba sigue disponible para el backend real
+        await executor.run('mikrotik', succeed, deadline=1)
+        assert breaker.state == STATE_CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_registry_serves_cached_answers_while_breaker_is_open():
+    async def scenario():
+        executor = ToolExecutor(failure_threshold=1, reset_timeout=30)
+        await executor.run('mikrotik', fail, deadline=1)
+        cache = {'¿Qué routers están configurados?': {'success': True, 'response': 'Hay 3 routers'}}
+        registry = ToolRegistry(engine=executor, shape_results=False)
+
+        async def backend(arguments, deadline):
+            return await succeed()
+
+        registry.register(Tool(
+            {'name': 'consultar_mikrotik'}, backend, backend='mikrotik',
+            cache_lookup=lambda arguments: cache.get(arguments['pregunta'])
+        ))
+        hit = await registry.execute('consultar_mikrotik', {'pregunta': '¿Qué routers están configurados?'})
+        assert hit['response'] == 'Hay 3 routers'
+        miss = await registry.execute('consultar_mikrotik', {'pregunta': '¿Hay una caída?'})
+        assert miss['error_type'] == 'circuit_open'
+        assert executor.breaker('mikrotik').state == STATE_OPEN
+
+    asyncio.run(scenario())
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} pruebas correctas")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
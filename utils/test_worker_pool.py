@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Pruebas del reparto de llamadas entre workers (lado supervisor)
+
+No lanzan procesos: los workers se conectan con un writer simulado que
+guarda los mensajes que les llegan.
+
+Uso:
+    python3 utils/test_worker_pool.py
+    python3 -m pytest utils/test_worker_pool.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.worker_pool import MAX_BUFFERED_BYTES, WorkerPool
+
+
+class FakeTransport:
+    def __init__(self):
+        self.pending = 0
+
+    def get_write_buffer_size(self):
+        return self.pending
+
+
+class FakeWriter:
+    """Writer de un worker conectado: guarda los mensajes escritos"""
+
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.messages = []
+        self.closed = False
+
+    def write(self, data):
+        self.messages.append(json.loads(data))
+
+    def is_closing(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+    def events(self):
+        return [(m['event']['type'], m['event']['channel']['id']) for m in self.messages if m['type'] == 'event']
+
+
+def connected_pool(workers=2, **options):
+    pool = WorkerPool(['worker'], workers, '/tmp/no-usado.sock', **options)
+    for worker in pool.workers:
+        worker.writer = FakeWriter()
+    return pool
+
+
+def event(event_type, channel_id):
+    return {'type': event_type, 'channel': {'id': channel_id}}
+
+
+def test_rtp_ranges_are_split():
+    pool = WorkerPool(['worker'], 4, '/tmp/no-usado.sock', port_range=(10000, 20000))
+    assert [worker.port_range for worker in pool.workers] == [
+        (10000, 12500), (12500, 15000), (15000, 17500), (17500, 20000)
+    ]
+
+
+def test_stasis_start_goes_to_least_loaded_worker():
+    pool = connected_pool()
+    assert pool.route(event('StasisStart', 'c1')) == 0
+    assert pool.route(event('StasisStart', 'c2')) == 1
+    assert pool.route(event('StasisStart', 'c3')) == 0
+    assert pool.assignments == {'c1': 0, 'c2': 1, 'c3': 0}
+
+
+def test_external_leg_follows_its_call():
+    pool = connected_pool()
+    pool.route(event('StasisStart', 'c1'))
+    pool.route(event('StasisStart', 'c2'))
+    assert pool.route(event('StasisStart', 'external_c2')) == 1
+    assert pool.route(event('ChannelStateChange', 'external_c2')) == 1
+    assert pool.workers[1].writer.events() == [
+        ('StasisStart', 'c2'), ('StasisStart', 'external_c2'), ('ChannelStateChange', 'external_c2')
+    ]
+    # El External Media nunca crea una asignación propia
+    assert 'external_c2' not in pool.assignments
+
+
+def test_unassigned_events_are_dropped():
+    pool = connected_pool()
+    assert pool.route(event('StasisStart', 'external_c9')) is None
+    assert pool.route(event('StasisEnd', 'c9')) is None
+    assert pool.route({'type': 'ApplicationReplaced'}) is None
+    assert all(not worker.writer.messages for worker in pool.workers)
+
+
+def test_stasis_end_releases_the_call():
+    pool = connected_pool()
+    pool.route(event('StasisStart', 'c1'))
+    assert pool.route(event('StasisEnd', 'external_c1')) == 0  # El External Media no libera la llamada
+    assert pool.assignments == {'c1': 0}
+    assert pool.route(event('StasisEnd', 'c1')) == 0
+    assert pool.assignments == {} and not pool.workers[0].channels
+    # Lo que llegue después del External Media ya no tiene dueño
+    assert pool.route(event('StasisEnd', 'external_c1')) is None
+
+
+def test_no_connected_workers():
+    pool = WorkerPool(['worker'], 2, '/tmp/no-usado.sock')
+    assert pool.route(event('StasisStart', 'c1')) is None
+    assert pool.assignments == {}
+
+
+def test_stalled_worker_is_disconnected():
+    pool = connected_pool(workers=1)
+    pool.route(event('StasisStart', 'c1'))
+    writer = pool.workers[0].writer
+    writer.transport.pending = MAX_BUFFERED_BYTES + 1
+    assert pool.route(event('ChannelDtmfReceived', 'c1')) is None
+    assert writer.closed and not pool.workers[0].connected
+    assert len(writer.messages) == 1
+
+
+def test_calls_of_a_dead_worker_are_handed_to_on_lost():
+    async def scenario():
+        lost = []
+
+        async def on_lost(channel_ids):
+            lost.extend(channel_ids)
+
+        pool = connected_pool(on_lost=on_lost, restart_delay=0)
+        respawned = []
+
+        async def spawn(worker):
+            respawned.append(worker.index)
+
+        pool.spawn = spawn
+        pool.route(event('StasisStart', 'c1'))
+        pool.route(event('StasisStart', 'c2'))
+        pool.route(event('StasisStart', 'c3'))
+
+        class DeadProcess:
+            async def wait(self):
+                return -9
+
+        await pool.monitor(pool.workers[0], DeadProcess())
+        assert sorted(lost) == ['c1', 'c3']
+        assert pool.assignments == {'c2': 1}
+        assert respawned == [0] and pool.workers[0].restarts == 1
+
+    asyncio.run(scenario())
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} pruebas correctas")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Motor de ejecución de herramientas (function calling)
+
+Acota el trabajo que las herramientas pueden acumular cuando un backend
+está enfermo:
+- Límite de concurrencia global y por backend (semáforos)
+- Cola con control de admisión: si hay demasiadas consultas esperando se
+  responde de inmediato en lugar de encolar sin límite
+- Deadline por llamada que incluye el tiempo de espera en cola
+- Circuit breaker por backend alimentado por fallos de transporte y por
+  check_health; con el breaker abierto se responde al instante con un
+  mensaje hablado de respaldo. Los resultados marcados como coalesced
+  (compartidos de otra petición en vuelo) no vuelven a contar su fallo y
+  los servidos desde caché no cuentan para el breaker
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+# Respuestas habladas cuando no se puede ejecutar la herramienta
+FALLBACK_CIRCUIT_OPEN = {
+    "success": False,
+    "response": (
+        "En este momento el sistema de consultas no está disponible. "
+        "Por favor, intenta de nuevo en unos minutos."
+    ),
+    "error_type": "circuit_open"
+}
+
+FALLBACK_OVERLOADED = {
+    "success": False,
+    "response": (
+        "En este momento hay muchas consultas en curso. "
+        "Por favor, intenta de nuevo en un momento."
+    ),
+    "error_type": "overloaded"
+}
+
+FALLBACK_DEADLINE = {
+    "success": False,
+    "response": (
+        "La consulta tardó demasiado tiempo en responder. "
+        "Por favor, intenta con una pregunta más simple o inténtalo nuevamente."
+    ),
+    "error_type": "timeout"
+}
+
+
+class CircuitBreaker:
+    """Breaker clásico cerrado/abierto/semiabierto para un backend"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        """
+        Args:
+            name: Nombre del backend (para logs)
+            failure_threshold: Fallos consecutivos que abren el breaker
+            reset_timeout: Segundos abierto antes de permitir una llamada de prueba
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.metrics = {'opened': 0, 'short_circuited': 0}
+
+    def allow(self) -> bool:
+        """Indica si se puede llamar al backend ahora"""
+        if self.state == STATE_CLOSED:
+            return True
+        if self.state == STATE_OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = STATE_HALF_OPEN
+            self.trial_in_flight = False
+            logging.info(f"[breaker {self.name}] Semiabierto, se permite una llamada de prueba")
+        if self.state == STATE_HALF_OPEN and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        self.metrics['short_circuited'] += 1
+        return False
+
+    def record_success(self):
+        if self.state != STATE_CLOSED:
+            logging.info(f"[breaker {self.name}] Cerrado: el backend respondió correctamente")
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.trial_in_flight = False
+        if self.state == STATE_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.open()
+
+    def open(self):
+        if self.state != STATE_OPEN:
+            self.metrics['opened'] += 1
+            logging.warning(
+                f"[breaker {self.name}] ABIERTO tras {self.consecutive_failures} fallos; "
+                f"respuestas de respaldo durante {self.reset_timeout}s"
+            )
+        self.state = STATE_OPEN
+        self.opened_at = time.monotonic()
+
+
+class ToolExecutor:
+    """Ejecuta corrutinas de herramientas con límites, deadlines y circuit breaker"""
+
+    def __init__(self, global_limit: int = 16, backend_limits: Optional[Dict[str, int]] = None,
+                 max_queue: int = 32, failure_threshold: int = 5, reset_timeout: float = 30):
+        """
+        Args:
+            global_limit: Herramientas ejecutándose a la vez en todo el proceso
+            backend_limits: Límite por backend, p. ej. {'mikrotik': 8}
+            max_queue: Máximo de llamadas esperando turno antes de rechazar
+            failure_threshold: Fallos consecutivos que abren el breaker de un backend
+            reset_timeout: Segundos que el breaker permanece abierto
+        """
+        self.global_semaphore = asyncio.Semaphore(global_limit)
+        self.global_limit = global_limit
+        self.backend_limits = dict(backend_limits or {})
+        self.backend_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.max_queue = max_queue
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.health_checks: Dict[str, Callable[[], Awaitable[bool]]] = {}
+        self.health_tasks: Dict[str, asyncio.Task] = {}
+
+        self.queued = 0
+        self.in_flight = 0
+        self.metrics = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'deadline_exceeded': 0,
+            'rejected_overload': 0,
+            'rejected_circuit_open': 0
+        }
+
+    def breaker(self, backend: str) -> CircuitBreaker:
+        if backend not in self.breakers:
+            self.breakers[backend] = CircuitBreaker(backend, self.failure_threshold, self.reset_timeout)
+        return self.breakers[backend]
+
+    def backend_semaphore(self, backend: str) -> asyncio.Semaphore:
+        if backend not in self.backend_semaphores:
+            limit = self.backend_limits.get(backend, self.global_limit)
+            self.backend_semaphores[backend] = asyncio.Semaphore(limit)
+        return self.backend_semaphores[backend]
+
+    def register_health_check(self, backend: str, check: Callable[[], Awaitable[bool]]):
+        """check_health del backend: mientras el breaker esté abierto se consulta para cerrarlo antes"""
+        self.health_checks[backend] = check
+
+    async def run(self, backend: str, factory: Callable[[], Awaitable[Dict[str, Any]]],
+                  deadline: float) -> Dict[str, Any]:
+        """
+        Ejecuta factory() respetando límites, deadline y breaker del backend
+
+        Args:
+            backend: Nombre del backend ('mikrotik')
+            factory: Crea la corrutina que hace el trabajo; retorna el dict de la herramienta
+            deadline: Segundos máximos desde ahora, incluyendo la espera en cola
+
+        Returns:
+            Resultado de la herramienta o una respuesta hablada de respaldo
+        """
+        self.metrics['submitted'] += 1
+        breaker = self.breaker(backend)
+        if not breaker.allow():
+            self.metrics['rejected_circuit_open'] += 1
+            self.ensure_health_probe(backend)
+            return dict(FALLBACK_CIRCUIT_OPEN)
+
+        if self.queued >= self.max_queue:
+            self.metrics['rejected_overload'] += 1
+            logging.warning(f"Motor de herramientas saturado ({self.queued} en cola), rechazando consulta")
+            breaker.trial_in_flight = False
+            return dict(FALLBACK_OVERLOADED)
+
+        expires_at = time.monotonic() + deadline
+        backend_semaphore = self.backend_semaphore(backend)
+        self.queued += 1
+        acquired_global = acquired_backend = False
+        try:
+            try:
+                await asyncio.wait_for(self.global_semaphore.acquire(), timeout=max(0, expires_at - time.monotonic()))
+                acquired_global = True
+                await asyncio.wait_for(backend_semaphore.acquire(), timeout=max(0, expires_at - time.monotonic()))
+                acquired_backend = True
+            except asyncio.TimeoutError:
+                self.metrics['deadline_exceeded'] += 1
+                logging.warning(f"Deadline de {deadline}s agotado esperando turno para {backend}")
+                breaker.trial_in_flight = False
+                return dict(FALLBACK_DEADLINE)
+            finally:
+                self.queued -= 1
+
+            self.in_flight += 1
+            try:
+                result = await asyncio.wait_for(factory(), timeout=max(0, expires_at - time.monotonic()))
+            except asyncio.TimeoutError:
+                self.metrics['deadline_exceeded'] += 1
+                breaker.record_failure()
+                logging.warning(f"Deadline de {deadline}s agotado ejecutando {backend}")
+                return dict(FALLBACK_DEADLINE)
+            finally:
+                self.in_flight -= 1
+
+            if (result.get('metadata') or {}).get('cached'):
+                # Respondido desde caché sin contactar al backend: no dice nada de su
+                # salud, y la llamada de prueba del semiabierto debe llegar al backend
+                self.metrics['completed'] += 1
+                breaker.trial_in_flight = False
+                return result
+
+            if result.get('error_type'):
+                self.metrics['failed'] += 1
+                if (result.get('metadata') or {}).get('coalesced'):
+                    # Resultado compartido de una petición que ya contó su solicitante
+                    # original: un fallo upstream es un solo fallo para el breaker
+                    breaker.trial_in_flight = False
+                    return result
+                breaker.record_failure()
+                if breaker.state == STATE_OPEN:
+                    self.ensure_health_probe(backend)
+            else:
+                self.metrics['completed'] += 1
+                breaker.record_success()
+            return result
+
+        except asyncio.CancelledError:
+            breaker.trial_in_flight = False
+            raise
+        except Exception:
+            self.metrics['failed'] += 1
+            breaker.record_failure()
+            raise
+        finally:
+            if acquired_backend:
+                backend_semaphore.release()
+            if acquired_global:
+                self.global_semaphore.release()
+
+    def ensure_health_probe(self, backend: str):
+        """Arranca (una vez) la sonda de salud del backend mientras el breaker esté abierto"""
+        if backend not in self.health_checks:
+            return
+        task = self.health_tasks.get(backend)
+        if task and not task.done():
+            return
+        self.health_tasks[backend] = asyncio.create_task(self.health_probe(backend))
+
+    async def health_probe(self, backend: str):
+        breaker = self.breaker(backend)
+        check = self.health_checks[backend]
+        interval = max(1.0, self.reset_timeout / 3)
+        try:
+            while breaker.state != STATE_CLOSED:
+                await asyncio.sleep(interval)
+                if await check():
+                    logging.info(f"[breaker {backend}] check_health OK, cerrando breaker")
+                    breaker.record_success()
+                else:
+                    breaker.open()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logging.error(f"Error en sonda de salud de {backend}: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = dict(self.metrics)
+        data['queued'] = self.queued
+        data['in_flight'] = self.in_flight
+        data['breakers'] = {name: breaker.state for name, breaker in self.breakers.items()}
+        return data
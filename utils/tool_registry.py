@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Registro de herramientas para function calling
+
+Cada herramienta declara su esquema para OpenAI, su ejecutor (síncrono o
+asíncrono), el backend del motor de herramientas que la limita, su deadline
+y su política de caché. La lista de tools para session.update se arma una
+sola vez al arrancar y la ejecución se despacha por nombre. Antes de
+devolverse, el resultado pasa por la forma declarada por la herramienta
+(ver utils/result_shaping.py).
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Union
+
+try:
+    from utils.result_shaping import ResultShape, shape_result
+except ImportError:  # Ejecutado desde utils/ (scripts de prueba)
+    from result_shaping import ResultShape, shape_result
+
+Executor = Callable[[Dict[str, Any], float], Any]
+
+
+class Tool:
+    """Una herramienta invocable por el modelo"""
+
+    def __init__(self, definition: Dict[str, Any], executor: Executor,
+                 backend: Optional[str] = None,
+                 deadline: Union[float, Callable[[Dict[str, Any]], float]] = 30,
+                 cache_ttl: Optional[float] = None,
+                 result_shape: Optional[ResultShape] = None,
+                 cache_lookup: Optional[Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]] = None):
+        """
+        Args:
+            definition: Definición del tool en formato OpenAI (incluye "name")
+            executor: fn(argumentos, deadline) -> dict, síncrona o corrutina.
+                      Las síncronas se ejecutan en un thread (asyncio.to_thread).
+            backend: Backend del motor de herramientas (límites y breaker); None = sin motor
+            deadline: Segundos máximos, fijo o calculado a partir de los argumentos
+            cache_ttl: None = la herramienta gestiona su propia caché,
+                       0 = nunca cachear, >0 = el registro cachea respuestas exitosas
+                       por argumentos idénticos durante esos segundos
+            result_shape: Forma del resultado que verá el modelo (None = sin compactar)
+            cache_lookup: Con caché propia (cache_ttl=None), fn(argumentos) -> respuesta
+                          cacheada o None. Se consulta antes del motor: una respuesta ya
+                          cacheada no pasa por el breaker ni cuenta como llamada al backend
+        """
+        self.definition = definition
+        self.name = definition['name']
+        self.executor = executor
+        self.is_async = inspect.iscoroutinefunction(executor)
+        self.backend = backend
+        self.deadline = deadline
+        self.cache_ttl = cache_ttl
+        self.result_shape = result_shape
+        self.cache_lookup = cache_lookup
+
+    def deadline_for(self, arguments: Dict[str, Any]) -> float:
+        if callable(self.deadline):
+            return self.deadline(arguments)
+        return self.deadline
+
+    async def invoke(self, arguments: Dict[str, Any], deadline: float) -> Dict[str, Any]:
+        if self.is_async:
+            return await self.executor(arguments, deadline)
+        return await asyncio.to_thread(self.executor, arguments, deadline)
+
+
+class ToolRegistry:
+    """Herramientas disponibles en el proceso, indexadas por nombre"""
+
+    def __init__(self, engine=None, max_cached_results: int = 256, shape_results: bool = True):
+        """
+        Args:
+            engine: ToolExecutor que aplica límites, deadlines y circuit breaker
+                    a las herramientas con backend
+            max_cached_results: Máximo de respuestas cacheadas por el registro
+            shape_results: False para enviar los resultados completos (comparación A/B)
+        """
+        self.engine = engine
+        self.shape_results = shape_results
+        self.metrics = {'raw_bytes': 0, 'shaped_bytes': 0}
+        self.tools: Dict[str, Tool] = {}
+        self.definitions: List[Dict[str, Any]] = []
+        self.max_cached_results = max_cached_results
+        self.results = OrderedDict()  # (nombre, argumentos) -> (expira_en, resultado)
+        self.lock = threading.Lock()
+
+    def register(self, tool: Tool):
+        self.tools[tool.name] = tool
+        self.definitions = [registered.definition for registered in self.tools.values()]
+        logging.info(f"Herramienta registrada: {tool.name}")
+
+    def get(self, name: str) -> Optional[Tool]:
+        return self.tools.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.tools
+
+    def __len__(self) -> int:
+        return len(self.tools)
+
+    async def execute(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Ejecuta una herramienta por nombre
+
+        Returns:
+            Dict con el resultado (siempre incluye "response" para el modelo)
+        """
+        tool = self.tools.get(name)
+        if tool is None:
+            logging.error(f"Función desconocida: {name}")
+            return {
+                "error": f"Función desconocida: {name}",
+                "response": "Lo siento, no puedo procesar esa solicitud."
+            }
+
+        cache_key = None
+        if tool.cache_ttl:
+            cache_key = (name, json.dumps(arguments, sort_keys=True, ensure_ascii=False))
+            cached = self.cached_result(cache_key)
+            if cached:
+                return self.shape(tool, cached)
+        elif tool.cache_lookup:
+            cached = tool.cache_lookup(arguments)
+            if cached:
+                return self.shape(tool, cached)
+
+        deadline = tool.deadline_for(arguments)
+        if tool.backend and self.engine:
+            result = await self.engine.run(tool.backend, lambda: tool.invoke(arguments, deadline), deadline)
+        else:
+            result = await asyncio.wait_for(tool.invoke(arguments, deadline), timeout=deadline)
+
+        if cache_key and result and result.get('success'):
+            self.store_result(cache_key, result, tool.cache_ttl)
+        return self.shape(tool, result)
+
+    def shape(self, tool: Tool, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Compacta el resultado según la forma de la herramienta y registra el ahorro"""
+        shaped, raw_bytes, shaped_bytes = shape_result(
+            result, tool.result_shape if self.shape_results else None
+        )
+        with self.lock:
+            self.metrics['raw_bytes'] += raw_bytes
+            self.metrics['shaped_bytes'] += shaped_bytes
+        if shaped_bytes < raw_bytes:
+            logging.info(
+                f"   Resultado de {tool.name} compactado: {raw_bytes} → {shaped_bytes} bytes "
+                f"(~{(raw_bytes - shaped_bytes) // 4} tokens menos)"
+            )
+        return shaped
+
+    def cached_result(self, key) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            entry = self.results.get(key)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if time.monotonic() >= expires_at:
+                del self.results[key]
+                return None
+            self.results.move_to_end(key)
+        cached = dict(result)
+        cached['metadata'] = dict(cached.get('metadata') or {}, cached=True)
+        return cached
+
+    def store_result(self, key, result: Dict[str, Any], ttl: float):
+        with self.lock:
+            self.results[key] = (time.monotonic() + ttl, dict(result))
+            self.results.move_to_end(key)
+            while len(self.results) > self.max_cached_results:
+                self.results.popitem(last=False)
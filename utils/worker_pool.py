@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Reparto de llamadas entre procesos worker
+
+Un solo proceso CPython queda limitado a un núcleo: el audio, el JSON y el
+base64 de todas las llamadas compiten por el mismo GIL. En modo supervisor
+un proceso es dueño del stream de eventos ARI y entrega cada llamada a uno
+de N workers; cada worker tiene su propio event loop, su rango de puertos
+RTP y sus sesiones de OpenAI.
+
+Supervisor y workers hablan por un socket Unix local con mensajes JSON, uno
+por línea:
+
+    supervisor -> worker: {"type": "event", "event": {...}}   evento ARI de una llamada suya
+                          {"type": "reconcile"}               revisar sus llamadas tras reconectar
+    worker -> supervisor: {"type": "hello", "worker": 0, "pid": 1234}
+                          {"type": "report", "at": 123.4, "resources": [...], "active_calls": 3, ...}
+                          {"type": "call_ended", "channel": "..."}
+
+Todos los eventos de una llamada (canal original y su External Media) van
+al mismo worker; la asignación es al worker con menos llamadas. Si un worker
+termina, sus llamadas se entregan a on_lost (el supervisor las cuelga) para
+que nadie quede en Stasis sin quien lo atienda.
+
+Las escrituras al socket no bloquean: si el otro lado deja de leer y el buffer
+de salida pasa MAX_BUFFERED_BYTES, el supervisor corta la conexión con ese
+worker (termina y se relanza) y el worker descarta sus reportes de carga.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils.call_metrics import COUNTERS
+
+# Eventos ARI grandes (p. ej. canales con muchas variables) caben en una línea
+MAX_MESSAGE_BYTES = 1024 * 1024
+
+# Bytes pendientes de escribir hacia un proceso que no lee antes de darlo por atascado
+MAX_BUFFERED_BYTES = 4 * 1024 * 1024
+
+
+def encode(message: Dict[str, Any]) -> bytes:
+    return (json.dumps(message, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def buffered_bytes(writer: asyncio.StreamWriter) -> int:
+    """Bytes escritos que el otro proceso todavía no leyó"""
+    return writer.transport.get_write_buffer_size()
+
+
+class WorkerHandle:
+    """Estado de un worker visto desde el supervisor"""
+
+    def __init__(self, index: int, port_range: Tuple[int, int]):
+        self.index = index
+        self.port_range = port_range
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.channels = set()  # llamadas asignadas (canal original)
+        self.report: Dict[str, Any] = {}
+        self.reported_at = 0.0
+        self.restarts = 0
+
+    @property
+    def connected(self) -> bool:
+        return self.writer is not None and not self.writer.is_closing()
+
+
+class WorkerPool:
+    """Lado supervisor: lanza los workers, les reparte llamadas y recibe sus reportes"""
+
+    def __init__(self, command: List[str], workers: int, socket_path: str,
+                 port_range: Tuple[int, int] = (10000, 20000),
+                 extra_env: Optional[Callable[[int], Dict[str, str]]] = None,
+                 restart_delay: float = 1.0,
+                 on_lost: Optional[Callable[[List[str]], Awaitable[None]]] = None):
+        """
+        Args:
+            command: Comando que arranca un worker (el mismo script)
+            workers: Número de procesos worker
+            socket_path: Socket Unix donde escucha el supervisor
+            port_range: Rango RTP total; se divide en partes iguales entre workers
+            extra_env: fn(índice) -> variables de entorno adicionales del worker
+            restart_delay: Segundos antes de relanzar un worker que terminó
+            on_lost: Corrutina fn(canales) que libera las llamadas de un worker que terminó
+        """
+        self.command = command
+        self.socket_path = socket_path
+        self.extra_env = extra_env
+        self.restart_delay = restart_delay
+        self.on_lost = on_lost
+        self.server = None
+        self.closing = False
+        self.assignments: Dict[str, int] = {}  # canal original -> índice de worker
+        self.monitors = []
+
+        start, end = port_range
+        span = (end - start) // workers
+        self.workers = [
+            WorkerHandle(index, (start + index * span, start + (index + 1) * span))
+            for index in range(workers)
+        ]
+
+    async def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.server = await asyncio.start_unix_server(
+            self.handle_connection, path=self.socket_path, limit=MAX_MESSAGE_BYTES
+        )
+        for worker in self.workers:
+            await self.spawn(worker)
+
+    async def wait_ready(self, timeout: float = 10) -> bool:
+        """Espera a que todos los workers se conecten; False si vence el plazo"""
+        deadline = time.monotonic() + timeout
+        while not all(worker.connected for worker in self.workers):
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.1)
+        return True
+
+    async def wait_reports(self, since: float, timeout: float = 5) -> bool:
+        """
+        Espera a que cada worker conectado haya generado un reporte después de
+        since (time.monotonic() del host); False si vence el plazo
+        """
+        deadline = time.monotonic() + timeout
+        while any(worker.connected and worker.report.get('at', 0) <= since for worker in self.workers):
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.1)
+        return True
+
+    def reported_resources(self) -> set:
+        """Canales y bridges de Asterisk que los workers conectados reportan como suyos"""
+        resources = set()
+        for worker in self.workers:
+            if worker.connected:
+                resources.update(worker.report.get('resources', ()))
+        return resources
+
+    async def spawn(self, worker: WorkerHandle):
+        env = dict(os.environ)
+        env.update({
+            'INBOUND_WORKER_INDEX': str(worker.index),
+            'INBOUND_SUPERVISOR_SOCKET': self.socket_path,
+            'RTP_PORT_START': str(worker.port_range[0]),
+            'RTP_PORT_END': str(worker.port_range[1])
+        })
+        if self.extra_env:
+            env.update(self.extra_env(worker.index))
+        worker.process = await asyncio.create_subprocess_exec(*self.command, env=env)
+        logging.info(
+            f"Worker {worker.index} iniciado (pid {worker.process.pid}, "
+            f"puertos RTP {worker.port_range[0]}-{worker.port_range[1] - 1})"
+        )
+        self.monitors.append(asyncio.create_task(self.monitor(worker, worker.process)))
+
+    async def monitor(self, worker: WorkerHandle, process):
+        """Relanza el worker si termina; sus llamadas en curso se pierden y se entregan a on_lost"""
+        code = await process.wait()
+        if self.closing:
+            return
+        lost = list(worker.channels)
+        for channel_id in lost:
+            self.assignments.pop(channel_id, None)
+        worker.channels.clear()
+        worker.writer = None
+        worker.report = {}  # Sus recursos ya no tienen dueño
+        worker.restarts += 1
+        COUNTERS.inc('worker_restarts_total', worker=str(worker.index))
+        if lost:
+            COUNTERS.inc('worker_calls_lost_total', len(lost), worker=str(worker.index))
+        logging.error(f"Worker {worker.index} terminó (código {code}), {len(lost)} llamadas perdidas; relanzando")
+        if lost and self.on_lost:
+            try:
+                await self.on_lost(lost)
+            except Exception as e:
+                logging.error(f"Error liberando las llamadas del worker {worker.index}: {e}")
+        await asyncio.sleep(self.restart_delay)
+        if not self.closing:
+            await self.spawn(worker)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        worker = None
+        try:
+            hello = json.loads(await reader.readline())
+            worker = self.workers[int(hello['worker'])]
+            worker.writer = writer
+            logging.info(f"Worker {worker.index} conectado (pid {hello.get('pid')})")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if message.get('type') == 'report':
+                    worker.report = message
+                    worker.reported_at = time.monotonic()
+                elif message.get('type') == 'call_ended':
+                    channel_id = message.get('channel')
+                    worker.channels.discard(channel_id)
+                    if self.assignments.get(channel_id) == worker.index:
+                        del self.assignments[channel_id]
+        except (ValueError, KeyError, IndexError) as e:
+            logging.error(f"Mensaje inválido de worker: {e}")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if worker and worker.writer is writer:
+                worker.writer = None
+                logging.warning(f"Worker {worker.index} desconectado")
+            writer.close()
+
+    def pick_worker(self) -> Optional[WorkerHandle]:
+        connected = [worker for worker in self.workers if worker.connected]
+        if not connected:
+            return None
+        return min(connected, key=lambda worker: len(worker.channels))
+
+    def route(self, event: Dict[str, Any]) -> Optional[int]:
+        """
+        Entrega el evento al worker de su llamada; un StasisStart nuevo se asigna
+
+        Returns:
+            Índice del worker, o None si el evento se descartó
+        """
+        channel_id = (event.get('channel') or {}).get('id')
+        if not channel_id:
+            return None
+        owner = channel_id[len('external_'):] if channel_id.startswith('external_') else channel_id
+
+        index = self.assignments.get(owner)
+        if index is None:
+            if event.get('type') != 'StasisStart' or owner != channel_id:
+                return None
+            worker = self.pick_worker()
+            if worker is None:
+                COUNTERS.inc('calls_shed_total', reason='no_workers')
+                logging.error(f"Sin workers disponibles para la llamada {channel_id}")
+                return None
+            index = worker.index
+            self.assignments[owner] = index
+            worker.channels.add(owner)
+            logging.info(f"Llamada {owner} asignada al worker {index}")
+
+        worker = self.workers[index]
+        if not self.send(worker, {'type': 'event', 'event': event}):
+            return None
+        if event.get('type') == 'StasisEnd' and owner == channel_id:
+            # El worker libera la llamada; los eventos que sigan del External Media ya no importan
+            self.assignments.pop(owner, None)
+            worker.channels.discard(owner)
+        return index
+
+    def send(self, worker: WorkerHandle, message: Dict[str, Any]) -> bool:
+        if not worker.connected:
+            logging.warning(f"Worker {worker.index} no conectado, mensaje descartado")
+            return False
+        if buffered_bytes(worker.writer) > MAX_BUFFERED_BYTES:
+            # El worker dejó de leer: cortar la conexión en vez de acumular memoria sin
+            # límite. El worker termina al perder el supervisor y monitor lo relanza
+            logging.error(f"Worker {worker.index} no lee sus eventos, desconectándolo")
+            COUNTERS.inc('worker_stalled_total', worker=str(worker.index))
+            worker.writer.close()
+            return False
+        worker.writer.write(encode(message))
+        return True
+
+    def broadcast(self, message: Dict[str, Any]):
+        for worker in self.workers:
+            if worker.connected:
+                self.send(worker, message)
+
+    async def close(self):
+        self.closing = True
+        for monitor in self.monitors:
+            monitor.cancel()
+        for worker in self.workers:
+            if worker.process and worker.process.returncode is None:
+                worker.process.terminate()
+        await asyncio.gather(
+            *(worker.process.wait() for worker in self.workers if worker.process),
+            return_exceptions=True
+        )
+        if self.server:
+            self.server.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class SupervisorLink:
+    """Lado worker: conexión con el supervisor"""
+
+    def __init__(self, socket_path: str, index: int):
+        self.socket_path = socket_path
+        self.index = index
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self, attempts: int = 20, delay: float = 0.25):
+        for attempt in range(attempts):
+            try:
+                self.reader, self.writer = await asyncio.open_unix_connection(
+                    self.socket_path, limit=MAX_MESSAGE_BYTES
+                )
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if attempt == attempts - 1:
+                    raise
+                await asyncio.sleep(delay)
+        self.send({'type': 'hello', 'worker': self.index, 'pid': os.getpid()})
+
+    def send(self, message: Dict[str, Any]):
+        if not self.writer or self.writer.is_closing():
+            return
+        if message.get('type') == 'report' and buffered_bytes(self.writer) > MAX_BUFFERED_BYTES:
+            # El supervisor no lee: el próximo reporte reemplaza a este
+            logging.warning("Supervisor atascado, reporte de carga descartado")
+            return
+        self.writer.write(encode(message))
+
+    async def messages(self):
+        """Mensajes del supervisor hasta que cierre la conexión"""
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                logging.error(f"Mensaje inválido del supervisor: {e}")
+
+    def close(self):
+        if self.writer:
+            self.writer.close()